@@ -4,9 +4,11 @@ from flask_migrate import Migrate
 from flask_login import LoginManager
 from redis import Redis
 from config import config
+from app.utils.db_routing import RoutingSession
+from app.utils.db_pool import bind_options, engine_options
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 redis_client = None
@@ -16,6 +18,8 @@ def create_app(config_name='default'):
     """Application factory pattern"""
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    app.config['SQLALCHEMY_BINDS'] = bind_options(app.config)
 
     # Initialize extensions with app
     db.init_app(app)
@@ -44,17 +48,33 @@ def create_app(config_name='default'):
     # Import all models to ensure they're registered with SQLAlchemy
     from app.models.user import User, UserSubject
     from app.models.subscription import Subscription, UsageLimit
-    from app.models.subject import Subject, Topic, UserTopicProgress
+    from app.models.subject import Subject, Topic, TopicClosure, UserTopicProgress
     from app.models.question import QuestionTemplate, Question
     from app.models.test import TestSession, UserAnswer
-    from app.models.gamification import Badge, UserBadge
+    from app.models.gamification import Badge, UserBadge, XPEvent
+    from app.models.stats import UserStats, UserDailyStats
     from app.routes.auth import init_oauth
+    from app.commands import register_commands
+
+    # Registers the listeners that drop cached entitlements on subscription changes
+    from app.services import entitlement_service  # noqa: F401
+    # Keeps topic_closure and the cached topic trees in step with topic changes
+    from app.services import topic_tree_service  # noqa: F401
+    # Bumps the catalog version after subject and topic changes
+    from app.services import catalog_service  # noqa: F401
 
     init_oauth(app)
+    register_commands(app)
+
+    # User loader for Flask-Login (cached snapshot, ORM object loaded on demand)
+    from app.utils.user_cache import load_user
+    from app.utils.query_counter import init_query_counter
+    from app.utils.json_provider import init_json
+    from app.utils.compression import init_compression
 
-    # User loader for Flask-Login
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+    login_manager.user_loader(lambda user_id: load_user(int(user_id)))
+    init_query_counter(app)
+    init_json(app)
+    init_compression(app)
 
     return app
\ No newline at end of file
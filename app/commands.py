@@ -0,0 +1,245 @@
+"""
+Maintenance commands
+
+Usage: flask <command> [options]
+"""
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('rebuild-review-schedule')
+@click.option('--chunk-size', default=5000, help='Rows per batch')
+@click.option('--clear', is_flag=True, help='Delete existing schedules first')
+@with_appcontext
+def rebuild_review_schedule(chunk_size, clear):
+    """Repopulate spaced-repetition schedules from user_topic_progress"""
+    from app.services.review_service import ReviewService
+
+    total = ReviewService().rebuild(chunk_size=chunk_size, clear=clear)
+    click.echo(f"✅ Scheduled {total} topics")
+
+
+@click.command('fill-question-pools')
+@click.option('--min-size', default=30, help='Questions per topic and difficulty')
+@click.option('--topic-id', 'topic_ids', multiple=True, type=int, help='Only fill these topics')
+@click.option('--refill-only', is_flag=True, help='Only topics flagged as running short')
+@with_appcontext
+def fill_question_pools(min_size, topic_ids, refill_only):
+    """Prefill per-topic question pools used by topic tests"""
+    from app.services.pool_service import QuestionPoolService
+
+    pool_service = QuestionPoolService()
+    topic_ids = list(topic_ids)
+    if refill_only:
+        topic_ids = pool_service.pop_refill_topics()
+        if not topic_ids:
+            click.echo("Nothing to refill")
+            return
+
+    generated = pool_service.fill(min_size=min_size, topic_ids=topic_ids or None)
+    click.echo(f"✅ Generated {generated} questions")
+
+
+@click.command('backfill-question-payloads')
+@click.option('--chunk-size', default=1000, help='Questions per batch')
+@with_appcontext
+def backfill_question_payloads(chunk_size):
+    """Build precomputed client payloads for existing bank questions"""
+    from app.services.pool_service import QuestionPoolService
+
+    total = QuestionPoolService().backfill_payloads(chunk_size=chunk_size)
+    click.echo(f"✅ Built payloads for {total} questions")
+
+
+@click.command('rebuild-seen-filters')
+@click.option('--days', default=60, help='Answers from the last N days count as seen')
+@click.option('--chunk-size', default=10000, help='Answers per batch')
+@with_appcontext
+def rebuild_seen_filters(days, chunk_size):
+    """Rebuild per-user seen-question filters from answer history"""
+    from app.services.seen_service import SeenFilterService
+
+    total = SeenFilterService().rebuild(days=days, chunk_size=chunk_size)
+    click.echo(f"✅ Replayed {total} answers")
+
+
+@click.command('backfill-user-stats')
+@click.option('--chunk-size', default=500, help='Users per batch')
+@with_appcontext
+def backfill_user_stats(chunk_size):
+    """Rebuild the user_stats rollup from test history"""
+    from app.services.stats_service import StatsService
+
+    total = StatsService().backfill(chunk_size=chunk_size)
+    click.echo(f"✅ Rebuilt stats for {total} users")
+
+
+@click.command('backfill-daily-stats')
+@click.option('--chunk-size', default=500, help='Users per batch')
+@with_appcontext
+def backfill_daily_stats(chunk_size):
+    """Rebuild the per-day topic stats from answer history"""
+    from app.services.stats_service import StatsService
+
+    total = StatsService().backfill_daily(chunk_size=chunk_size)
+    click.echo(f"✅ Rebuilt daily stats for {total} users")
+
+
+@click.command('compact-daily-stats')
+@click.option('--older-than', 'older_than', type=int, help='Days to keep daily (default: STATS_COMPACT_AFTER_DAYS)')
+@click.option('--chunk-size', default=1000, help='Users per batch')
+@with_appcontext
+def compact_daily_stats(older_than, chunk_size):
+    """Merge old per-day stats into weekly rows"""
+    from flask import current_app
+    from app.services.stats_service import StatsService
+
+    if older_than is None:
+        older_than = current_app.config['STATS_COMPACT_AFTER_DAYS']
+    merged = StatsService().compact(older_than, chunk_size=chunk_size)
+    click.echo(f"✅ Merged {merged} daily rows into weeks")
+
+
+@click.command('backfill-badges')
+@click.option('--chunk-size', default=500, help='Users per batch')
+@click.option('--award-xp', is_flag=True, help="Also grant the badges' XP rewards")
+@with_appcontext
+def backfill_badges(chunk_size, award_xp):
+    """Award badges existing users already qualify for"""
+    from app.services.badge_service import BadgeService
+
+    total = BadgeService().backfill(chunk_size=chunk_size, award_xp=award_xp)
+    click.echo(f"✅ Awarded {total} badges")
+
+
+@click.command('rebuild-leaderboards')
+@click.option('--chunk-size', default=5000, help='Users per batch')
+@with_appcontext
+def rebuild_leaderboards(chunk_size):
+    """Rebuild global and per-grade XP leaderboards from the users table"""
+    from app.services.leaderboard_service import LeaderboardService
+
+    total = LeaderboardService().rebuild(chunk_size=chunk_size)
+    click.echo(f"✅ Ranked {total} users")
+
+
+@click.command('reconcile-xp')
+@click.option('--chunk-size', default=1000, help='Users per batch')
+@with_appcontext
+def reconcile_xp(chunk_size):
+    """Recompute users' XP and level from the XP ledger"""
+    from app.services.xp_service import XPService
+
+    changed = XPService().reconcile(chunk_size=chunk_size)
+    click.echo(f"✅ Corrected XP for {changed} users")
+
+
+@click.command('rebuild-activity')
+@click.option('--chunk-size', default=1000, help='Test sessions per batch')
+@with_appcontext
+def rebuild_activity(chunk_size):
+    """Rebuild daily activity bitmaps from test history"""
+    from app.services.activity_service import ActivityService
+
+    total = ActivityService().rebuild(chunk_size=chunk_size)
+    click.echo(f"✅ Marked {total} active days")
+
+
+@click.command('flush-usage')
+@click.option('--batch-size', default=500, help='Users per batch')
+@with_appcontext
+def flush_usage(batch_size):
+    """Write daily usage counters from Redis to usage_limits"""
+    from app.services.quota_service import QuotaService
+
+    total = QuotaService().flush(batch_size=batch_size)
+    click.echo(f"✅ Flushed usage for {total} users")
+
+
+@click.command('create-answer-partitions')
+@with_appcontext
+def create_answer_partitions():
+    """Create user_answers partitions for the coming months"""
+    from app.services.partition_service import PartitionService
+
+    names = PartitionService().ensure_partitions()
+    click.echo(f"✅ Partitions ready through {names[-1]}")
+
+
+@click.command('archive-answers')
+@click.option('--directory', default=None, help='Where to write archives (default: ANSWER_ARCHIVE_DIR)')
+@click.option('--dry-run', is_flag=True, help='Only list partitions that would be archived')
+@with_appcontext
+def archive_answers(directory, dry_run):
+    """Move user_answers partitions past retention to compressed files"""
+    from app.services.partition_service import PartitionService
+
+    service = PartitionService()
+    names = service.archivable()
+    if not names:
+        click.echo("Nothing to archive")
+        return
+
+    for name in names:
+        if dry_run:
+            click.echo(f"Would archive {name}")
+            continue
+        rows = service.archive(name, directory)
+        click.echo(f"✅ Archived {name} ({rows} rows)")
+
+
+@click.command('restore-answers')
+@click.argument('path')
+@with_appcontext
+def restore_answers(path):
+    """Load an archived user_answers month back into the database"""
+    from app.services.partition_service import PartitionService
+
+    rows = PartitionService().restore(path)
+    click.echo(f"✅ Restored {rows} rows")
+
+
+@click.command('rebuild-topic-closure')
+@with_appcontext
+def rebuild_topic_closure():
+    """Recompute the topic hierarchy closure table"""
+    from app.services.topic_tree_service import TopicTreeService
+
+    rows = TopicTreeService().rebuild()
+    click.echo(f"✅ Rebuilt topic closure ({rows} rows)")
+
+
+@click.command('show-metrics')
+@with_appcontext
+def show_metrics():
+    """Print counters, gauges and timing histograms"""
+    from app.utils import metrics
+
+    data = metrics.snapshot()
+    for name, value in sorted(data['counters'].items()):
+        click.echo(f"{name}: {value}")
+    for name, value in sorted(data['gauges'].items()):
+        click.echo(f"{name}: {value:g} (all workers)")
+    for name, timing in sorted(data['timings'].items()):
+        click.echo(f"{name}: count={timing['count']} avg={timing['avg']}s buckets={timing['buckets']}")
+
+
+def register_commands(app):
+    """Register maintenance commands with the Flask CLI"""
+    app.cli.add_command(rebuild_review_schedule)
+    app.cli.add_command(fill_question_pools)
+    app.cli.add_command(backfill_question_payloads)
+    app.cli.add_command(rebuild_seen_filters)
+    app.cli.add_command(backfill_user_stats)
+    app.cli.add_command(backfill_daily_stats)
+    app.cli.add_command(compact_daily_stats)
+    app.cli.add_command(backfill_badges)
+    app.cli.add_command(rebuild_leaderboards)
+    app.cli.add_command(reconcile_xp)
+    app.cli.add_command(rebuild_activity)
+    app.cli.add_command(flush_usage)
+    app.cli.add_command(create_answer_partitions)
+    app.cli.add_command(archive_answers)
+    app.cli.add_command(restore_answers)
+    app.cli.add_command(rebuild_topic_closure)
+    app.cli.add_command(show_metrics)
@@ -38,7 +38,30 @@ class UserBadge(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('user_id', 'badge_id', name='uix_user_badge'),
+        db.Index('ix_user_badges_user_earned', 'user_id', db.text('earned_at DESC')),
     )
 
     def __repr__(self):
-        return f'<UserBadge user={self.user_id} badge={self.badge_id}>'
\ No newline at end of file
+        return f'<UserBadge user={self.user_id} badge={self.badge_id}>'
+
+class XPEvent(db.Model):
+    """Append-only ledger of XP awards; users.xp is the running total"""
+    __tablename__ = 'xp_events'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+
+    amount = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(50), nullable=False)  # 'test_score', 'perfect_score', 'badge', 'opening_balance'
+    source_id = db.Column(db.Integer)  # test session or badge the award came from
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # The same test or badge can only pay out once
+        db.UniqueConstraint('user_id', 'reason', 'source_id', name='uix_xp_event_source'),
+        db.Index('ix_xp_events_user_created', 'user_id', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<XPEvent user={self.user_id} {self.reason} +{self.amount}>'
@@ -1,4 +1,6 @@
+import json
 from datetime import datetime
+from sqlalchemy import event
 from app import db
 
 
@@ -30,6 +32,10 @@ class QuestionTemplate(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     times_used = db.Column(db.Integer, default=0)
 
+    __table_args__ = (
+        db.Index('ix_question_templates_topic', 'topic_id'),
+    )
+
     def __repr__(self):
         return f'<QuestionTemplate {self.id} type={self.question_type}>'
 
@@ -58,5 +64,41 @@ class Question(db.Model):
     times_used = db.Column(db.Integer, default=0)
     avg_correct_rate = db.Column(db.Numeric(5, 2))
 
+    # Adaptive selection: item difficulty on the logit scale (0 = average student)
+    difficulty_rating = db.Column(db.Float, default=0.0)
+
+    # What the test page gets, serialized once at creation (no answer, no explanation)
+    client_payload = db.Column(db.Text)
+
+    __table_args__ = (
+        # Pool fills and per-topic selection
+        db.Index('ix_questions_topic_difficulty', 'topic_id', 'difficulty'),
+    )
+
+    def build_client_payload(self) -> str:
+        """
+        JSON object sent to the test page, without the ID
+
+        The ID isn't known before the INSERT; with_id() adds it when serving.
+        """
+        return json.dumps({
+            'question_text': self.question_text,
+            'question_type': self.question_type,
+            'difficulty': self.difficulty,
+            'choices': self.choices
+        }, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def with_id(question_id: int, payload: str) -> str:
+        """Stored client payload with the question ID spliced in"""
+        return f'{{"id":{question_id},{payload[1:]}'
+
     def __repr__(self):
-        return f'<Question {self.id} type={self.question_type}>'
\ No newline at end of file
+        return f'<Question {self.id} type={self.question_type}>'
+
+
+@event.listens_for(Question, 'before_insert')
+def _build_client_payload(mapper, connection, target):
+    # Bank questions are never edited, so the payload is built once
+    if target.client_payload is None:
+        target.client_payload = target.build_client_payload()
@@ -0,0 +1,105 @@
+from datetime import date, datetime, timedelta
+from app import db
+
+
+class UserStats(db.Model):
+    """Per-user test statistics, maintained incrementally as tests complete"""
+    __tablename__ = 'user_stats'
+
+    # How many buckets to keep
+    DAILY_BUCKETS = 35
+    WEEKLY_BUCKETS = 12
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+
+    tests_completed = db.Column(db.Integer, default=0, nullable=False)
+    percentage_total = db.Column(db.Numeric(12, 2), default=0, nullable=False)
+
+    # {"2026-10-19": 3} - tests completed per day / ISO week
+    daily_counts = db.Column(db.JSON, default=dict)
+    weekly_counts = db.Column(db.JSON, default=dict)
+
+    # {"<subject_id>": {"tests": 4, "percentage_total": 310.0}}
+    subject_stats = db.Column(db.JSON, default=dict)
+
+    last_test_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def record_test(self, completed_at: datetime, percentage, subject_id=None):
+        """Add one completed test to the rollup"""
+        percentage = float(percentage or 0)
+        day = completed_at.date()
+
+        self.tests_completed = (self.tests_completed or 0) + 1
+        self.percentage_total = float(self.percentage_total or 0) + percentage
+
+        # JSON columns are reassigned so SQLAlchemy sees the change
+        daily = dict(self.daily_counts or {})
+        daily[day.isoformat()] = daily.get(day.isoformat(), 0) + 1
+        self.daily_counts = dict(sorted(daily.items())[-self.DAILY_BUCKETS:])
+
+        week = self._week_key(day)
+        weekly = dict(self.weekly_counts or {})
+        weekly[week] = weekly.get(week, 0) + 1
+        self.weekly_counts = dict(sorted(weekly.items())[-self.WEEKLY_BUCKETS:])
+
+        if subject_id is not None:
+            subjects = dict(self.subject_stats or {})
+            entry = dict(subjects.get(str(subject_id), {'tests': 0, 'percentage_total': 0}))
+            entry['tests'] += 1
+            entry['percentage_total'] = round(entry['percentage_total'] + percentage, 2)
+            subjects[str(subject_id)] = entry
+            self.subject_stats = subjects
+
+        if not self.last_test_at or completed_at > self.last_test_at:
+            self.last_test_at = completed_at
+
+    @staticmethod
+    def _week_key(day: date) -> str:
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+
+    @property
+    def avg_accuracy(self) -> float:
+        """Average test percentage"""
+        if not self.tests_completed:
+            return 0
+        return float(self.percentage_total) / self.tests_completed
+
+    def tests_in_last_days(self, days: int) -> int:
+        """Tests completed in the last `days` days, today (UTC, like the buckets) included"""
+        since = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+        return sum(count for day, count in (self.daily_counts or {}).items() if day >= since)
+
+    def subject_accuracy(self, subject_id) -> float:
+        """Average test percentage within one subject"""
+        entry = (self.subject_stats or {}).get(str(subject_id))
+        if not entry or not entry['tests']:
+            return 0
+        return entry['percentage_total'] / entry['tests']
+
+    def __repr__(self):
+        return f'<UserStats user={self.user_id} tests={self.tests_completed}>'
+
+
+class UserDailyStats(db.Model):
+    """
+    Answers per user, topic and day, maintained as tests complete
+
+    History charts read this instead of raw answers. Old daily rows are
+    compacted into one row per ISO week (period 'week', day = Monday).
+    """
+    __tablename__ = 'user_daily_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    period = db.Column(db.String(4), primary_key=True, default='day')  # 'day', 'week'
+    topic_id = db.Column(db.Integer, db.ForeignKey('topics.id', ondelete='CASCADE'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id', ondelete='CASCADE'), nullable=False)
+
+    questions_answered = db.Column(db.Integer, default=0, nullable=False)
+    correct_answers = db.Column(db.Integer, default=0, nullable=False)
+    time_spent_seconds = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<UserDailyStats user={self.user_id} {self.period}={self.day} topic={self.topic_id}>'
@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import func
 from app import db
 
 
@@ -54,6 +55,28 @@ class Topic(db.Model):
         return f'<Topic {self.name_sk}>'
 
 
+class TopicClosure(db.Model):
+    """
+    Every (ancestor, descendant) pair of the topic tree, including each
+    topic paired with itself at depth 0
+
+    Kept in step with topics by TopicTreeService.
+    """
+    __tablename__ = 'topic_closure'
+
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('topics.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('topics.id', ondelete='CASCADE'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        # Ancestors of a topic
+        db.Index('ix_topic_closure_descendant', 'descendant_id'),
+    )
+
+    def __repr__(self):
+        return f'<TopicClosure {self.ancestor_id}->{self.descendant_id} depth={self.depth}>'
+
+
 class UserTopicProgress(db.Model):
     """User's progress per topic"""
     __tablename__ = 'user_topic_progress'
@@ -69,12 +92,60 @@ class UserTopicProgress(db.Model):
     last_practiced_at = db.Column(db.DateTime)
     mastery_level = db.Column(db.String(20), default='beginner')  # 'beginner', 'intermediate', 'advanced', 'master'
 
+    # Adaptive selection: student ability on the same scale as Question.difficulty_rating
+    ability_rating = db.Column(db.Float, default=0.0)
+
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     __table_args__ = (
         db.UniqueConstraint('user_id', 'topic_id', name='uix_user_topic'),
+        # Weakest topics per user
+        db.Index('ix_user_topic_progress_user_accuracy', 'user_id', 'accuracy_rate'),
     )
 
+    @staticmethod
+    def subject_progress(user_id, subject_ids=None):
+        """
+        Average topic accuracy and number of practiced topics per subject
+
+        Returns:
+            {subject_id: {'accuracy': float, 'topics_count': int}}
+        """
+        return UserTopicProgress.subject_progress_for_users([user_id], subject_ids).get(user_id, {})
+
+    @staticmethod
+    def subject_progress_for_users(user_ids, subject_ids=None):
+        """
+        Per-subject progress for several users in one grouped query
+
+        Returns:
+            {user_id: {subject_id: {'accuracy': float, 'topics_count': int}}}
+        """
+        if not user_ids:
+            return {}
+
+        query = db.session.query(
+            UserTopicProgress.user_id,
+            Topic.subject_id,
+            func.avg(UserTopicProgress.accuracy_rate),
+            func.count(UserTopicProgress.id)
+        ).join(Topic, Topic.id == UserTopicProgress.topic_id).filter(
+            UserTopicProgress.user_id.in_(user_ids)
+        )
+        if subject_ids is not None:
+            if not subject_ids:
+                return {}
+            query = query.filter(Topic.subject_id.in_(subject_ids))
+
+        result = {}
+        for user_id, subject_id, accuracy, topics_count in query.group_by(
+                UserTopicProgress.user_id, Topic.subject_id).all():
+            result.setdefault(user_id, {})[subject_id] = {
+                'accuracy': round(float(accuracy or 0), 1),
+                'topics_count': topics_count
+            }
+        return result
+
     def update_progress(self, is_correct):
         """Update progress after answering a question"""
         if self.total_questions is None:
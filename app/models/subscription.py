@@ -2,6 +2,35 @@ from datetime import datetime
 from app import db
 
 
+# Limits per plan; *_per_day quotas are enforced by QuotaService
+PLAN_LIMITS = {
+    'free': {
+        'tests_per_day': 5,
+        'explanations': False,
+        'explanations_per_day': 0,
+        'custom_tests': False,
+        'ai_chat': False,
+        'max_stats_days': 7
+    },
+    'basic': {
+        'tests_per_day': 30,
+        'explanations': True,
+        'explanations_per_day': 50,
+        'custom_tests': True,
+        'ai_chat': False,
+        'max_stats_days': 365
+    },
+    'premium': {
+        'tests_per_day': 999,
+        'explanations': True,
+        'explanations_per_day': 999,
+        'custom_tests': True,
+        'ai_chat': True,
+        'max_stats_days': 365
+    }
+}
+
+
 class Subscription(db.Model):
     """Subscription model"""
     __tablename__ = 'subscriptions'
@@ -39,31 +68,7 @@ class Subscription(db.Model):
 
     def get_plan_limits(self):
         """Get limits for current plan"""
-        limits = {
-            'free': {
-                'tests_per_day': 5,
-                'explanations': False,
-                'custom_tests': False,
-                'ai_chat': False,
-                'max_stats_days': 7
-            },
-            'basic': {
-                'tests_per_day': 30,
-                'explanations': True,
-                'custom_tests': True,
-                'ai_chat': False,
-                'max_stats_days': 365
-            },
-            'premium': {
-                'tests_per_day': 999,
-                'explanations': True,
-                'custom_tests': True,
-                'ai_chat': True,
-                'max_stats_days': 365
-            }
-        }
-
-        return limits.get(self.plan, limits['free'])
+        return PLAN_LIMITS.get(self.plan, PLAN_LIMITS['free'])
 
     def __repr__(self):
         return f'<Subscription user={self.user_id} plan={self.plan}>'
@@ -88,16 +93,19 @@ class UsageLimit(db.Model):
     def get_today_usage(user_id):
         """Get or create today's usage record"""
         from datetime import date
+        from sqlalchemy.dialects.postgresql import insert
 
         today = date.today()
-        usage = UsageLimit.query.filter_by(
-            user_id=user_id,
-            date=today
-        ).first()
 
-        if not usage:
-            usage = UsageLimit(user_id=user_id, date=today)
-            db.session.add(usage)
-            db.session.commit()
+        # Concurrent first requests of the day must not both insert
+        db.session.execute(
+            insert(UsageLimit.__table__)
+            .values(user_id=user_id, date=today, tests_taken=0, ai_explanations_viewed=0)
+            .on_conflict_do_nothing(constraint='uix_user_date')
+        )
+        db.session.commit()
 
-        return usage
+        return UsageLimit.query.filter_by(
+            user_id=user_id,
+            date=today
+        ).one()
@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import event
 from app import db
 
 
@@ -10,12 +11,13 @@ class TestSession(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'))
     subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'))
 
-    test_type = db.Column(db.String(50), nullable=False)  # 'quick', 'custom'
+    test_type = db.Column(db.String(50), nullable=False)  # 'quick', 'topic', 'custom'
 
     # Test settings
     total_questions = db.Column(db.Integer, nullable=False)
     difficulty = db.Column(db.String(20))
     topic_ids = db.Column(db.ARRAY(db.Integer))  # For custom tests
+    question_ids = db.Column(db.ARRAY(db.Integer))  # Questions served, in order
 
     # Status
     status = db.Column(db.String(20), nullable=False, default='in_progress')  # 'in_progress', 'completed', 'abandoned'
@@ -29,9 +31,28 @@ class TestSession(db.Model):
     time_spent_seconds = db.Column(db.Integer)
 
     # Relationships
-    answers = db.relationship('UserAnswer', backref='session', cascade='all, delete-orphan')
+    # Answers can't predate the session, which lets Postgres skip older
+    # user_answers partitions
+    answers = db.relationship(
+        'UserAnswer',
+        primaryjoin='and_(TestSession.id == foreign(UserAnswer.session_id), '
+                    'UserAnswer.answered_at >= TestSession.started_at)',
+        backref='session',
+        cascade='all, delete-orphan'
+    )
     subject = db.relationship('Subject')
 
+    __table_args__ = (
+        # Recent completed tests per user (dashboard, stats backfill, history);
+        # id breaks ties in the history's keyset order
+        db.Index('ix_test_sessions_user_completed', 'user_id', db.text('completed_at DESC'),
+                 db.text('id DESC'), postgresql_where=db.text("status = 'completed'")),
+        # Test history filtered by subject
+        db.Index('ix_test_sessions_user_subject_completed', 'user_id', 'subject_id',
+                 db.text('completed_at DESC'), db.text('id DESC'),
+                 postgresql_where=db.text("status = 'completed'")),
+    )
+
     def calculate_results(self):
         """Calculate and store test results"""
         # FIX: Convert relationship to list using .all()
@@ -52,7 +73,10 @@ class UserAnswer(db.Model):
     """User's answer to a question"""
     __tablename__ = 'user_answers'
 
-    id = db.Column(db.Integer, primary_key=True)
+    # Partitioned by month on answered_at, so it's part of the primary key
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    answered_at = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow)
+
     session_id = db.Column(db.Integer, db.ForeignKey('test_sessions.id', ondelete='CASCADE'))
     question_id = db.Column(db.Integer, db.ForeignKey('questions.id'))
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -66,12 +90,30 @@ class UserAnswer(db.Model):
     ai_explanation = db.Column(db.Text)  # ADD THIS LINE
 
     time_spent_seconds = db.Column(db.Integer)
-    answered_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
     question = db.relationship('Question')
+
+    __table_args__ = (
+        # Answers of a session, and the duplicate check on submit
+        db.Index('ix_user_answers_session_question', 'session_id', 'question_id'),
+        {'postgresql_partition_by': 'RANGE (answered_at)'},
+    )
+
+    @staticmethod
+    def for_session(test_session):
+        """Answers of a test session, reading only partitions since it started"""
+        return UserAnswer.query.filter(
+            UserAnswer.session_id == test_session.id,
+            UserAnswer.answered_at >= test_session.started_at
+        )
+
     def __repr__(self):
         return f'<UserAnswer session={self.session_id} question={self.question_id}>'
 
 
-
+@event.listens_for(UserAnswer.__table__, 'after_create')
+def _create_answer_partitions(target, connection, **kw):
+    """Partitions for this month and the next few, so inserts have somewhere to go"""
+    from app.services.partition_service import create_partitions
+    create_partitions(connection)
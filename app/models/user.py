@@ -1,6 +1,7 @@
 from datetime import datetime
 from flask_login import UserMixin
 from app import db
+from app.utils.levels import level_for_xp
 import bcrypt
 
 
@@ -33,7 +34,7 @@ class User(UserMixin, db.Model):
     xp = db.Column(db.Integer, default=0)
     level = db.Column(db.Integer, default=1)
     streak_days = db.Column(db.Integer, default=0)
-    last_activity_date = db.Column(db.Date)
+    last_activity_date = db.Column(db.Date)  # daily history is in Redis activity bitmaps
 
     # Relationships
     subscription = db.relationship('Subscription', backref='user', uselist=False,
@@ -66,45 +67,9 @@ class User(UserMixin, db.Model):
             self.password_hash.encode('utf-8')
         )
 
-    def add_xp(self, amount):
-        """Add XP and check for level up"""
-        self.xp += amount
-        new_level = self.calculate_level()
-        if new_level > self.level:
-            self.level = new_level
-            return True  # Leveled up!
-        return False
-
     def calculate_level(self):
         """Calculate level based on XP"""
-        # Level thresholds: 1=0, 2=100, 3=250, 4=500, 5=1000, etc.
-        thresholds = [0, 100, 250, 500, 1000, 2000, 4000, 7000, 11000, 16000]
-        for i, threshold in enumerate(thresholds):
-            if self.xp < threshold:  # ✅ Use self.xp, not User.xp
-                return i
-        return len(thresholds)
-
-    def update_streak(self):
-        """Update daily streak"""
-        from datetime import date, timedelta
-
-        today = date.today()
-
-        if not self.last_activity_date:
-            # First activity ever
-            self.streak_days = 1
-            self.last_activity_date = today
-        elif self.last_activity_date == today:
-            # Already active today
-            pass
-        elif self.last_activity_date == today - timedelta(days=1):
-            # Active yesterday, continue streak
-            self.streak_days += 1
-            self.last_activity_date = today
-        else:
-            # Streak broken
-            self.streak_days = 1
-            self.last_activity_date = today
+        return level_for_xp(self.xp)
 
     def __repr__(self):
         return f'<User {self.email}>'
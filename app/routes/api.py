@@ -1,38 +1,211 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
+from app.utils.db_routing import read_only
 
 api_bp = Blueprint('api', __name__)
 
 
+def _catalog_response(payload: bytes, etag: str):
+    """Serialized catalog JSON with a strong ETag; 304 if the client has it"""
+    from flask import current_app
+    from app.utils.compression import matching_etag
+
+    response = current_app.response_class(payload, mimetype='application/json')
+    # A client holding a compressed copy sent that encoding's ETag
+    response.set_etag(matching_etag(request.if_none_match, etag) or etag)
+    # Cache, but revalidate every time: the catalog can change any moment
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def _date_arg(name: str):
+    """Optional YYYY-MM-DD query argument; raises ValueError if it's malformed"""
+    from datetime import date
+
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' date, expected YYYY-MM-DD")
+
+
 @api_bp.route('/subjects')
 @login_required
 def get_subjects():
     """Get all subjects"""
-    from app.models.subject import Subject
-    subjects = Subject.query.filter_by(is_active=True).all()
+    from app.services.catalog_service import CatalogService
 
-    return jsonify([{
-        'id': s.id,
-        'name': s.name_sk,
-        'slug': s.slug,
-        'icon': s.icon,
-        'color': s.color
-    } for s in subjects])
+    catalog = CatalogService().get()
+    return _catalog_response(catalog.subjects_json, catalog.subjects_etag)
 
 
 @api_bp.route('/subjects/<int:subject_id>/topics')
 @login_required
 def get_topics(subject_id):
     """Get topics for a subject"""
-    from app.models.subject import Topic
-    topics = Topic.query.filter_by(
-        subject_id=subject_id,
-        is_active=True
-    ).order_by(Topic.order_index).all()
-
-    return jsonify([{
-        'id': t.id,
-        'name': t.name_sk,
-        'slug': t.slug,
-        'difficulty': t.difficulty
-    } for t in topics])
+    from app.services.catalog_service import CatalogService
+
+    payload, etag = CatalogService().get().topics_json(subject_id)
+    return _catalog_response(payload, etag)
+
+
+@api_bp.route('/subjects/<int:subject_id>/progress')
+@login_required
+@read_only
+def get_subject_progress(subject_id):
+    """Current user's progress per topic, each summed over its subtopics"""
+    from app.services.topic_tree_service import TopicTreeService
+
+    service = TopicTreeService()
+    tree = service.get_tree(subject_id)
+    rollup = service.progress_rollup(current_user.id, subject_id)
+
+    def node(topic_id):
+        return {
+            'id': topic_id,
+            'progress': rollup.get(topic_id),
+            'subtopics': [node(child_id) for child_id in tree.children(topic_id)]
+        }
+
+    return jsonify([node(topic_id) for topic_id in tree.roots])
+
+
+def _leaderboard_key(board):
+    """Resolve a leaderboard key from the URL and query string"""
+    from app.services.leaderboard_service import board_key
+
+    if board == 'grade':
+        return board_key('grade', request.args.get('grade', current_user.grade, type=int))
+    if board == 'subject':
+        return board_key('subject', request.args.get('subject_id', type=int))
+    if board == 'weekly':
+        return board_key('weekly', request.args.get('week'))
+    return board_key(board)
+
+
+@api_bp.route('/leaderboard/<board>')
+@login_required
+@read_only
+def get_leaderboard(board):
+    """Top of a leaderboard ('global', 'weekly', 'grade', 'subject'), paginated"""
+    from app.services.leaderboard_service import LeaderboardService
+
+    try:
+        key = _leaderboard_key(board)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    page = request.args.get('page', 1, type=int)
+    per_page = max(min(request.args.get('per_page', 20, type=int), 100), 1)
+
+    service = LeaderboardService()
+    return jsonify({
+        'board': board,
+        'page': page,
+        'entries': service.top(key, page, per_page),
+        'me': service.rank(key, current_user.id)
+    })
+
+
+@api_bp.route('/leaderboard/<board>/me')
+@login_required
+@read_only
+def get_leaderboard_around_me(board):
+    """Entries ranked around the current user"""
+    from app.services.leaderboard_service import LeaderboardService
+
+    try:
+        key = _leaderboard_key(board)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    radius = max(min(request.args.get('radius', 5, type=int), 50), 1)
+
+    service = LeaderboardService()
+    return jsonify({
+        'board': board,
+        'me': service.rank(key, current_user.id),
+        'entries': service.around(key, current_user.id, radius)
+    })
+
+
+@api_bp.route('/activity/calendar')
+@login_required
+def get_activity_calendar():
+    """Days the current user was active in a year (default: this year)"""
+    from datetime import date
+    from app.services.activity_service import ActivityService
+
+    year = request.args.get('year', date.today().year, type=int)
+    try:
+        days = ActivityService().calendar(current_user.id, year)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'year': year,
+        'days': days,
+        'active_days': len(days) if days is not None else None
+    })
+
+
+@api_bp.route('/activity/streaks')
+@login_required
+def get_activity_streaks():
+    """Current and longest streak of the current user"""
+    from datetime import date
+    from app.services.activity_service import ActivityService
+
+    first_year = current_user.created_at.year if current_user.created_at else date.today().year
+    return jsonify(ActivityService().streaks(current_user.id, first_year))
+
+
+@api_bp.route('/stats/history')
+@login_required
+@read_only
+def get_stats_history():
+    """Answer totals per day of the current user, as far back as their plan allows"""
+    from app.services.entitlement_service import EntitlementService
+    from app.services.stats_service import StatsService
+
+    max_days = EntitlementService().get(current_user.id)['limits']['max_stats_days']
+    days = max(1, min(request.args.get('days', max_days, type=int), max_days))
+
+    return jsonify({
+        'days': days,
+        'max_days': max_days,
+        'history': StatsService().history(
+            current_user.id,
+            days,
+            subject_id=request.args.get('subject_id', type=int),
+            topic_id=request.args.get('topic_id', type=int)
+        )
+    })
+
+
+@api_bp.route('/tests/history')
+@login_required
+@read_only
+def get_test_history():
+    """Completed tests of the current user, newest first, paginated by cursor"""
+    from flask import current_app
+    from app.services.history_service import HistoryService
+
+    per_page = min(request.args.get('per_page', current_app.config['TESTS_PER_PAGE'], type=int), 100)
+
+    try:
+        page = HistoryService().page(
+            current_user.id,
+            max(per_page, 1),
+            cursor=request.args.get('cursor'),
+            subject_id=request.args.get('subject_id', type=int),
+            since=_date_arg('from'),
+            until=_date_arg('to')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(page)
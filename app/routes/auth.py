@@ -5,6 +5,7 @@ from datetime import datetime
 from app import db
 from app.models.user import User, UserSubject
 from app.models.subscription import Subscription
+from app.services.dashboard_service import invalidate_dashboard
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -290,8 +291,8 @@ def onboarding():
 
         if not subject_ids:
             flash('Prosím, vyber aspoň jeden predmet', 'error')
-            from app.models.subject import Subject
-            subjects = Subject.query.filter_by(is_active=True).order_by(Subject.order_index).all()
+            from app.services.catalog_service import CatalogService
+            subjects = CatalogService().get().active_subjects()
             return render_template('auth/onboarding.html', subjects=subjects)
 
         for subject_id in subject_ids:
@@ -302,12 +303,13 @@ def onboarding():
             db.session.add(user_subject)
 
         db.session.commit()
+        invalidate_dashboard(current_user.id)
         flash(f'Vitaj v ŠtúdujSmart, {current_user.full_name}! 🎓', 'success')
 
         return redirect(url_for('dashboard.index'))
 
     # Get available subjects
-    from app.models.subject import Subject
-    subjects = Subject.query.filter_by(is_active=True).order_by(Subject.order_index).all()
+    from app.services.catalog_service import CatalogService
+    subjects = CatalogService().get().active_subjects()
 
     return render_template('auth/onboarding.html', subjects=subjects)
@@ -1,10 +1,10 @@
-from flask import Blueprint, render_template, redirect, url_for, request, jsonify, abort, flash
+from flask import Blueprint, current_app, render_template, redirect, url_for, request, jsonify, abort, flash
 from flask_login import login_required, current_user
-from datetime import datetime
+from datetime import date, datetime
 from app import db
-from app.models.subject import Subject
 from app.models.test import TestSession, UserAnswer
 from app.models.question import Question
+from app.utils.db_routing import read_only
 
 test_bp = Blueprint('test', __name__)
 
@@ -20,11 +20,25 @@ def get_ai_service():
     return AIService()
 
 
+def get_quota_service():
+    from app.services.quota_service import QuotaService
+    return QuotaService()
+
+
+def get_xp_service():
+    from app.services.xp_service import XPService
+    return XPService()
+
+
 @test_bp.route('/quick/<int:subject_id>')
 @login_required
 def quick_test(subject_id):
     """Quick test start page"""
-    subject = Subject.query.get_or_404(subject_id)
+    from app.services.catalog_service import CatalogService
+
+    subject = CatalogService().get().subject(subject_id)
+    if subject is None:
+        abort(404)
     return render_template('test/quick.html', subject=subject)
 
 
@@ -32,6 +46,14 @@ def quick_test(subject_id):
 @login_required
 def start_quick_test(subject_id):
     """Start a new quick test"""
+    # Check and consume today's test quota in one step
+    quota_service = get_quota_service()
+    quota_day = date.today()
+    allowed, used = quota_service.consume(current_user, 'tests', day=quota_day)
+    if not allowed:
+        flash('Dosiahol si denný limit testov pre tvoj plán', 'error')
+        return redirect(url_for('dashboard.index'))
+
     try:
         print(f"Step 1: Starting test for subject {subject_id}")
 
@@ -46,16 +68,14 @@ def start_quick_test(subject_id):
         )
         print(f"Step 3: Created test session: {test_session.id}")
 
-        # Update user streak
-        current_user.update_streak()
-        db.session.commit()
-
         return redirect(url_for('test.take_test', session_id=test_session.id))
 
     except Exception as e:
         import traceback
         print(f"ERROR: {e}")
         traceback.print_exc()
+        if used is not None:
+            quota_service.refund(current_user.id, 'tests', quota_day)
         flash('Chyba pri vytváraní testu', 'error')
         return redirect(url_for('dashboard.index'))
 
@@ -80,6 +100,7 @@ def take_test(session_id):
 
 @test_bp.route('/<int:session_id>/results')
 @login_required
+@read_only
 def results(session_id):
     """View test results"""
     test_session = TestSession.query.get_or_404(session_id)
@@ -89,14 +110,11 @@ def results(session_id):
         abort(403)
 
     # Get all answers
-    answers = UserAnswer.query.filter_by(
-        session_id=session_id
-    ).order_by(UserAnswer.id).all()
+    answers = UserAnswer.for_session(test_session).order_by(UserAnswer.id).all()
 
     # Calculate XP earned
-    xp_earned = test_session.score * 10  # 10 XP per correct answer
-    if test_session.percentage == 100:
-        xp_earned += 50  # Bonus for perfect score
+    from app.services.xp_service import test_awards
+    xp_earned = sum(amount for amount, _, _ in test_awards(test_session))
 
     return render_template(
         'test/results.html',
@@ -117,38 +135,71 @@ def test_route():
 @test_bp.route('/tests/<int:session_id>/questions', methods=['GET'])
 @login_required
 def api_get_questions(session_id):
-    """Get all questions for a test session"""
+    """
+    Get questions for a test session
+
+    Questions may still be arriving from background generation; the client
+    polls with ?offset=<questions it has> until `complete` is true. A test
+    that is short with nothing generating it is reported with `generating`
+    false, and the client restarts generation through
+    POST /tests/<id>/questions/generate. This endpoint never generates.
+    """
     test_session = TestSession.query.get_or_404(session_id)
 
     # Verify ownership
     if test_session.user_id != current_user.id:
         return jsonify({'error': 'Unauthorized'}), 403
 
-    # Get questions for this test
-    # For now, we'll query questions created for this topic
-    # In production, you'd have a proper many-to-many relationship
-    questions = Question.query.filter(
-        Question.topic_id.in_(test_session.topic_ids)
-    ).limit(test_session.total_questions).all()
+    offset = request.args.get('offset', 0, type=int)
+
+    # Flag first, then the question list: a generator finishing in between
+    # has appended its questions before clearing the flag
+    generating = get_test_service().is_generating(session_id)
+    db.session.refresh(test_session, ['question_ids'])
+
+    # Stored payloads of the questions assigned to this test, in the order
+    # they were picked; no ORM objects, nothing re-serialized
+    question_ids = test_session.question_ids or []
+    remaining = question_ids[offset:]
+    stored = dict(db.session.query(Question.id, Question.client_payload).filter(
+        Question.id.in_(remaining)
+    ).all()) if remaining else {}
+
+    # Questions from before payloads existed (until backfill-question-payloads runs)
+    missing = [q_id for q_id, payload in stored.items() if payload is None]
+    if missing:
+        for question in Question.query.filter(Question.id.in_(missing)).all():
+            stored[question.id] = question.build_client_payload()
+
+    payloads = [Question.with_id(q_id, stored[q_id]) for q_id in remaining if q_id in stored]
+    complete = not generating and len(question_ids) >= test_session.total_questions
+
+    body = '{"questions":[%s],"total":%d,"complete":%s,"generating":%s}' % (
+        ','.join(payloads),
+        test_session.total_questions,
+        'true' if complete else 'false',
+        'true' if generating else 'false'
+    )
+    return current_app.response_class(body, mimetype='application/json')
 
-    test_service = get_test_service()
 
-    # If no questions exist, generate them now
-    if not questions or len(questions) < test_session.total_questions:
-        questions = test_service._generate_questions_for_test(
-            test_session,
-            test_session.topic_ids,
-            test_session.total_questions
-        )
+@test_bp.route('/tests/<int:session_id>/questions/generate', methods=['POST'])
+@login_required
+def api_resume_generation(session_id):
+    """Restart generation of a test's missing questions (at most one generator per test)"""
+    test_session = TestSession.query.get_or_404(session_id)
+
+    # Verify ownership
+    if test_session.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    test_service = get_test_service()
+    started = test_service.resume_generation(test_session)
 
     return jsonify({
-        'questions': [{
-            'id': q.id,
-            'question_text': q.question_text,
-            'question_type': q.question_type,
-            'difficulty': q.difficulty,
-            'choices': q.choices
-        } for q in questions]
+        'success': True,
+        'started': started,
+        'generating': started or test_service.is_generating(session_id)
     })
 
 
@@ -170,8 +221,7 @@ def api_submit_answer(session_id):
     time_spent = data.get('time_spent', 0)
 
     # Check if already answered
-    existing = UserAnswer.query.filter_by(
-        session_id=session_id,
+    existing = UserAnswer.for_session(test_session).filter_by(
         question_id=question_id
     ).first()
 
@@ -230,20 +280,18 @@ def api_complete_test(session_id):
             test_session.percentage = 0
             db.session.commit()
 
-        # Award XP
-        xp_earned = test_session.score * 10
-        percentage = float(test_session.percentage) if test_session.percentage else 0
-        if percentage == 100:
-            xp_earned += 50  # Perfect score bonus
-
-        leveled_up = current_user.add_xp(xp_earned)
+        # Award XP (recorded once per test, safe to retry)
+        xp_service = get_xp_service()
+        award = xp_service.award_for_test(test_session)
         db.session.commit()
 
+        xp_service.publish(current_user.id, award, subject_id=test_session.subject_id)
+
         return jsonify({
             'success': True,
-            'xp_earned': xp_earned,
-            'leveled_up': leveled_up,
-            'new_level': current_user.level
+            'xp_earned': award['earned'],
+            'leveled_up': award['leveled_up'],
+            'new_level': award['level']
         })
 
     except Exception as e:
@@ -253,7 +301,8 @@ def api_complete_test(session_id):
 @login_required
 def api_get_explanation(answer_id):
     """Get AI explanation for an answer"""
-    answer = UserAnswer.query.get_or_404(answer_id)
+    # Partitioned table: the primary key is (id, answered_at)
+    answer = UserAnswer.query.filter_by(id=answer_id).first_or_404()
 
     # Verify ownership
     if answer.user_id != current_user.id:
@@ -265,6 +314,19 @@ def api_get_explanation(answer_id):
             'explanation': answer.ai_explanation
         })
 
+    # Fallback to template explanation if available
+    fallback = answer.question.explanation or 'Vysvetlenie nedostupné'
+
+    # AI explanations count against the plan's daily quota
+    quota_service = get_quota_service()
+    quota_day = date.today()
+    allowed, used = quota_service.consume(current_user, 'explanations', day=quota_day)
+    if not allowed:
+        return jsonify({
+            'explanation': fallback,
+            'limit_reached': True
+        })
+
     # Generate new explanation
     ai_service = get_ai_service()
 
@@ -288,8 +350,8 @@ def api_get_explanation(answer_id):
 
     except Exception as e:
         print(f"Error generating explanation: {e}")
-        # Fallback to template explanation if available
-        fallback = answer.question.explanation or 'Vysvetlenie nedostupné'
+        if used is not None:
+            quota_service.refund(current_user.id, 'explanations', quota_day)
         return jsonify({
             'explanation': fallback
         })
@@ -298,11 +360,35 @@ def api_get_explanation(answer_id):
 @login_required
 def create_test():
     """Create a new test session (used by dashboard)"""
+    from app.services.pool_service import DIFFICULTIES
+
+    # Get parameters from form or JSON
+    data = request.form if request.form else (request.get_json(silent=True) or {})
+    difficulty = data.get('difficulty') or 'medium'
+    if difficulty not in DIFFICULTIES:
+        flash('Neplatná obťažnosť testu', 'error')
+        return redirect(url_for('dashboard.index'))
+
+    # Generation is progressive, so an unbounded count would start that many AI calls
     try:
-        # Get parameters from form or JSON
-        subject_id = request.form.get('subject_id') or request.get_json().get('subject_id')
-        topic_id = request.form.get('topic_id') or request.get_json().get('topic_id')
-        num_questions = int(request.form.get('num_questions', 10) or request.get_json().get('num_questions', 10))
+        num_questions = int(data.get('num_questions') or 10)
+    except (TypeError, ValueError):
+        flash('Neplatný počet otázok', 'error')
+        return redirect(url_for('dashboard.index'))
+    num_questions = max(min(num_questions, current_app.config['TEST_MAX_QUESTIONS']),
+                        current_app.config['TEST_MIN_QUESTIONS'])
+
+    # Check and consume today's test quota in one step
+    quota_service = get_quota_service()
+    quota_day = date.today()
+    allowed, used = quota_service.consume(current_user, 'tests', day=quota_day)
+    if not allowed:
+        flash('Dosiahol si denný limit testov pre tvoj plán', 'error')
+        return redirect(url_for('dashboard.index'))
+
+    try:
+        subject_id = data.get('subject_id')
+        topic_id = data.get('topic_id')
 
         test_service = get_test_service()
 
@@ -312,7 +398,8 @@ def create_test():
             test_session = test_service.create_topic_test(
                 user_id=current_user.id,
                 topic_id=int(topic_id),
-                num_questions=num_questions
+                num_questions=num_questions,
+                difficulty=difficulty
             )
         else:
             # Quick test for subject
@@ -322,10 +409,6 @@ def create_test():
                 num_questions=num_questions
             )
 
-        # Update user streak
-        current_user.update_streak()
-        db.session.commit()
-
         # Redirect to take test
         return redirect(url_for('test.take_test', session_id=test_session.id))
 
@@ -333,5 +416,7 @@ def create_test():
         import traceback
         print(f"ERROR: {e}")
         traceback.print_exc()
+        if used is not None:
+            quota_service.refund(current_user.id, 'tests', quota_day)
         flash('Chyba pri vytváraní testu', 'error')
         return redirect(url_for('dashboard.index'))
\ No newline at end of file
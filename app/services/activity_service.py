@@ -0,0 +1,176 @@
+"""
+Daily activity bitmaps for streaks and calendar heatmaps
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from redis.exceptions import RedisError
+from app import db, redis_client
+from app.models.test import TestSession
+
+
+def activity_key(user_id: int, year: int) -> str:
+    """Bitmap of a user's active days in a year, one bit per day of year"""
+    return f"activity:{user_id}:{year}"
+
+
+# Years a bitmap can cover: date() needs the following New Year too
+MIN_YEAR = date.min.year
+MAX_YEAR = date.max.year - 1
+
+
+def _days_in_year(year: int) -> int:
+    return (date(year + 1, 1, 1) - date(year, 1, 1)).days
+
+
+def _to_int(bitmap: Optional[bytes], days: int) -> int:
+    """
+    Bitmap as an integer with the last day of the year in bit 0
+
+    Redis stores offset 0 in the high bit of the first byte, so reading
+    the bytes big-endian keeps days in chronological order.
+    """
+    size = (days + 7) // 8
+    bitmap = (bitmap or b'')[:size].ljust(size, b'\0')
+    return int.from_bytes(bitmap, 'big') >> (size * 8 - days)
+
+
+def _trailing_ones(bits: int) -> int:
+    """Length of the run of set bits ending at bit 0"""
+    return (~bits & (bits + 1)).bit_length() - 1
+
+
+def _longest_run(bits: int) -> int:
+    """Length of the longest run of set bits"""
+    longest = 0
+    while bits:
+        bits &= bits >> 1
+        longest += 1
+    return longest
+
+
+class ActivityService:
+    """Service for recording and reading daily activity"""
+
+    def mark(self, user_id: int, day: Optional[date] = None):
+        """Mark a user active on a day (today by default)"""
+        day = day or date.today()
+        try:
+            redis_client.setbit(activity_key(user_id, day.year), day.timetuple().tm_yday - 1, 1)
+        except RedisError as e:
+            # `flask rebuild-activity` repairs the bitmaps
+            print(f"Activity update failed: {e}")
+
+    def _history(self, user_id: int, first_year: int, today: date) -> int:
+        """All activity from first_year up to today, today in bit 0"""
+        years = list(range(first_year, today.year + 1))
+        bitmaps = redis_client.mget([activity_key(user_id, year) for year in years])
+
+        bits = 0
+        for year, bitmap in zip(years, bitmaps):
+            days = _days_in_year(year)
+            bits = (bits << days) | _to_int(bitmap, days)
+
+        # Drop the rest of this year
+        return bits >> (_days_in_year(today.year) - today.timetuple().tm_yday)
+
+    def current_streak(self, user_id: int, today: Optional[date] = None) -> Optional[int]:
+        """
+        Consecutive active days ending today
+
+        A streak that ended yesterday still counts until today is over.
+
+        Returns:
+            Streak length, or None if Redis is unavailable
+        """
+        today = today or date.today()
+        try:
+            # Streaks can cross New Year, so read last year too
+            bits = self._history(user_id, today.year - 1, today)
+        except RedisError as e:
+            print(f"Activity read failed: {e}")
+            return None
+
+        if not bits & 1:
+            bits >>= 1
+        return _trailing_ones(bits)
+
+    def streaks(self, user_id: int, first_year: int, today: Optional[date] = None) -> Dict:
+        """
+        Current and longest streak since the start of first_year
+
+        Returns:
+            {'current', 'longest'}, both None if Redis is unavailable
+        """
+        today = today or date.today()
+        try:
+            bits = self._history(user_id, min(first_year, today.year - 1), today)
+        except RedisError as e:
+            print(f"Activity read failed: {e}")
+            return {'current': None, 'longest': None}
+
+        current = bits if bits & 1 else bits >> 1
+        return {
+            'current': _trailing_ones(current),
+            'longest': _longest_run(bits)
+        }
+
+    def calendar(self, user_id: int, year: int) -> Optional[List[str]]:
+        """
+        Active days in a year as ISO dates, from a single read
+
+        Returns:
+            ISO dates, or None if Redis is unavailable
+
+        Raises:
+            ValueError: year is outside MIN_YEAR..MAX_YEAR
+        """
+        if not MIN_YEAR <= year <= MAX_YEAR:
+            raise ValueError(f"Year must be between {MIN_YEAR} and {MAX_YEAR}")
+
+        days = _days_in_year(year)
+        try:
+            bits = _to_int(redis_client.get(activity_key(user_id, year)), days)
+        except RedisError as e:
+            print(f"Activity read failed: {e}")
+            return None
+
+        start = date(year, 1, 1)
+        return [
+            (start + timedelta(days=offset)).isoformat()
+            for offset in range(days)
+            if bits >> (days - 1 - offset) & 1
+        ]
+
+    def rebuild(self, chunk_size: int = 1000) -> int:
+        """
+        Rebuild bitmaps from test history
+
+        Marks every day a user started a test. Existing bits are kept,
+        so running this never loses activity.
+
+        Returns:
+            Number of active days marked
+        """
+        total = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(
+                TestSession.id, TestSession.user_id, TestSession.started_at
+            ).filter(
+                TestSession.id > last_id,
+                TestSession.started_at.isnot(None)
+            ).order_by(TestSession.id).limit(chunk_size).all()
+
+            if not rows:
+                break
+
+            days = {(user_id, started_at.date()) for _, user_id, started_at in rows}
+            pipe = redis_client.pipeline(transaction=False)
+            for user_id, day in days:
+                pipe.setbit(activity_key(user_id, day.year), day.timetuple().tm_yday - 1, 1)
+            pipe.execute()
+
+            total += len(days)
+            last_id = rows[-1][0]
+
+        return total
@@ -0,0 +1,324 @@
+"""
+Adaptive question selection (Elo-style ability and difficulty ratings)
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from flask import current_app
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models.question import Question
+from app.models.subject import Topic
+
+# Starting difficulty for questions that have not been answered yet
+DIFFICULTY_RATINGS = {
+    'easy': -1.0,
+    'medium': 0.0,
+    'hard': 1.0
+}
+
+# Aim for questions the student answers correctly ~70% of the time
+TARGET_SUCCESS_RATE = 0.7
+
+# Update step sizes
+ABILITY_K = 0.3
+DIFFICULTY_K = 0.4
+DIFFICULTY_K_MIN = 0.05
+
+# Extra candidates fetched per slot when recently seen questions are filtered out
+SEEN_OVERSAMPLE = 3
+
+
+def expected_score(ability: float, difficulty: float) -> float:
+    """Probability that a student with `ability` answers an item of `difficulty` correctly"""
+    return 1.0 / (1.0 + math.exp(difficulty - ability))
+
+
+def initial_rating(difficulty: Optional[str]) -> float:
+    """Starting rating for a question with the given difficulty label"""
+    return DIFFICULTY_RATINGS.get(difficulty, 0.0)
+
+
+class ItemIndex:
+    """
+    Questions of one subject, kept sorted by difficulty rating per topic
+
+    Picking questions is a binary search plus a walk, O(log n + k). Adding
+    or moving a question bisects to its slot but then shifts the topic's
+    list, O(n) in the topic's size; that is a memmove of a few thousand
+    pointers at most, and ratings move only once per completed test.
+    """
+
+    def __init__(self, subject_id: int, rows: Iterable):
+        self.subject_id = subject_id
+        self.built_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        # topic_id -> parallel sorted lists of (rating, question_id) and ratings
+        self._items: Dict[int, List[tuple]] = {}
+        self._keys: Dict[int, List[float]] = {}
+        # question_id -> (topic_id, rating)
+        self._positions: Dict[int, tuple] = {}
+
+        for question_id, topic_id, rating in sorted(rows, key=lambda r: (r[2], r[0])):
+            self._items.setdefault(topic_id, []).append((rating, question_id))
+            self._keys.setdefault(topic_id, []).append(rating)
+            self._positions[question_id] = (topic_id, rating)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def add(self, question_id: int, topic_id: int, rating: float):
+        """Insert or move a question (O(n) in the topic's size, see above)"""
+        with self._lock:
+            self._remove(question_id)
+            items = self._items.setdefault(topic_id, [])
+            keys = self._keys.setdefault(topic_id, [])
+            pos = bisect_left(items, (rating, question_id))
+            items.insert(pos, (rating, question_id))
+            keys.insert(pos, rating)
+            self._positions[question_id] = (topic_id, rating)
+
+    def update(self, question_id: int, rating: float):
+        """Move a question to its new rating"""
+        entry = self._positions.get(question_id)
+        if entry:
+            self.add(question_id, entry[0], rating)
+
+    def _remove(self, question_id: int):
+        entry = self._positions.pop(question_id, None)
+        if not entry:
+            return
+        topic_id, rating = entry
+        items = self._items[topic_id]
+        pos = bisect_left(items, (rating, question_id))
+        if pos < len(items) and items[pos] == (rating, question_id):
+            del items[pos]
+            del self._keys[topic_id][pos]
+
+    def nearest(
+            self,
+            topic_id: int,
+            target: float,
+            n: int,
+            exclude: Optional[Set[int]] = None
+    ) -> List[int]:
+        """
+        Question IDs of a topic closest to a target rating
+
+        Binary search for the target, then walk outwards - O(log n + k).
+        """
+        with self._lock:
+            items = self._items.get(topic_id) or []
+            keys = self._keys.get(topic_id) or []
+
+            hi = bisect_left(keys, target)
+            lo = hi - 1
+            selected = []
+            while len(selected) < n and (lo >= 0 or hi < len(items)):
+                if hi >= len(items) or (lo >= 0 and target - keys[lo] <= keys[hi] - target):
+                    question_id = items[lo][1]
+                    lo -= 1
+                else:
+                    question_id = items[hi][1]
+                    hi += 1
+
+                if exclude and question_id in exclude:
+                    continue
+                selected.append(question_id)
+
+            return selected
+
+
+# Per-worker registry of item indexes, keyed by subject ID
+_indexes: Dict[int, ItemIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+class AdaptiveService:
+    """Service for adaptive question selection and rating updates"""
+
+    def get_index(self, subject_id: int) -> ItemIndex:
+        """Get the item index for a subject, building it on first use"""
+        ttl = current_app.config.get('ITEM_INDEX_TTL', 300)
+        index = _indexes.get(subject_id)
+
+        if index is None or time.monotonic() - index.built_at > ttl:
+            with _indexes_lock:
+                index = _indexes.get(subject_id)
+                if index is None or time.monotonic() - index.built_at > ttl:
+                    index = self._build_index(subject_id)
+                    _indexes[subject_id] = index
+
+        return index
+
+    def _build_index(self, subject_id: int) -> ItemIndex:
+        """Load (id, topic, rating) for every question of a subject"""
+        rows = db.session.query(
+            Question.id,
+            Question.topic_id,
+            Question.difficulty_rating,
+            Question.difficulty
+        ).join(Topic, Topic.id == Question.topic_id).filter(
+            Topic.subject_id == subject_id
+        ).all()
+
+        return ItemIndex(subject_id, [
+            (q_id, topic_id, rating if rating is not None else initial_rating(difficulty))
+            for q_id, topic_id, rating, difficulty in rows
+        ])
+
+    def add_questions(self, subject_id: int, questions: Iterable[Question]):
+        """Make freshly generated questions available for selection"""
+        index = _indexes.get(subject_id)
+        if index is None:
+            return  # Picked up when the index is first built
+
+        for question in questions:
+            rating = question.difficulty_rating
+            if rating is None:
+                rating = initial_rating(question.difficulty)
+            index.add(question.id, question.topic_id, rating)
+
+    def select_questions(
+            self,
+            subject_id: int,
+            abilities: Dict[int, float],
+            num_questions: int,
+            exclude: Optional[Set[int]] = None,
+            is_seen: Optional[Callable[[List[int]], Set[int]]] = None
+    ) -> List[int]:
+        """
+        Pick bank questions near the student's ability for each topic
+
+        Args:
+            subject_id: Subject ID
+            abilities: Ability rating per topic ID to draw from
+            num_questions: Number of questions wanted
+            exclude: Question IDs that must not be selected
+            is_seen: Optional batch check returning the IDs the student saw recently
+
+        Returns:
+            Question IDs, at most num_questions (fewer if the bank is thin)
+        """
+        if not abilities or num_questions <= 0:
+            return []
+
+        index = self.get_index(subject_id)
+        offset = math.log(TARGET_SUCCESS_RATE / (1 - TARGET_SUCCESS_RATE))
+        window = num_questions * (SEEN_OVERSAMPLE if is_seen else 1)
+
+        # Candidates closest to each topic's target, nearest first
+        topic_ids = list(abilities)
+        candidates = {}
+        for topic_id in topic_ids:
+            target = (abilities[topic_id] or 0.0) - offset
+            candidates[topic_id] = index.nearest(topic_id, target, window, exclude=exclude)
+
+        if is_seen:
+            seen = is_seen([q_id for ids in candidates.values() for q_id in ids])
+            candidates = {
+                topic_id: [q_id for q_id in ids if q_id not in seen]
+                for topic_id, ids in candidates.items()
+            }
+
+        # Spread evenly across topics, then let topics with spare questions top up
+        selected = []
+        for i, topic_id in enumerate(topic_ids):
+            share = num_questions // len(topic_ids) + (1 if i < num_questions % len(topic_ids) else 0)
+            selected.extend(candidates[topic_id][:share])
+            candidates[topic_id] = candidates[topic_id][share:]
+
+        for topic_id in topic_ids:
+            if len(selected) >= num_questions:
+                break
+            selected.extend(candidates[topic_id][:num_questions - len(selected)])
+
+        return selected
+
+    def record_answers(self, progress_by_topic: Dict, answers: Iterable):
+        """
+        Update student abilities and question difficulties from a completed test
+
+        Question statistics are changed in SQL relative to the stored
+        values, so tests completing at the same time don't overwrite each
+        other's updates. The item indexes pick the new ratings up once the
+        transaction commits; a rollback leaves them untouched.
+
+        Args:
+            progress_by_topic: UserTopicProgress per topic ID (modified in place)
+            answers: UserAnswer objects with their question loaded
+        """
+        answers = list(answers)
+        # question_id -> [rating change, answers, correct answers, rating before this test]
+        changes: Dict[int, List] = {}
+
+        for answer in answers:
+            question = answer.question
+            if question is None:
+                continue
+
+            progress = progress_by_topic.get(question.topic_id)
+            if progress is None:
+                continue
+
+            ability = progress.ability_rating or 0.0
+            difficulty = question.difficulty_rating
+            if difficulty is None:
+                difficulty = initial_rating(question.difficulty)
+
+            outcome = 1.0 if answer.is_correct else 0.0
+            surprise = outcome - expected_score(ability, difficulty)
+
+            # Items settle as they collect responses; students keep moving
+            times_used = question.times_used or 0
+            item_k = max(DIFFICULTY_K / (1 + times_used / 25), DIFFICULTY_K_MIN)
+
+            progress.ability_rating = ability + ABILITY_K * surprise
+
+            change = changes.setdefault(question.id, [0.0, 0, 0, difficulty])
+            change[0] -= item_k * surprise
+            change[1] += 1
+            change[2] += int(outcome)
+
+        # In ID order, so two tests sharing questions lock rows in the same order
+        ratings = _pending_ratings(db.session)
+        for question_id in sorted(changes):
+            delta, answered, correct, difficulty = changes[question_id]
+            times_used = func.coalesce(Question.times_used, 0)
+            ratings[question_id] = db.session.execute(
+                update(Question).where(Question.id == question_id).values(
+                    difficulty_rating=func.coalesce(Question.difficulty_rating, difficulty) + delta,
+                    avg_correct_rate=(func.coalesce(Question.avg_correct_rate, 0) * times_used + correct * 100)
+                    / (times_used + answered),
+                    times_used=times_used + answered
+                ).returning(Question.difficulty_rating),
+                execution_options={'synchronize_session': False}
+            ).scalar()
+
+        # Loaded questions would show the values from before the update
+        for answer in answers:
+            if answer.question is not None and answer.question.id in changes:
+                db.session.expire(answer.question, ['difficulty_rating', 'avg_correct_rate', 'times_used'])
+
+
+def _pending_ratings(session) -> Dict[int, float]:
+    """New question ratings of a transaction, applied to the item indexes when it commits"""
+    return session.info.setdefault('adaptive_ratings', {})
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_ratings(session):
+    ratings = session.info.pop('adaptive_ratings', None)
+    if ratings:
+        for index in list(_indexes.values()):
+            for question_id, rating in ratings.items():
+                index.update(question_id, rating)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_ratings(session):
+    session.info.pop('adaptive_ratings', None)
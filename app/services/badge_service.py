@@ -0,0 +1,210 @@
+"""
+Event-driven badge evaluation
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.models.gamification import Badge, UserBadge
+from app.models.stats import UserStats
+from app.models.test import TestSession, UserAnswer
+from app.models.user import User
+
+# Condition types where a lower observed value is better
+LOWER_IS_BETTER = {'test_time'}
+
+# Reload badge definitions at most this often per worker
+RULES_TTL = 300
+
+
+class RuleIndex:
+    """Active badges grouped by condition type, sorted by condition value"""
+
+    def __init__(self, badges):
+        self.loaded_at = time.monotonic()
+        self._values: Dict[str, List[int]] = {}
+        self._badges: Dict[str, List[tuple]] = {}
+
+        for badge_id, condition_type, condition_value, xp_reward in sorted(
+                badges, key=lambda b: (b[1] or '', b[2] or 0)):
+            if not condition_type or condition_value is None:
+                continue
+            self._values.setdefault(condition_type, []).append(condition_value)
+            self._badges.setdefault(condition_type, []).append((badge_id, xp_reward or 0))
+
+    def matching(self, condition_type: str, observed) -> List[tuple]:
+        """(badge_id, xp_reward) of badges of one type that `observed` satisfies"""
+        values = self._values.get(condition_type)
+        if not values or observed is None:
+            return []
+
+        badges = self._badges[condition_type]
+        if condition_type in LOWER_IS_BETTER:
+            return badges[bisect_left(values, observed):]
+        return badges[:bisect_right(values, observed)]
+
+
+_rules = None
+_rules_lock = threading.Lock()
+
+
+class BadgeService:
+    """Service for awarding badges"""
+
+    def get_rules(self) -> RuleIndex:
+        """Badge rule index, loaded once per worker and refreshed periodically"""
+        global _rules
+        if _rules is None or time.monotonic() - _rules.loaded_at > RULES_TTL:
+            with _rules_lock:
+                if _rules is None or time.monotonic() - _rules.loaded_at > RULES_TTL:
+                    _rules = RuleIndex(db.session.query(
+                        Badge.id, Badge.condition_type, Badge.condition_value, Badge.xp_reward
+                    ).filter(Badge.is_active == True).all())
+        return _rules
+
+    def evaluate(self, user_id: int, observed: Dict[str, float]) -> List[tuple]:
+        """
+        Award badges whose condition is met by the values that just changed
+
+        Only condition types present in `observed` are checked. Runs inside
+        the caller's transaction.
+
+        Args:
+            user_id: User ID
+            observed: Current value per condition type, e.g.
+                {'tests_completed': 12, 'test_accuracy': 95.0}
+
+        Returns:
+            (badge_id, xp_reward) of newly earned badges
+        """
+        rules = self.get_rules()
+        candidates = {}
+        for condition_type, value in observed.items():
+            for badge_id, xp_reward in rules.matching(condition_type, value):
+                candidates[badge_id] = xp_reward
+
+        if not candidates:
+            return []
+
+        return [
+            (badge_id, candidates[badge_id])
+            for _, badge_id in self._insert_awards([(user_id, badge_id) for badge_id in candidates])
+        ]
+
+    def _insert_awards(self, pairs) -> List[tuple]:
+        """
+        Bulk insert (user_id, badge_id) awards in one statement
+
+        Awards already earned are skipped by uix_user_badge; only the
+        newly inserted pairs are returned.
+        """
+        now = datetime.utcnow()
+        table = UserBadge.__table__
+        return [tuple(row) for row in db.session.execute(
+            insert(table)
+            .values([{'user_id': u, 'badge_id': b, 'earned_at': now} for u, b in pairs])
+            .on_conflict_do_nothing(constraint='uix_user_badge')
+            .returning(table.c.user_id, table.c.badge_id)
+        ).all()]
+
+    def backfill(self, chunk_size: int = 500, award_xp: bool = False) -> int:
+        """
+        Award badges existing users already qualify for
+
+        Evaluates every condition type that can be derived from history
+        ('accuracy_improvement' can't and is skipped).
+
+        Args:
+            chunk_size: Users per batch
+            award_xp: Also grant the badges' XP rewards
+
+        Returns:
+            Number of badges awarded
+        """
+        from app.services.dashboard_service import invalidate_dashboard
+        from app.services.xp_service import XPService
+
+        xp_service = XPService()
+        rules = self.get_rules()
+        total = 0
+        last_id = 0
+        while True:
+            users = db.session.query(User.id, User.streak_days).filter(
+                User.id > last_id
+            ).order_by(User.id).limit(chunk_size).all()
+
+            if not users:
+                break
+
+            user_ids = [user_id for user_id, _ in users]
+            stats = {s.user_id: s for s in UserStats.query.filter(UserStats.user_id.in_(user_ids)).all()}
+
+            # Answers per completed test: like complete_test, only tests with
+            # every question answered count for 'test_time'
+            answered = db.session.query(
+                UserAnswer.session_id,
+                func.count(UserAnswer.id).label('answered')
+            ).join(TestSession, db.and_(
+                TestSession.id == UserAnswer.session_id,
+                UserAnswer.answered_at >= TestSession.started_at
+            )).filter(
+                TestSession.user_id.in_(user_ids),
+                TestSession.status == 'completed'
+            ).group_by(UserAnswer.session_id).subquery()
+
+            bests = {
+                user_id: (best_accuracy, best_time)
+                for user_id, best_accuracy, best_time in db.session.query(
+                    TestSession.user_id,
+                    func.max(TestSession.percentage),
+                    func.min(TestSession.time_spent_seconds).filter(
+                        answered.c.answered >= TestSession.total_questions
+                    )
+                ).outerjoin(answered, answered.c.session_id == TestSession.id).filter(
+                    TestSession.user_id.in_(user_ids),
+                    TestSession.status == 'completed'
+                ).group_by(TestSession.user_id).all()
+            }
+
+            awards = {}
+            for user_id, streak_days in users:
+                user_stats = stats.get(user_id)
+                best_accuracy, best_time = bests.get(user_id, (None, None))
+                observed = {
+                    'tests_completed': user_stats.tests_completed if user_stats else 0,
+                    'tests_per_subject': max(
+                        (s['tests'] for s in (user_stats.subject_stats or {}).values()), default=0
+                    ) if user_stats else 0,
+                    'test_accuracy': float(best_accuracy) if best_accuracy is not None else None,
+                    'test_time': best_time,
+                    'streak_days': streak_days or 0
+                }
+                for condition_type, value in observed.items():
+                    for badge_id, xp_reward in rules.matching(condition_type, value):
+                        awards[(user_id, badge_id)] = xp_reward
+
+            if awards:
+                inserted = self._insert_awards(awards)
+
+                xp_results = {}
+                if award_xp:
+                    per_user = {}
+                    for user_id, badge_id in inserted:
+                        per_user.setdefault(user_id, []).append((awards[(user_id, badge_id)], 'badge', badge_id))
+                    xp_results = {user_id: xp_service.award(user_id, user_awards)
+                                  for user_id, user_awards in per_user.items()}
+
+                db.session.commit()
+                for user_id, result in xp_results.items():
+                    xp_service.publish(user_id, result)
+                for user_id in {user_id for user_id, _ in inserted}:
+                    invalidate_dashboard(user_id)
+                total += len(inserted)
+
+            last_id = user_ids[-1]
+
+        return total
@@ -0,0 +1,194 @@
+"""
+Subjects and topics, cached per worker as immutable snapshots
+
+The catalog changes a few times a year, so every worker keeps a
+snapshot and rebuilds it only when the global version in Redis moves
+on, which happens after every committed subject or topic change. The
+API payloads are serialized once per snapshot and served with strong
+ETags.
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from flask import current_app, g, has_app_context
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app import redis_client
+from app.models.subject import Subject, Topic
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def _etag(payload: bytes) -> str:
+    return hashlib.sha1(payload).hexdigest()
+
+
+class Catalog:
+    """
+    Snapshot of all subjects and topics
+
+    Entries are plain dicts shared by every request in the worker; treat
+    them as read-only.
+    """
+
+    def __init__(self, version: Optional[int], subjects: List[Dict], topics: List[Dict]):
+        self.version = version
+        self.built_at = time.monotonic()
+
+        self._subjects = {s['id']: s for s in subjects}
+        self._active_subjects = tuple(s for s in subjects if s['is_active'])
+
+        by_subject: Dict[int, List[Dict]] = {}
+        for topic in topics:
+            by_subject.setdefault(topic['subject_id'], []).append(topic)
+        self._topics: Dict[int, Tuple[Dict, ...]] = {
+            subject_id: tuple(items) for subject_id, items in by_subject.items()
+        }
+
+        # API payloads: serialized once, served as-is
+        self.subjects_json = json.dumps([{
+            'id': s['id'],
+            'name': s['name_sk'],
+            'slug': s['slug'],
+            'icon': s['icon'],
+            'color': s['color']
+        } for s in self._active_subjects], ensure_ascii=False).encode()
+        self.subjects_etag = _etag(self.subjects_json)
+
+        self._topics_json: Dict[int, Tuple[bytes, str]] = {}
+        for subject_id in self._subjects:
+            payload = json.dumps([{
+                'id': t['id'],
+                'name': t['name_sk'],
+                'slug': t['slug'],
+                'difficulty': t['difficulty']
+            } for t in self.topics(subject_id)], ensure_ascii=False).encode()
+            self._topics_json[subject_id] = (payload, _etag(payload))
+
+    def subject(self, subject_id: int) -> Optional[Dict]:
+        """Any subject, active or not"""
+        return self._subjects.get(subject_id)
+
+    def active_subjects(self) -> Tuple[Dict, ...]:
+        """Active subjects in display order"""
+        return self._active_subjects
+
+    def topics(self, subject_id: int) -> Tuple[Dict, ...]:
+        """Active topics of a subject in display order"""
+        return self._topics.get(subject_id, ())
+
+    def topics_json(self, subject_id: int) -> Tuple[bytes, str]:
+        """(payload, ETag) of a subject's topics; an empty list for unknown subjects"""
+        if subject_id not in self._topics_json:
+            payload = b'[]'
+            return payload, _etag(payload)
+        return self._topics_json[subject_id]
+
+
+# Per-worker snapshot
+_catalog: Optional[Catalog] = None
+_catalog_lock = threading.Lock()
+
+
+def _current_version() -> Optional[int]:
+    """Global catalog version, read from Redis at most once per request"""
+    if has_app_context() and '_catalog_version' in g:
+        return g._catalog_version
+
+    try:
+        version = int(redis_client.get(CATALOG_VERSION_KEY) or 0)
+    except RedisError as e:
+        print(f"Catalog version read failed: {e}")
+        version = None
+
+    if has_app_context():
+        g._catalog_version = version
+    return version
+
+
+class CatalogService:
+    """Service for reading subjects and topics without touching the database"""
+
+    def get(self) -> Catalog:
+        """
+        Current catalog snapshot, built on first use
+
+        Rebuilt when the global version changes, or after CATALOG_TTL
+        seconds in case a version bump was lost.
+        """
+        global _catalog
+        version = _current_version()
+        catalog = _catalog
+
+        if self._is_stale(catalog, version):
+            with _catalog_lock:
+                catalog = _catalog
+                if self._is_stale(catalog, version):
+                    catalog = self._build(version)
+                    _catalog = catalog
+
+        return catalog
+
+    def _is_stale(self, catalog: Optional[Catalog], version: Optional[int]) -> bool:
+        if catalog is None:
+            return True
+        if version is not None and catalog.version != version:
+            return True
+        return time.monotonic() - catalog.built_at > current_app.config['CATALOG_TTL']
+
+    def _build(self, version: Optional[int]) -> Catalog:
+        """Load every subject and active topic (two queries)"""
+        subjects = [{
+            'id': s.id,
+            'name_sk': s.name_sk,
+            'name_en': s.name_en,
+            'slug': s.slug,
+            'icon': s.icon,
+            'color': s.color,
+            'is_active': bool(s.is_active)
+        } for s in Subject.query.order_by(Subject.order_index, Subject.id).all()]
+
+        topics = [{
+            'id': t.id,
+            'subject_id': t.subject_id,
+            'parent_topic_id': t.parent_topic_id,
+            'name_sk': t.name_sk,
+            'slug': t.slug,
+            'difficulty': t.difficulty
+        } for t in Topic.query.filter_by(is_active=True).order_by(Topic.order_index, Topic.id).all()]
+
+        return Catalog(version, subjects, topics)
+
+    def bump_version(self):
+        """Make every worker rebuild its snapshot"""
+        try:
+            redis_client.incr(CATALOG_VERSION_KEY)
+        except RedisError as e:
+            print(f"Catalog version bump failed, snapshots refresh within CATALOG_TTL: {e}")
+
+
+# Bumped only once the change commits, so no worker caches a rolled-back catalog
+@event.listens_for(Subject, 'after_insert')
+@event.listens_for(Subject, 'after_update')
+@event.listens_for(Subject, 'after_delete')
+@event.listens_for(Topic, 'after_insert')
+@event.listens_for(Topic, 'after_update')
+@event.listens_for(Topic, 'after_delete')
+def _catalog_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['catalog_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_if_changed(session):
+    if session.info.pop('catalog_changed', None):
+        CatalogService().bump_version()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed(session):
+    session.info.pop('catalog_changed', None)
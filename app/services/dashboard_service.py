@@ -0,0 +1,167 @@
+"""
+Dashboard view-model, cached per user in Redis
+"""
+import json
+from datetime import datetime
+from typing import Dict
+from flask import current_app
+from redis.exceptions import RedisError
+from sqlalchemy.orm import joinedload
+from app import db, redis_client
+from app.models.subject import Topic, UserTopicProgress
+from app.models.test import TestSession
+from app.models.gamification import UserBadge
+from app.services.catalog_service import CatalogService
+from app.services.stats_service import StatsService
+from app.utils import metrics
+
+# Last good copy, served if rebuilding the dashboard fails
+STALE_TTL = 7 * 86400
+
+
+def dashboard_key(user_id: int) -> str:
+    return f"dashboard:{user_id}"
+
+
+def invalidate_dashboard(user_id: int):
+    """
+    Drop a user's cached dashboard after their data changed
+
+    Call after committing: a completed test, an awarded badge or a change
+    of selected subjects. The stale copy is kept as a fallback.
+    """
+    try:
+        redis_client.delete(dashboard_key(user_id))
+    except RedisError as e:
+        print(f"Dashboard cache invalidation failed: {e}")
+
+
+class DashboardService:
+    """Service for building and caching dashboard data"""
+
+    def get_context(self, user) -> Dict:
+        """Dashboard template data for a user, from cache when possible"""
+        key = dashboard_key(user.id)
+
+        try:
+            cached = redis_client.get(key)
+        except RedisError:
+            cached = None
+
+        if cached:
+            metrics.incr('dashboard_cache.hit')
+            return self._load(cached)
+
+        metrics.incr('dashboard_cache.miss')
+        try:
+            context = self.build_context(user)
+        except Exception as e:
+            try:
+                stale = redis_client.get(f"{key}:stale")
+            except RedisError:
+                stale = None
+            if not stale:
+                raise
+            print(f"Dashboard rebuild failed, serving stale copy: {e}")
+            metrics.incr('dashboard_cache.stale')
+            return self._load(stale)
+
+        payload = json.dumps(context)
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.setex(key, current_app.config['CACHE_TTL'], payload)
+            pipe.setex(f"{key}:stale", STALE_TTL, payload)
+            pipe.execute()
+        except RedisError as e:
+            print(f"Dashboard cache write failed: {e}")
+
+        return self._load(payload)
+
+    def build_context(self, user) -> Dict:
+        """Query everything the dashboard shows (JSON-serializable)"""
+        # Get user's subjects (from the catalog snapshot, no query)
+        catalog = CatalogService().get()
+        user_subjects = [us.subject_id for us in user.user_subjects if us.is_active]
+        subjects = [catalog.subject(subject_id) for subject_id in user_subjects if catalog.subject(subject_id)]
+
+        # Get test statistics from the rollup (one row, maintained by complete_test)
+        stats = StatsService().get(user.id)
+        tests_completed = stats.tests_completed if stats else 0
+        tests_this_week = stats.tests_in_last_days(7) if stats else 0
+        avg_accuracy = round(stats.avg_accuracy, 1) if stats else 0
+
+        # Get progress for each subject (one grouped query)
+        subject_progress = UserTopicProgress.subject_progress(
+            user.id, [s['id'] for s in subjects]
+        )
+        progress_data = {
+            subject['id']: subject_progress.get(subject['id'], {'accuracy': 0, 'topics_count': 0})
+            for subject in subjects
+        }
+
+        # Get weak topics (accuracy < 60%)
+        weak_topics = db.session.query(
+            UserTopicProgress, Topic
+        ).join(Topic).filter(
+            UserTopicProgress.user_id == user.id,
+            UserTopicProgress.accuracy_rate < 60
+        ).order_by(UserTopicProgress.accuracy_rate.asc()).limit(3).all()
+
+        # Get recent badges (with their badge, in the same query)
+        recent_badges = UserBadge.query.options(joinedload(UserBadge.badge)).filter_by(
+            user_id=user.id
+        ).order_by(UserBadge.earned_at.desc()).limit(5).all()
+
+        # Get recent tests
+        recent_tests = TestSession.query.filter_by(
+            user_id=user.id,
+            status='completed'
+        ).order_by(TestSession.completed_at.desc()).limit(5).all()
+
+        return {
+            'subjects': [self._subject(s) for s in subjects],
+            'progress_data': progress_data,
+            'tests_completed': tests_completed,
+            'tests_this_week': tests_this_week,
+            'avg_accuracy': float(avg_accuracy),
+            'weak_topics': [{
+                'id': topic.id,
+                'name_sk': topic.name_sk,
+                'accuracy': round(float(progress.accuracy_rate), 1)
+            } for progress, topic in weak_topics],
+            'recent_badges': [{
+                'badge': {
+                    'icon': ub.badge.icon,
+                    'name_sk': ub.badge.name_sk,
+                    'xp_reward': ub.badge.xp_reward
+                }
+            } for ub in recent_badges],
+            'recent_tests': [{
+                'id': t.id,
+                'subject': self._subject(catalog.subject(t.subject_id)) if catalog.subject(t.subject_id) else None,
+                'completed_at': t.completed_at.isoformat() if t.completed_at else None,
+                'score': t.score,
+                'total_questions': t.total_questions,
+                'percentage': float(t.percentage or 0),
+                'time_spent_seconds': t.time_spent_seconds
+            } for t in recent_tests]
+        }
+
+    @staticmethod
+    def _subject(subject: Dict) -> Dict:
+        return {
+            'id': subject['id'],
+            'name_sk': subject['name_sk'],
+            'icon': subject['icon'],
+            'color': subject['color']
+        }
+
+    @staticmethod
+    def _load(payload) -> Dict:
+        """Restore types JSON can't carry (int dict keys, datetimes)"""
+        context = json.loads(payload)
+        context['progress_data'] = {int(k): v for k, v in context['progress_data'].items()}
+        for test in context['recent_tests']:
+            if test['completed_at']:
+                test['completed_at'] = datetime.fromisoformat(test['completed_at'])
+        return context
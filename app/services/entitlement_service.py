@@ -0,0 +1,144 @@
+"""
+Per-user entitlements snapshot, cached in Redis and per request
+"""
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from flask import g, has_app_context
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app import redis_client
+from app.models.subscription import PLAN_LIMITS, Subscription
+
+# Snapshots are dropped on subscription changes; this only bounds drift
+ENTITLEMENTS_TTL = 3600
+
+
+def entitlements_key(user_id: int) -> str:
+    return f"entitlements:{user_id}"
+
+
+def build_snapshot(subscription: Optional[Subscription]) -> Dict:
+    """Compact, JSON-serializable view of what a subscription grants"""
+    if not subscription:
+        return {'plan': 'free', 'active': False, 'limits': PLAN_LIMITS['free'], 'expires_at': None}
+
+    active = subscription.is_active_subscription()
+    return {
+        'plan': subscription.plan,
+        'active': active,
+        'limits': subscription.get_plan_limits() if active else PLAN_LIMITS['free'],
+        'expires_at': subscription.expires_at.isoformat() if subscription.expires_at else None
+    }
+
+
+def _ttl(snapshot: Dict) -> int:
+    """Cache lifetime, never past the moment the subscription expires"""
+    if snapshot['active'] and snapshot['expires_at']:
+        remaining = (datetime.fromisoformat(snapshot['expires_at']) - datetime.utcnow()).total_seconds()
+        return max(min(ENTITLEMENTS_TTL, int(remaining)), 1)
+    return ENTITLEMENTS_TTL
+
+
+def _request_cache() -> Dict:
+    if not has_app_context():
+        return {}
+    if '_entitlements' not in g:
+        g._entitlements = {}
+    return g._entitlements
+
+
+class EntitlementService:
+    """Service for reading plan entitlements without touching the database"""
+
+    def get(self, user_id: int) -> Dict:
+        """
+        Entitlements snapshot of one user
+
+        Returns:
+            {'plan', 'active', 'limits', 'expires_at'}
+        """
+        return self.get_many([user_id])[user_id]
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, Dict]:
+        """
+        Entitlements of many users: one MGET, one query for cache misses
+
+        Returns:
+            Snapshot per user ID
+        """
+        user_ids = list(user_ids)
+        cache = _request_cache()
+        result = {user_id: cache[user_id] for user_id in user_ids if user_id in cache}
+        missing = [user_id for user_id in user_ids if user_id not in result]
+        if not missing:
+            return result
+
+        try:
+            cached = redis_client.mget([entitlements_key(user_id) for user_id in missing])
+        except RedisError as e:
+            print(f"Entitlements cache read failed: {e}")
+            cached = [None] * len(missing)
+
+        for user_id, payload in zip(missing, cached):
+            if payload:
+                result[user_id] = json.loads(payload)
+
+        missing = [user_id for user_id in missing if user_id not in result]
+        if missing:
+            subscriptions = {
+                s.user_id: s for s in Subscription.query.filter(Subscription.user_id.in_(missing)).all()
+            }
+            loaded = {user_id: build_snapshot(subscriptions.get(user_id)) for user_id in missing}
+            result.update(loaded)
+
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                for user_id, snapshot in loaded.items():
+                    pipe.setex(entitlements_key(user_id), _ttl(snapshot), json.dumps(snapshot))
+                pipe.execute()
+            except RedisError as e:
+                print(f"Entitlements cache write failed: {e}")
+
+        cache.update(result)
+        return result
+
+    def invalidate(self, user_ids: Iterable[int]):
+        """Drop cached snapshots after subscriptions changed"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+
+        cache = _request_cache()
+        for user_id in user_ids:
+            cache.pop(user_id, None)
+
+        try:
+            redis_client.delete(*[entitlements_key(user_id) for user_id in user_ids])
+        except RedisError as e:
+            print(f"Entitlements cache invalidation failed: {e}")
+
+
+# Subscription changes are collected during flush and invalidated after the
+# transaction commits; invalidating earlier would let readers re-cache the
+# old plan before the change is visible
+@event.listens_for(Subscription, 'after_insert')
+@event.listens_for(Subscription, 'after_update')
+@event.listens_for(Subscription, 'after_delete')
+def _subscription_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and target.user_id is not None:
+        session.info.setdefault('entitlements_changed', set()).add(target.user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed(session):
+    changed = session.info.pop('entitlements_changed', None)
+    if changed:
+        EntitlementService().invalidate(changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed(session):
+    session.info.pop('entitlements_changed', None)
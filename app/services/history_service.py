@@ -0,0 +1,107 @@
+"""
+Completed-test history, paginated by cursor
+"""
+import base64
+import binascii
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import tuple_
+from app import db
+from app.models.subject import Subject
+from app.models.test import TestSession
+
+
+def encode_cursor(completed_at: datetime, test_id: int) -> str:
+    """Opaque cursor pointing just past a test"""
+    raw = f"{completed_at.isoformat()}|{test_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """(completed_at, id) of a cursor; raises ValueError if it's malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        completed_at, test_id = raw.split('|')
+        return datetime.fromisoformat(completed_at), int(test_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+class HistoryService:
+    """Service for browsing a user's completed tests"""
+
+    def page(self, user_id: int, per_page: int, cursor: Optional[str] = None,
+             subject_id: Optional[int] = None, since: Optional[date] = None,
+             until: Optional[date] = None) -> Dict:
+        """
+        One page of completed tests, newest first
+
+        Pages continue from the (completed_at, id) of the previous page's
+        last test instead of using OFFSET, so every page costs the same
+        short index range scan, already in order (ix_test_sessions_user_completed,
+        or ix_test_sessions_user_subject_completed with a subject).
+
+        Args:
+            user_id: User ID
+            per_page: Tests per page
+            cursor: next_cursor of the previous page
+            subject_id: Only this subject
+            since: Completed on or after this day
+            until: Completed on or before this day
+
+        Returns:
+            {'tests': [...], 'next_cursor'} (next_cursor is None on the last page)
+        """
+        query = db.session.query(
+            TestSession.id,
+            TestSession.subject_id,
+            Subject.name_sk,
+            TestSession.test_type,
+            TestSession.total_questions,
+            TestSession.score,
+            TestSession.percentage,
+            TestSession.time_spent_seconds,
+            TestSession.completed_at
+        ).outerjoin(Subject, Subject.id == TestSession.subject_id).filter(
+            TestSession.user_id == user_id,
+            TestSession.status == 'completed',
+            TestSession.completed_at.isnot(None)
+        )
+
+        if subject_id is not None:
+            query = query.filter(TestSession.subject_id == subject_id)
+        if since is not None:
+            query = query.filter(TestSession.completed_at >= since)
+        if until is not None:
+            query = query.filter(TestSession.completed_at < until + timedelta(days=1))
+
+        if cursor:
+            completed_at, test_id = decode_cursor(cursor)
+            # Row comparison in index order: a single range of the index
+            query = query.filter(
+                tuple_(TestSession.completed_at, TestSession.id) < tuple_(completed_at, test_id)
+            )
+
+        # One extra row tells whether there is a next page
+        rows = query.order_by(
+            TestSession.completed_at.desc(),
+            TestSession.id.desc()
+        ).limit(per_page + 1).all()
+
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+
+        return {
+            'tests': [{
+                'id': row.id,
+                'subject_id': row.subject_id,
+                'subject': row.name_sk,
+                'test_type': row.test_type,
+                'total_questions': row.total_questions,
+                'score': row.score,
+                'percentage': float(row.percentage) if row.percentage is not None else None,
+                'time_spent_seconds': row.time_spent_seconds,
+                'completed_at': row.completed_at.isoformat()
+            } for row in rows],
+            'next_cursor': encode_cursor(rows[-1].completed_at, rows[-1].id) if has_more else None
+        }
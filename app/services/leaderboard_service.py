@@ -0,0 +1,174 @@
+"""
+XP leaderboards on Redis sorted sets
+"""
+import uuid
+from datetime import date
+from typing import Dict, List, Optional
+from redis.exceptions import RedisError
+from app import db, redis_client
+from app.models.user import User
+
+# Weekly boards are kept for one extra week, then expire
+WEEKLY_TTL = 14 * 86400
+# Boards being rebuilt; a crashed rebuild's leftovers expire on their own
+REBUILD_TTL = 3600
+
+BOARDS = ('global', 'weekly', 'grade', 'subject')
+
+
+def week_id(day: Optional[date] = None) -> str:
+    year, week, _ = (day or date.today()).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def board_key(board: str, param=None) -> str:
+    """
+    Redis key for a leaderboard
+
+    Args:
+        board: 'global', 'weekly', 'grade' or 'subject'
+        param: ISO week for 'weekly' (default: this week), grade or subject ID
+    """
+    if board == 'global':
+        return 'lb:global'
+    if board == 'weekly':
+        return f"lb:weekly:{param or week_id()}"
+    if board in ('grade', 'subject'):
+        if param is None:
+            raise ValueError(f"Leaderboard '{board}' needs a {board}")
+        return f"lb:{board}:{param}"
+    raise ValueError(f"Unknown leaderboard '{board}'")
+
+
+class LeaderboardService:
+    """Service for XP leaderboards"""
+
+    def record_xp(
+            self,
+            user_id: int,
+            total_xp: int,
+            amount: int,
+            grade: Optional[int] = None,
+            subject_id: Optional[int] = None
+    ):
+        """
+        Update every board a user appears on after an XP award
+
+        Global and grade boards rank by total XP; weekly and subject boards
+        by XP earned there. Totals only move up (ZADD GT), so an award
+        published late can't overwrite a newer, higher total.
+        """
+        weekly = board_key('weekly')
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.zadd(board_key('global'), {user_id: total_xp}, gt=True)
+            if grade:
+                pipe.zadd(board_key('grade', grade), {user_id: total_xp}, gt=True)
+            if amount:
+                pipe.zincrby(weekly, amount, user_id)
+                pipe.expire(weekly, WEEKLY_TTL)
+                if subject_id:
+                    pipe.zincrby(board_key('subject', subject_id), amount, user_id)
+            pipe.execute()
+        except RedisError as e:
+            # `flask rebuild-leaderboards` repairs global and grade boards
+            print(f"Leaderboard update failed: {e}")
+
+    def top(self, key: str, page: int = 1, per_page: int = 20) -> List[Dict]:
+        """One page of a leaderboard, best first"""
+        start = (max(page, 1) - 1) * per_page
+        entries = redis_client.zrevrange(key, start, start + per_page - 1, withscores=True)
+        return self._with_names(entries, start)
+
+    def rank(self, key: str, user_id: int) -> Optional[Dict]:
+        """A user's 1-based rank and score, or None if not on the board"""
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zrevrank(key, user_id)
+        pipe.zscore(key, user_id)
+        rank, score = pipe.execute()
+        if rank is None:
+            return None
+        return {'rank': rank + 1, 'xp': int(score)}
+
+    def around(self, key: str, user_id: int, radius: int = 5) -> List[Dict]:
+        """Entries ranked just above and below a user"""
+        rank = redis_client.zrevrank(key, user_id)
+        if rank is None:
+            return []
+        start = max(rank - radius, 0)
+        entries = redis_client.zrevrange(key, start, rank + radius, withscores=True)
+        return self._with_names(entries, start)
+
+    def _with_names(self, entries, start: int) -> List[Dict]:
+        """Attach display names to (user_id, score) pairs"""
+        user_ids = [int(member) for member, _ in entries]
+        users = {
+            row.id: row for row in db.session.query(
+                User.id, User.username, User.full_name, User.level
+            ).filter(User.id.in_(user_ids)).all()
+        } if user_ids else {}
+
+        result = []
+        for i, (member, score) in enumerate(entries):
+            user = users.get(int(member))
+            result.append({
+                'rank': start + i + 1,
+                'user_id': int(member),
+                'name': (user.full_name or user.username) if user else None,
+                'level': user.level if user else None,
+                'xp': int(score)
+            })
+        return result
+
+    def rebuild(self, chunk_size: int = 5000) -> int:
+        """
+        Rebuild global and grade boards from the users table
+
+        Fills temporary keys in chunks and swaps them in at the end, so
+        readers never see a half-built board. The temporary keys are
+        unique to the run, so nothing left by an interrupted run (or a
+        concurrent one) is merged in. Weekly and subject boards only
+        exist in Redis and are not rebuilt.
+
+        Returns:
+            Number of users ranked
+        """
+        suffix = f':rebuild:{uuid.uuid4().hex}'
+        keys = set()
+        total = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(User.id, User.xp, User.grade).filter(
+                User.id > last_id,
+                User.is_active == True
+            ).order_by(User.id).limit(chunk_size).all()
+
+            if not rows:
+                break
+
+            pipe = redis_client.pipeline(transaction=False)
+            for user_id, xp, grade in rows:
+                pipe.zadd(board_key('global') + suffix, {user_id: xp or 0})
+                keys.add(board_key('global'))
+                if grade:
+                    pipe.zadd(board_key('grade', grade) + suffix, {user_id: xp or 0})
+                    keys.add(board_key('grade', grade))
+            for key in keys:
+                pipe.expire(key + suffix, REBUILD_TTL)
+            pipe.execute()
+
+            total += len(rows)
+            last_id = rows[-1][0]
+
+        # Grade boards that no longer have any users
+        for key in redis_client.scan_iter(match='lb:grade:*', count=100):
+            key = key.decode()
+            if ':rebuild:' not in key and key not in keys:
+                redis_client.delete(key)
+
+        pipe = redis_client.pipeline(transaction=True)
+        for key in keys:
+            pipe.rename(key + suffix, key)
+        pipe.execute()
+
+        return total
@@ -0,0 +1,209 @@
+"""
+Monthly partitions of user_answers: creation ahead of time and archival
+
+Months are created ahead by `flask create-answer-partitions`. Answers
+for a month nobody created yet land in the DEFAULT partition instead of
+failing, and move to their month's partition once it's created.
+"""
+import csv
+import gzip
+import os
+import re
+from datetime import date
+from typing import List, Optional
+from flask import current_app, has_app_context
+from sqlalchemy import text
+from app import db
+
+PARENT = 'user_answers'
+
+# Partitions to keep ready beyond the current month
+DEFAULT_MONTHS_AHEAD = 3
+
+DEFAULT_PARTITION = f'{PARENT}_default'
+
+PARTITION_NAME = re.compile(rf'^{PARENT}_(\d{{4}})_(\d{{2}})$')
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after `month`"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Month a partition holds, or None if the name isn't a monthly partition"""
+    match = PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def is_partition(name: str) -> bool:
+    """Whether a table is one of the user_answers partitions"""
+    return name == DEFAULT_PARTITION or partition_month(name) is not None
+
+
+def create_default_partition(connection):
+    """Catch-all partition for answers outside every monthly partition"""
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+
+
+def create_partition(connection, month: date) -> str:
+    """
+    Create the partition holding one month, if it doesn't exist yet
+
+    Answers of that month already in the DEFAULT partition are moved into
+    it: Postgres refuses a new partition while the default holds its rows.
+    """
+    name = partition_name(month)
+    # Serializes concurrent creators; released at commit
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:parent))"), {'parent': PARENT})
+    if connection.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is not None:
+        return name
+
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    has_default = connection.execute(
+        text("SELECT to_regclass(:name)"), {'name': DEFAULT_PARTITION}
+    ).scalar() is not None
+    if not has_default:
+        connection.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES {bounds}"))
+        return name
+
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    connection.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE answered_at >= '{month.isoformat()}' AND answered_at < '{add_months(month, 1).isoformat()}'
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """))
+    connection.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    return name
+
+
+def create_partitions(connection, start: Optional[date] = None, months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Create monthly partitions from `start` (default: this month) through
+    `months_ahead` months later, and the DEFAULT partition; existing ones
+    are left alone
+
+    Returns:
+        Names of the partitions checked
+    """
+    if months_ahead is None:
+        months_ahead = current_app.config['ANSWER_PARTITIONS_AHEAD'] if has_app_context() else DEFAULT_MONTHS_AHEAD
+    first = (start or date.today()).replace(day=1)
+    last = add_months(date.today().replace(day=1), months_ahead)
+
+    create_default_partition(connection)
+
+    names = []
+    month = first
+    while month <= last:
+        names.append(create_partition(connection, month))
+        month = add_months(month, 1)
+    return names
+
+
+class PartitionService:
+    """Service for maintaining user_answers partitions"""
+
+    def ensure_partitions(self) -> List[str]:
+        """Create any missing partitions up to ANSWER_PARTITIONS_AHEAD months ahead"""
+        names = create_partitions(db.session.connection())
+        db.session.commit()
+        return names
+
+    def partitions(self) -> List[str]:
+        """Attached monthly partitions, oldest first"""
+        names = db.session.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ), {'parent': PARENT}).scalars().all()
+        return sorted(name for name in names if partition_month(name))
+
+    def archivable(self) -> List[str]:
+        """
+        Partitions older than ANSWER_RETENTION_MONTHS
+
+        Retention must stay longer than anything that rebuilds from answer
+        history (seen-question filters read the last SEEN_FILTER_TTL).
+        """
+        config = current_app.config
+        retention = config['ANSWER_RETENTION_MONTHS']
+        if retention * 30 * 86400 < config['SEEN_FILTER_TTL']:
+            raise ValueError("ANSWER_RETENTION_MONTHS is shorter than SEEN_FILTER_TTL")
+
+        cutoff = add_months(date.today().replace(day=1), -retention)
+        return [name for name in self.partitions() if partition_month(name) < cutoff]
+
+    def archive(self, name: str, directory: Optional[str] = None) -> int:
+        """
+        Move a partition to a gzipped CSV file, then drop it
+
+        The file is written and its row count verified before the partition
+        is detached and dropped. Rollups (user_stats, user_topic_progress,
+        question stats, XP) are maintained as answers arrive, so they are
+        unaffected.
+
+        Returns:
+            Number of rows archived
+        """
+        if partition_month(name) is None:
+            raise ValueError(f"{name} is not a {PARENT} partition")
+
+        directory = directory or current_app.config['ANSWER_ARCHIVE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.csv.gz")
+        partial = f"{path}.partial"
+
+        expected = db.session.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+
+        # COPY streams straight from the server; no rows are held in memory
+        connection = db.session.connection().connection
+        with gzip.open(partial, 'wt', encoding='utf-8') as f:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+
+        # Count records, not lines: explanations can span several lines
+        with gzip.open(partial, 'rt', encoding='utf-8', newline='') as f:
+            written = sum(1 for _ in csv.reader(f)) - 1
+        if written != expected:
+            os.remove(partial)
+            raise RuntimeError(f"{name}: archived {written} rows, expected {expected}")
+        os.replace(partial, path)
+
+        db.session.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        db.session.execute(text(f"DROP TABLE {name}"))
+        db.session.commit()
+
+        return expected
+
+    def restore(self, path: str) -> int:
+        """
+        Load an archived month back into its partition
+
+        Returns:
+            Number of rows restored
+        """
+        name = os.path.basename(path).split('.')[0]
+        month = partition_month(name)
+        if month is None:
+            raise ValueError(f"{path} is not a {PARENT} archive")
+
+        create_partition(db.session.connection(), month)
+
+        connection = db.session.connection().connection
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY {name} FROM STDIN WITH (FORMAT csv, HEADER)", f)
+                restored = cursor.rowcount
+        db.session.commit()
+
+        return restored
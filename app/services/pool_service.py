@@ -0,0 +1,260 @@
+"""
+Per-topic pools of ready bank questions
+"""
+import random
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+from redis.exceptions import RedisError
+from sqlalchemy import func, update
+from app import db, redis_client
+from app.models.question import Question, QuestionTemplate
+from app.models.subject import Topic
+from app.services.adaptive_service import SEEN_OVERSAMPLE, initial_rating
+
+DIFFICULTIES = ['easy', 'medium', 'hard']
+
+# Topics whose pools ran short, picked up by `flask fill-question-pools --refill-only`
+REFILL_KEY = 'pool:refill'
+
+# topic_id -> subject_id, so test creation does not need to look up the topic
+TOPIC_SUBJECTS_KEY = 'pool:topic_subjects'
+
+
+def pool_key(topic_id: int, difficulty: str) -> str:
+    """Set of question IDs for a topic at one difficulty"""
+    return f"pool:{topic_id}:{difficulty}"
+
+
+def difficulty_preference(difficulty: str) -> List[str]:
+    """Difficulties ordered by closeness to the requested one"""
+    if difficulty not in DIFFICULTIES:
+        difficulty = 'medium'
+    wanted = DIFFICULTIES.index(difficulty)
+    return sorted(DIFFICULTIES, key=lambda d: (abs(DIFFICULTIES.index(d) - wanted), DIFFICULTIES.index(d)))
+
+
+class QuestionPoolService:
+    """Service for drawing from and refilling topic question pools"""
+
+    def __init__(self, ai_service=None):
+        self._ai_service = ai_service
+
+    @property
+    def ai_service(self):
+        """Lazy load AI service (only the filler generates questions)"""
+        if self._ai_service is None:
+            from app.services.ai_service import AIService
+            self._ai_service = AIService()
+        return self._ai_service
+
+    def draw(
+            self,
+            topic_id: int,
+            difficulty: str,
+            num_questions: int,
+            is_seen: Optional[Callable[[List[int]], Set[int]]] = None
+    ) -> Tuple[Optional[int], List[int]]:
+        """
+        Draw random questions for a topic, preferring the requested difficulty
+
+        One Redis round trip; nearby difficulties top up a short pool. If
+        the topic's pools or its subject mapping are missing (Redis was
+        flushed, the filler hasn't run yet), the questions come from the
+        bank instead and the topic is queued for a refill.
+
+        Args:
+            topic_id: Topic ID
+            difficulty: Preferred difficulty
+            num_questions: Number of questions wanted
+            is_seen: Optional batch check returning the IDs the student saw recently
+
+        Returns:
+            (subject_id, question_ids) - subject_id is None for an unknown topic
+        """
+        order = difficulty_preference(difficulty)
+        sample_size = num_questions * (SEEN_OVERSAMPLE if is_seen else 1)
+
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.hget(TOPIC_SUBJECTS_KEY, topic_id)
+            for level in order:
+                pipe.srandmember(pool_key(topic_id, level), sample_size)
+            subject_id, *candidates = pipe.execute()
+        except RedisError as e:
+            print(f"Pool draw failed, reading the question bank: {e}")
+            return self._draw_from_bank(topic_id, order, num_questions, is_seen)
+
+        if not subject_id or not any(candidates):
+            subject_id, question_ids = self._draw_from_bank(topic_id, order, num_questions, is_seen)
+            if subject_id is not None:
+                redis_client.sadd(REFILL_KEY, topic_id)
+            return subject_id, question_ids
+
+        candidates = [[int(member) for member in members] for members in candidates]
+        if is_seen:
+            seen = is_seen([q_id for members in candidates for q_id in members])
+            candidates = [[q_id for q_id in members if q_id not in seen] for members in candidates]
+
+        question_ids = []
+        for members in candidates:
+            question_ids.extend(members[:num_questions - len(question_ids)])
+
+        if len(candidates[0]) < num_questions:
+            redis_client.sadd(REFILL_KEY, topic_id)
+
+        return int(subject_id), question_ids
+
+    def _draw_from_bank(
+            self,
+            topic_id: int,
+            order: List[str],
+            num_questions: int,
+            is_seen: Optional[Callable[[List[int]], Set[int]]] = None
+    ) -> Tuple[Optional[int], List[int]]:
+        """
+        Draw from the database when the topic's pools are unavailable
+
+        The questions read are put back into the pools (best effort), so
+        the next draw is served from Redis again.
+        """
+        subject_id = db.session.query(Topic.subject_id).filter(Topic.id == topic_id).scalar()
+        if subject_id is None:
+            return None, []
+
+        by_level = {level: [] for level in order}
+        for question_id, level in db.session.query(Question.id, Question.difficulty).filter(
+            Question.topic_id == topic_id
+        ).all():
+            by_level.setdefault(level, []).append(question_id)
+
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.hset(TOPIC_SUBJECTS_KEY, topic_id, subject_id)
+            for level, question_ids in by_level.items():
+                if question_ids:
+                    pipe.sadd(pool_key(topic_id, level), *question_ids)
+            pipe.execute()
+        except RedisError as e:
+            print(f"Pool resync failed: {e}")
+
+        sample_size = num_questions * (SEEN_OVERSAMPLE if is_seen else 1)
+        candidates = [random.sample(by_level[level], min(len(by_level[level]), sample_size)) for level in order]
+        if is_seen:
+            seen = is_seen([q_id for members in candidates for q_id in members])
+            candidates = [[q_id for q_id in members if q_id not in seen] for members in candidates]
+
+        question_ids = []
+        for members in candidates:
+            question_ids.extend(members[:num_questions - len(question_ids)])
+        return subject_id, question_ids
+
+    def add_questions(self, questions: Iterable[Question], subject_id: Optional[int] = None):
+        """Add newly generated bank questions to their topic pools"""
+        pipe = redis_client.pipeline(transaction=False)
+        for question in questions:
+            pipe.sadd(pool_key(question.topic_id, question.difficulty), question.id)
+            if subject_id:
+                pipe.hset(TOPIC_SUBJECTS_KEY, question.topic_id, subject_id)
+        pipe.execute()
+
+    def fill(self, min_size: int = 30, topic_ids: Optional[List[int]] = None) -> int:
+        """
+        Sync pools with the question bank and generate questions for short pools
+
+        Args:
+            min_size: Questions wanted per topic and difficulty
+            topic_ids: Only these topics (default: every active topic with templates)
+
+        Returns:
+            Number of questions generated
+        """
+        query = db.session.query(Topic.id, Topic.subject_id).join(
+            QuestionTemplate,
+            Topic.id == QuestionTemplate.topic_id
+        ).filter(Topic.is_active == True).distinct()
+        if topic_ids:
+            query = query.filter(Topic.id.in_(topic_ids))
+
+        generated = 0
+        for topic_id, subject_id in query.all():
+            redis_client.hset(TOPIC_SUBJECTS_KEY, topic_id, subject_id)
+
+            # Load the existing bank for this topic
+            existing = db.session.query(Question.id, Question.difficulty).filter(
+                Question.topic_id == topic_id
+            ).all()
+            pipe = redis_client.pipeline(transaction=False)
+            for question_id, level in existing:
+                pipe.sadd(pool_key(topic_id, level), question_id)
+            pipe.execute()
+
+            counts = dict(db.session.query(
+                Question.difficulty, func.count(Question.id)
+            ).filter(Question.topic_id == topic_id).group_by(Question.difficulty).all())
+
+            templates = QuestionTemplate.query.filter_by(topic_id=topic_id).all()
+            for level in DIFFICULTIES:
+                level_templates = [t for t in templates if t.difficulty == level]
+                missing = min_size - counts.get(level, 0)
+                if not level_templates or missing <= 0:
+                    continue
+
+                questions = []
+                for i in range(missing):
+                    template = level_templates[i % len(level_templates)]
+                    question_data = self.ai_service.generate_question_from_template(template)
+                    questions.append(self.build_question(template, question_data))
+                db.session.add_all(questions)
+                db.session.commit()
+
+                self.add_questions(questions, subject_id)
+                generated += len(questions)
+
+        return generated
+
+    @staticmethod
+    def build_question(template: QuestionTemplate, question_data: dict) -> Question:
+        """Create a bank Question from a template and generated variation"""
+        return Question(
+            template_id=template.id,
+            topic_id=template.topic_id,
+            question_text=question_data['question_text'],
+            question_type=template.question_type,
+            difficulty=template.difficulty,
+            correct_answer=question_data['correct_answer'],
+            choices=question_data.get('choices'),
+            explanation=question_data.get('explanation'),
+            variables_used=question_data.get('variables_used'),
+            difficulty_rating=initial_rating(template.difficulty)
+        )
+
+    def backfill_payloads(self, chunk_size: int = 1000) -> int:
+        """
+        Build client payloads for questions created before they existed
+
+        Returns:
+            Number of questions updated
+        """
+        total = 0
+        last_id = 0
+        while True:
+            questions = Question.query.filter(
+                Question.id > last_id,
+                Question.client_payload.is_(None)
+            ).order_by(Question.id).limit(chunk_size).all()
+
+            if not questions:
+                break
+
+            db.session.execute(update(Question), [
+                {'id': q.id, 'client_payload': q.build_client_payload()} for q in questions
+            ])
+            db.session.commit()
+
+            total += len(questions)
+            last_id = questions[-1].id
+
+        return total
+
+    def pop_refill_topics(self, limit: int = 100) -> List[int]:
+        """Take topics flagged as short off the refill queue"""
+        return [int(t) for t in redis_client.spop(REFILL_KEY, limit) or []]
@@ -0,0 +1,174 @@
+"""
+Daily usage quotas on Redis, flushed to usage_limits for reporting
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional, Tuple
+from redis.exceptions import RedisError
+from sqlalchemy.dialects.postgresql import insert
+from app import db, redis_client
+from app.models.subscription import UsageLimit
+from app.services.entitlement_service import EntitlementService
+
+# Quota kind -> (plan limit, usage_limits column)
+QUOTAS = {
+    'tests': ('tests_per_day', 'tests_taken'),
+    'explanations': ('explanations_per_day', 'ai_explanations_viewed')
+}
+
+# Counters outlive midnight by this long so the last flush of the day sees them
+FLUSH_GRACE = 3600
+
+# Users/days with usage not yet written to usage_limits
+DIRTY_KEY = 'quota:dirty'
+
+# Check and consume in one round trip: the limit check and the increment
+# run atomically, so concurrent requests can't both take the last unit
+CONSUME_SCRIPT = """
+local used = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+if used + tonumber(ARGV[3]) > tonumber(ARGV[2]) then
+    return {0, used}
+end
+used = redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[3])
+redis.call('EXPIREAT', KEYS[1], ARGV[4])
+redis.call('SADD', KEYS[2], ARGV[5])
+return {1, used}
+"""
+
+# Give units back to the day they were taken from; a counter that already
+# expired stays gone rather than coming back negative and without a TTL
+REFUND_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], ARGV[1], -tonumber(ARGV[2]))
+redis.call('SADD', KEYS[2], ARGV[3])
+return 1
+"""
+
+_consume = None
+_refund = None
+
+
+def quota_key(user_id: int, day: date) -> str:
+    """Hash of a user's usage counters for one day"""
+    return f"quota:{user_id}:{day.isoformat()}"
+
+
+def plan_limits(user) -> Dict:
+    """Limits of a user's plan (free without an active subscription)"""
+    return EntitlementService().get(user.id)['limits']
+
+
+class QuotaService:
+    """Service for enforcing daily usage limits"""
+
+    def consume(self, user, kind: str, amount: int = 1, day: Optional[date] = None) -> Tuple[bool, Optional[int]]:
+        """
+        Use up part of a day's quota, unless that would exceed the limit
+
+        Fails open: if Redis is unavailable the request is allowed.
+
+        Args:
+            user: User (for plan limits)
+            kind: 'tests' or 'explanations'
+            amount: Units to consume
+            day: Day to charge (today by default); pass the same day to refund()
+
+        Returns:
+            (allowed, units used that day including this request)
+        """
+        global _consume
+        limit_name, _ = QUOTAS[kind]
+        limit = plan_limits(user).get(limit_name, 0)
+
+        today = day or date.today()
+        expire_at = datetime.combine(today + timedelta(days=1), time.min).timestamp() + FLUSH_GRACE
+
+        try:
+            if _consume is None:
+                _consume = redis_client.register_script(CONSUME_SCRIPT)
+            allowed, used = _consume(
+                keys=[quota_key(user.id, today), DIRTY_KEY],
+                args=[kind, limit, amount, int(expire_at), f"{user.id}:{today.isoformat()}"]
+            )
+        except RedisError as e:
+            print(f"Quota check failed, allowing request: {e}")
+            return True, None
+
+        return bool(allowed), int(used)
+
+    def refund(self, user_id: int, kind: str, day: date, amount: int = 1):
+        """
+        Give back quota consumed by a request that then failed
+
+        Args:
+            user_id: User ID
+            kind: 'tests' or 'explanations'
+            day: Day the units were consumed on (a request may finish after midnight)
+            amount: Units to give back
+        """
+        global _refund
+        try:
+            if _refund is None:
+                _refund = redis_client.register_script(REFUND_SCRIPT)
+            _refund(
+                keys=[quota_key(user_id, day), DIRTY_KEY],
+                args=[kind, amount, f"{user_id}:{day.isoformat()}"]
+            )
+        except RedisError as e:
+            print(f"Quota refund failed: {e}")
+
+    def usage(self, user_id: int, day: Optional[date] = None) -> Dict[str, int]:
+        """Units used per quota kind on a day (today by default)"""
+        counters = redis_client.hgetall(quota_key(user_id, day or date.today()))
+        return {kind: int(counters.get(kind.encode(), 0)) for kind in QUOTAS}
+
+    def flush(self, batch_size: int = 500) -> int:
+        """
+        Write counters of users with new usage to usage_limits
+
+        Returns:
+            Number of rows upserted
+        """
+        total = 0
+        while True:
+            members = redis_client.spop(DIRTY_KEY, batch_size)
+            if not members:
+                break
+
+            entries = []
+            for member in members:
+                user_id, day = member.decode().split(':')
+                entries.append((int(user_id), date.fromisoformat(day)))
+
+            pipe = redis_client.pipeline(transaction=False)
+            for user_id, day in entries:
+                pipe.hgetall(quota_key(user_id, day))
+            counters = pipe.execute()
+
+            rows = []
+            for (user_id, day), values in zip(entries, counters):
+                if not values:
+                    continue
+                row = {'user_id': user_id, 'date': day}
+                for kind, (_, column) in QUOTAS.items():
+                    row[column] = max(int(values.get(kind.encode(), 0)), 0)
+                rows.append(row)
+
+            if rows:
+                stmt = insert(UsageLimit.__table__).values(rows)
+                try:
+                    db.session.execute(stmt.on_conflict_do_update(
+                        constraint='uix_user_date',
+                        set_={column: stmt.excluded[column] for _, column in QUOTAS.values()}
+                    ))
+                    db.session.commit()
+                except Exception:
+                    # Keep them dirty for the next flush
+                    db.session.rollback()
+                    redis_client.sadd(DIRTY_KEY, *members)
+                    raise
+
+            total += len(rows)
+
+        return total
@@ -0,0 +1,124 @@
+"""
+Spaced-repetition review scheduling on Redis sorted sets
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+from redis.exceptions import RedisError
+from app import db, redis_client
+from app.models.subject import Topic, UserTopicProgress
+
+# How long a topic rests after practice, by mastery level
+REVIEW_INTERVALS = {
+    'beginner': timedelta(days=1),
+    'intermediate': timedelta(days=3),
+    'advanced': timedelta(days=7),
+    'master': timedelta(days=21)
+}
+
+
+def review_key(user_id: int, subject_id: int) -> str:
+    """Sorted set of a user's topics in a subject, scored by next-due time"""
+    return f"review:{user_id}:{subject_id}"
+
+
+class ReviewService:
+    """Service for scheduling topic reviews"""
+
+    @staticmethod
+    def next_due(last_practiced_at: Optional[datetime], mastery_level: Optional[str]) -> float:
+        """Unix timestamp when a topic is due for review again"""
+        if not last_practiced_at:
+            return 0.0
+
+        interval = REVIEW_INTERVALS.get(mastery_level, REVIEW_INTERVALS['beginner'])
+        due = last_practiced_at + interval
+        return due.replace(tzinfo=timezone.utc).timestamp()
+
+    def schedule(self, user_id: int, subject_id: int, progress_rows: Iterable[UserTopicProgress]):
+        """Reschedule topics after a completed test"""
+        mapping = {
+            str(p.topic_id): self.next_due(p.last_practiced_at, p.mastery_level)
+            for p in progress_rows
+        }
+        if not mapping:
+            return
+
+        try:
+            redis_client.zadd(review_key(user_id, subject_id), mapping)
+        except RedisError as e:
+            # Rebuild command repairs the schedule
+            print(f"Review schedule update failed: {e}")
+
+    def due_topics(self, user_id: int, subject_id: int, limit: int = 3) -> Optional[List[int]]:
+        """
+        Topics due for review, most overdue first
+
+        Returns:
+            List of topic IDs, or None if there is no schedule for this user
+            and subject (caller should fall back to the database)
+        """
+        key = review_key(user_id, subject_id)
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.zrangebyscore(key, '-inf', time.time(), start=0, num=limit)
+            pipe.exists(key)
+            due, exists = pipe.execute()
+        except RedisError as e:
+            print(f"Review schedule lookup failed: {e}")
+            return None
+
+        if not exists:
+            return None
+
+        return [int(topic_id) for topic_id in due]
+
+    def rebuild(self, chunk_size: int = 5000, clear: bool = False) -> int:
+        """
+        Repopulate all schedules from user_topic_progress
+
+        Args:
+            chunk_size: Rows read and written per batch
+            clear: Delete existing schedules first
+
+        Returns:
+            Number of topics scheduled
+        """
+        if clear:
+            batch = []
+            for key in redis_client.scan_iter(match='review:*', count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    redis_client.delete(*batch)
+                    batch = []
+            if batch:
+                redis_client.delete(*batch)
+
+        total = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(
+                UserTopicProgress.id,
+                UserTopicProgress.user_id,
+                UserTopicProgress.topic_id,
+                UserTopicProgress.last_practiced_at,
+                UserTopicProgress.mastery_level,
+                Topic.subject_id
+            ).join(Topic, Topic.id == UserTopicProgress.topic_id).filter(
+                UserTopicProgress.id > last_id
+            ).order_by(UserTopicProgress.id).limit(chunk_size).all()
+
+            if not rows:
+                break
+
+            pipe = redis_client.pipeline(transaction=False)
+            for row_id, user_id, topic_id, last_practiced_at, mastery_level, subject_id in rows:
+                pipe.zadd(review_key(user_id, subject_id), {
+                    str(topic_id): self.next_due(last_practiced_at, mastery_level)
+                })
+            pipe.execute()
+
+            total += len(rows)
+            last_id = rows[-1][0]
+
+        return total
@@ -0,0 +1,190 @@
+"""
+Per-user filter of recently seen questions (Bloom filter on Redis bitmaps)
+"""
+import hashlib
+import math
+from datetime import datetime, timedelta
+from typing import Iterable, List, Set
+from flask import current_app
+from redis.exceptions import RedisError
+from app import db, redis_client
+from app.models.test import UserAnswer
+
+# Rotate only while the current generation is still full: of two requests
+# that both saw it fill up, the second finds the fresh generation the first
+# started (its count reset) and leaves the previous one alone
+ROTATE_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[3]) or '0') < tonumber(ARGV[1]) then
+    return 0
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+end
+redis.call('DEL', KEYS[3])
+return 1
+"""
+
+_rotate_script = None
+
+
+def seen_keys(user_id: int):
+    """Current and previous filter generations plus the current item count"""
+    prefix = f"seen:{user_id}"
+    return f"{prefix}:cur", f"{prefix}:prev", f"{prefix}:count"
+
+
+class SeenFilterService:
+    """
+    Service for tracking which bank questions a user has recently seen
+
+    Each user has two Bloom filter generations. New questions go into the
+    current one; once it holds SEEN_FILTER_CAPACITY items it becomes the
+    previous one and a fresh filter starts. Memory per user is therefore
+    bounded by two bitmaps, and a question counts as "recently seen" for
+    between one and two generations.
+    """
+
+    def __init__(self, capacity: int = None, error_rate: float = None, ttl: int = None):
+        config = current_app.config
+        self.capacity = capacity or config.get('SEEN_FILTER_CAPACITY', 2000)
+        self.error_rate = error_rate or config.get('SEEN_FILTER_ERROR_RATE', 0.01)
+        self.ttl = ttl or config.get('SEEN_FILTER_TTL', 90 * 86400)
+
+        # Optimal Bloom filter size and number of hash functions
+        self.num_bits = int(math.ceil(
+            -self.capacity * math.log(self.error_rate) / (math.log(2) ** 2)
+        ))
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+
+    def _positions(self, question_id: int) -> List[int]:
+        """Bit positions for a question (double hashing)"""
+        digest = hashlib.blake2b(str(question_id).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, user_id: int, question_ids: Iterable[int]):
+        """Mark questions as seen"""
+        question_ids = list(question_ids)
+        if not question_ids:
+            return
+
+        current, previous, count_key = seen_keys(user_id)
+
+        args = []
+        for question_id in question_ids:
+            for position in self._positions(question_id):
+                args.extend(['SET', 'u1', position, 1])
+
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.execute_command('BITFIELD', current, *args)
+            pipe.incrby(count_key, len(question_ids))
+            pipe.expire(current, self.ttl)
+            pipe.expire(previous, self.ttl)
+            pipe.expire(count_key, self.ttl)
+            count = pipe.execute()[1]
+
+            if count >= self.capacity:
+                self._rotate(user_id)
+        except RedisError as e:
+            print(f"Seen filter update failed: {e}")
+
+    def _rotate(self, user_id: int) -> bool:
+        """
+        Start a new generation if the current one is full; it becomes the
+        previous one
+
+        Returns:
+            Whether this call rotated (False if another request already had)
+        """
+        global _rotate_script
+        if _rotate_script is None:
+            _rotate_script = redis_client.register_script(ROTATE_SCRIPT)
+        return bool(_rotate_script(keys=list(seen_keys(user_id)), args=[self.capacity]))
+
+    def seen(self, user_id: int, question_ids: Iterable[int]) -> Set[int]:
+        """
+        Questions the user has probably seen recently
+
+        One round trip regardless of the number of candidates. False
+        positives (at roughly the configured error rate) are possible,
+        false negatives are not.
+        """
+        question_ids = list(question_ids)
+        if not question_ids:
+            return set()
+
+        current, previous, _ = seen_keys(user_id)
+
+        args = []
+        for question_id in question_ids:
+            for position in self._positions(question_id):
+                args.extend(['GET', 'u1', position])
+
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.execute_command('BITFIELD', current, *args)
+            pipe.execute_command('BITFIELD', previous, *args)
+            current_bits, previous_bits = pipe.execute()
+        except RedisError as e:
+            print(f"Seen filter lookup failed: {e}")
+            return set()
+
+        result = set()
+        k = self.num_hashes
+        for i, question_id in enumerate(question_ids):
+            if all(current_bits[i * k:(i + 1) * k]) or all(previous_bits[i * k:(i + 1) * k]):
+                result.add(question_id)
+        return result
+
+    def rebuild(self, days: int = 60, chunk_size: int = 10000, clear: bool = True) -> int:
+        """
+        Rebuild filters from answer history
+
+        Args:
+            days: How far back answers count as "recently seen"
+            chunk_size: Answers read per batch
+            clear: Delete existing filters first
+
+        Returns:
+            Number of answers replayed
+        """
+        if clear:
+            batch = []
+            for key in redis_client.scan_iter(match='seen:*', count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    redis_client.delete(*batch)
+                    batch = []
+            if batch:
+                redis_client.delete(*batch)
+
+        since = datetime.utcnow() - timedelta(days=days)
+        total = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(
+                UserAnswer.id,
+                UserAnswer.user_id,
+                UserAnswer.question_id
+            ).filter(
+                UserAnswer.id > last_id,
+                UserAnswer.answered_at >= since
+            ).order_by(UserAnswer.id).limit(chunk_size).all()
+
+            if not rows:
+                break
+
+            by_user = {}
+            for _, user_id, question_id in rows:
+                if user_id and question_id:
+                    by_user.setdefault(user_id, []).append(question_id)
+
+            for user_id, question_ids in by_user.items():
+                self.add(user_id, question_ids)
+
+            total += len(rows)
+            last_id = rows[-1][0]
+
+        return total
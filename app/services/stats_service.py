@@ -0,0 +1,267 @@
+"""
+Per-user statistics rollups
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import Date, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.models.question import Question
+from app.models.stats import UserDailyStats, UserStats
+from app.models.subject import Topic
+from app.models.test import TestSession, UserAnswer
+from app.models.user import User
+
+DAILY_COLUMNS = ['user_id', 'day', 'period', 'topic_id', 'subject_id',
+                 'questions_answered', 'correct_answers', 'time_spent_seconds']
+
+
+def _daily_rollup(*criteria):
+    """SELECT of answer totals per user, completion day and topic, in DAILY_COLUMNS order"""
+    return select(
+        TestSession.user_id,
+        cast(TestSession.completed_at, Date),
+        literal('day'),
+        Question.topic_id,
+        Topic.subject_id,
+        func.count(),
+        func.count().filter(UserAnswer.is_correct),
+        func.coalesce(func.sum(UserAnswer.time_spent_seconds), 0)
+    ).select_from(UserAnswer).join(
+        # answered_at >= started_at skips partitions older than the test
+        TestSession, (TestSession.id == UserAnswer.session_id)
+        & (UserAnswer.answered_at >= TestSession.started_at)
+    ).join(Question, Question.id == UserAnswer.question_id).join(
+        Topic, Topic.id == Question.topic_id
+    ).where(
+        TestSession.status == 'completed',
+        TestSession.completed_at.isnot(None),
+        *criteria
+    ).group_by(
+        TestSession.user_id, cast(TestSession.completed_at, Date), Question.topic_id, Topic.subject_id
+    )
+
+
+def _upsert_adding(rows):
+    """INSERT ... SELECT into user_daily_stats, adding to rows that already exist"""
+    table = UserDailyStats.__table__
+    stmt = insert(table).from_select(DAILY_COLUMNS, rows)
+    return stmt.on_conflict_do_update(
+        index_elements=['user_id', 'day', 'period', 'topic_id'],
+        set_={
+            column: table.c[column] + stmt.excluded[column]
+            for column in ('questions_answered', 'correct_answers', 'time_spent_seconds')
+        }
+    )
+
+
+class StatsService:
+    """Service for maintaining and reading the user_stats rollup"""
+
+    def get(self, user_id: int) -> Optional[UserStats]:
+        """Rollup row for a user (None before their first completed test)"""
+        return db.session.get(UserStats, user_id)
+
+    def record_completed_test(self, test: TestSession) -> UserStats:
+        """
+        Add a completed test to the user's rollup
+
+        Locks the user's row so concurrent completions don't lose updates.
+        Runs inside the caller's transaction.
+
+        Returns:
+            The updated UserStats row
+        """
+        db.session.execute(
+            insert(UserStats.__table__)
+            .values(user_id=test.user_id, tests_completed=0, percentage_total=0)
+            .on_conflict_do_nothing(index_elements=['user_id'])
+        )
+
+        stats = UserStats.query.filter_by(user_id=test.user_id).with_for_update().one()
+        stats.record_test(test.completed_at, test.percentage, test.subject_id)
+        return stats
+
+    def record_daily(self, test: TestSession):
+        """
+        Add a completed test's answers to the per-day topic rollup
+
+        One INSERT ... SELECT ... ON CONFLICT, so concurrent completions on
+        the same day add up instead of overwriting each other. Runs inside
+        the caller's transaction.
+        """
+        db.session.flush()
+        db.session.execute(_upsert_adding(_daily_rollup(TestSession.id == test.id)))
+
+    def history(self, user_id: int, days: int, subject_id: Optional[int] = None,
+                topic_id: Optional[int] = None) -> List[Dict]:
+        """
+        Answer totals per day (weeks for compacted history) over the last `days` days
+
+        At most one row per day, whatever the number of tests or topics.
+
+        Args:
+            user_id: User ID
+            days: Days to go back, today included; callers cap it at the
+                plan's max_stats_days
+            subject_id: Only this subject
+            topic_id: Only this topic
+
+        Returns:
+            [{'date', 'period', 'questions', 'correct', 'accuracy', 'time_spent'}], oldest first
+        """
+        # Days are UTC dates of completed_at
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        query = db.session.query(
+            UserDailyStats.day,
+            UserDailyStats.period,
+            func.sum(UserDailyStats.questions_answered),
+            func.sum(UserDailyStats.correct_answers),
+            func.sum(UserDailyStats.time_spent_seconds)
+        ).filter(
+            UserDailyStats.user_id == user_id,
+            UserDailyStats.day >= since
+        )
+        if subject_id is not None:
+            query = query.filter(UserDailyStats.subject_id == subject_id)
+        if topic_id is not None:
+            query = query.filter(UserDailyStats.topic_id == topic_id)
+
+        rows = query.group_by(UserDailyStats.day, UserDailyStats.period).order_by(UserDailyStats.day).all()
+        return [{
+            'date': day.isoformat(),
+            'period': period,
+            'questions': int(questions),
+            'correct': int(correct),
+            'accuracy': round(int(correct) / int(questions) * 100, 1) if questions else 0,
+            'time_spent': int(time_spent)
+        } for day, period, questions, correct, time_spent in rows]
+
+    def compact(self, older_than_days: int, chunk_size: int = 1000) -> int:
+        """
+        Merge daily rows older than `older_than_days` into weekly rows
+
+        Only whole weeks are merged: the cutoff is rounded down to a Monday.
+
+        Returns:
+            Number of daily rows merged
+        """
+        cutoff = datetime.utcnow().date() - timedelta(days=older_than_days)
+        cutoff -= timedelta(days=cutoff.weekday())
+
+        merged = 0
+        last_id = 0
+        while True:
+            user_ids = [user_id for user_id, in db.session.query(User.id).filter(
+                User.id > last_id
+            ).order_by(User.id).limit(chunk_size).all()]
+
+            if not user_ids:
+                break
+
+            old_days = (
+                UserDailyStats.user_id.in_(user_ids),
+                UserDailyStats.period == 'day',
+                UserDailyStats.day < cutoff
+            )
+            week = cast(func.date_trunc('week', UserDailyStats.day), Date)
+            db.session.execute(_upsert_adding(
+                select(
+                    UserDailyStats.user_id,
+                    week,
+                    literal('week'),
+                    UserDailyStats.topic_id,
+                    UserDailyStats.subject_id,
+                    func.sum(UserDailyStats.questions_answered),
+                    func.sum(UserDailyStats.correct_answers),
+                    func.sum(UserDailyStats.time_spent_seconds)
+                ).where(*old_days).group_by(
+                    UserDailyStats.user_id, week, UserDailyStats.topic_id, UserDailyStats.subject_id
+                )
+            ))
+            result = db.session.execute(
+                UserDailyStats.__table__.delete().where(*old_days)
+            )
+            db.session.commit()
+
+            merged += result.rowcount
+            last_id = user_ids[-1]
+
+        return merged
+
+    def backfill(self, chunk_size: int = 500) -> int:
+        """
+        Rebuild the rollup for every user from test history
+
+        Returns:
+            Number of users processed
+        """
+        total = 0
+        last_id = 0
+        while True:
+            user_ids = [user_id for user_id, in db.session.query(User.id).filter(
+                User.id > last_id
+            ).order_by(User.id).limit(chunk_size).all()]
+
+            if not user_ids:
+                break
+
+            tests = db.session.query(
+                TestSession.user_id,
+                TestSession.subject_id,
+                TestSession.completed_at,
+                TestSession.percentage
+            ).filter(
+                TestSession.user_id.in_(user_ids),
+                TestSession.status == 'completed',
+                TestSession.completed_at.isnot(None)
+            ).order_by(TestSession.completed_at).all()
+
+            rollups = {}
+            for user_id, subject_id, completed_at, percentage in tests:
+                if user_id not in rollups:
+                    rollups[user_id] = UserStats(
+                        user_id=user_id, tests_completed=0, percentage_total=0,
+                        daily_counts={}, weekly_counts={}, subject_stats={}
+                    )
+                rollups[user_id].record_test(completed_at, percentage, subject_id)
+
+            UserStats.query.filter(UserStats.user_id.in_(user_ids)).delete(synchronize_session=False)
+            db.session.add_all(rollups.values())
+            db.session.commit()
+
+            total += len(user_ids)
+            last_id = user_ids[-1]
+
+        return total
+
+    def backfill_daily(self, chunk_size: int = 500) -> int:
+        """
+        Rebuild the per-day topic rollup for every user from answer history
+
+        Archived answer months are no longer in user_answers, so run this
+        before the first `flask archive-answers`, not after.
+
+        Returns:
+            Number of users processed
+        """
+        total = 0
+        last_id = 0
+        while True:
+            user_ids = [user_id for user_id, in db.session.query(User.id).filter(
+                User.id > last_id
+            ).order_by(User.id).limit(chunk_size).all()]
+
+            if not user_ids:
+                break
+
+            UserDailyStats.query.filter(
+                UserDailyStats.user_id.in_(user_ids)
+            ).delete(synchronize_session=False)
+            db.session.execute(_upsert_adding(_daily_rollup(TestSession.user_id.in_(user_ids))))
+            db.session.commit()
+
+            total += len(user_ids)
+            last_id = user_ids[-1]
+
+        return total
@@ -1,13 +1,55 @@
 """
 Test generation and management service
 """
+import threading
+import time
 from datetime import datetime
 from typing import List, Optional
-from app import db
+from flask import current_app
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import array
+from app import db, redis_client
 from app.models.test import TestSession, UserAnswer
 from app.models.question import Question, QuestionTemplate
 from app.models.subject import Topic, UserTopicProgress
 from app.services.ai_service import AIService
+from app.services.adaptive_service import AdaptiveService
+from app.services.pool_service import QuestionPoolService
+from app.services.review_service import ReviewService
+from app.services.seen_service import SeenFilterService
+from app.services.stats_service import StatsService
+from app.services.badge_service import BadgeService
+from app.services.xp_service import XPService
+from app.services.activity_service import ActivityService
+from app.services.dashboard_service import invalidate_dashboard
+from app.utils import metrics
+
+
+def generation_key(session_id: int) -> str:
+    """Set while the rest of a test's questions are generated in the background"""
+    return f"test_generation:{session_id}"
+
+
+def _generate_in_background(app, session_id: int, topic_ids: List[int], num_questions: int,
+                            started: Optional[float] = None):
+    """Generate the remaining questions of a test, one committed question at a time"""
+    with app.app_context():
+        try:
+            service = TestService()
+            test_session = db.session.get(TestSession, session_id)
+            questions = service._generate_questions_for_test(
+                test_session, topic_ids, num_questions, batch_size=1
+            )
+            service.seen_filter.add(test_session.user_id, [q.id for q in questions])
+            if started is not None:
+                metrics.observe('test_start.full_test', time.monotonic() - started)
+        except Exception as e:
+            import traceback
+            print(f"Background question generation failed for test {session_id}: {e}")
+            traceback.print_exc()
+        finally:
+            redis_client.delete(generation_key(session_id))
+            db.session.remove()
 
 
 class TestService:
@@ -15,6 +57,14 @@ class TestService:
 
     def __init__(self):
         self._ai_service = None
+        self.adaptive_service = AdaptiveService()
+        self.review_service = ReviewService()
+        self.pool_service = QuestionPoolService()
+        self.seen_filter = SeenFilterService()
+        self.stats_service = StatsService()
+        self.badge_service = BadgeService()
+        self.xp_service = XPService()
+        self.activity_service = ActivityService()
 
     @property
     def ai_service(self):
@@ -32,6 +82,10 @@ class TestService:
         """
         Create a quick test with AI-recommended topics
 
+        Returns as soon as the first PROGRESSIVE_READY_QUESTIONS questions
+        exist; any others the bank could not supply are generated in the
+        background and picked up by the test page as they arrive.
+
         Args:
             user_id: User ID
             subject_id: Subject ID
@@ -40,18 +94,22 @@ class TestService:
         Returns:
             TestSession object
         """
-        # Find weak topics for this user and subject
-        weak_topics = UserTopicProgress.query.join(Topic).filter(
-            UserTopicProgress.user_id == user_id,
-            Topic.subject_id == subject_id,
-            UserTopicProgress.accuracy_rate < 70
-        ).order_by(UserTopicProgress.accuracy_rate.asc()).limit(3).all()
+        started = time.monotonic()
 
-        if weak_topics:
-            topic_ids = [tp.topic_id for tp in weak_topics]
-            print(f"DEBUG: Using weak topics: {topic_ids}")
-        else:
-            # No progress yet, pick topics that have templates
+        # Topics due for review come from the spaced-repetition schedule
+        topic_ids = self.review_service.due_topics(user_id, subject_id, limit=3)
+
+        if topic_ids is None:
+            # No schedule cached for this user yet, find weak topics instead
+            weak_topics = db.session.query(UserTopicProgress.topic_id).join(Topic).filter(
+                UserTopicProgress.user_id == user_id,
+                Topic.subject_id == subject_id,
+                UserTopicProgress.accuracy_rate < 70
+            ).order_by(UserTopicProgress.accuracy_rate.asc()).limit(3).all()
+            topic_ids = [topic_id for topic_id, in weak_topics]
+
+        if not topic_ids:
+            # Nothing due, pick topics that have templates
             topics_with_templates = db.session.query(Topic).join(
                 QuestionTemplate,
                 Topic.id == QuestionTemplate.topic_id
@@ -69,6 +127,22 @@ class TestService:
             topic_ids = [t.id for t in topics_with_templates]
             print(f"DEBUG: Selected topic IDs: {topic_ids}")
 
+        abilities = dict.fromkeys(topic_ids, 0.0)
+        abilities.update(db.session.query(
+            UserTopicProgress.topic_id,
+            UserTopicProgress.ability_rating
+        ).filter(
+            UserTopicProgress.user_id == user_id,
+            UserTopicProgress.topic_id.in_(topic_ids)
+        ).all())
+
+        # Pick bank questions matched to the student's ability
+        # (skipping questions this student has recently seen)
+        question_ids = self.adaptive_service.select_questions(
+            subject_id, abilities, num_questions,
+            is_seen=lambda ids: self.seen_filter.seen(user_id, ids)
+        )
+
         # Create test session
         test_session = TestSession(
             user_id=user_id,
@@ -77,13 +151,76 @@ class TestService:
             total_questions=num_questions,
             difficulty='medium',
             topic_ids=topic_ids,
+            question_ids=question_ids,
             status='in_progress'
         )
         db.session.add(test_session)
         db.session.commit()
 
-        # Generate questions
-        self._generate_questions_for_test(test_session, topic_ids, num_questions)
+        # Generate questions only if the bank ran short, just enough to start now
+        missing = num_questions - len(question_ids)
+        ready_now = max(0, current_app.config['PROGRESSIVE_READY_QUESTIONS'] - len(question_ids))
+        ready_now = min(ready_now, missing)
+        if ready_now:
+            self._generate_questions_for_test(test_session, topic_ids, ready_now)
+
+        self.seen_filter.add(user_id, test_session.question_ids)
+        self.activity_service.mark(user_id)
+        metrics.observe('test_start.first_question', time.monotonic() - started)
+
+        if missing > ready_now:
+            redis_client.setex(generation_key(test_session.id), 600, 1)
+            self._start_generation(test_session.id, topic_ids, missing - ready_now, started)
+        else:
+            metrics.observe('test_start.full_test', time.monotonic() - started)
+
+        return test_session
+
+    def create_topic_test(
+            self,
+            user_id: int,
+            topic_id: int,
+            num_questions: int = 10,
+            difficulty: str = 'medium'
+    ) -> TestSession:
+        """
+        Create a test for a single topic from its prefilled question pool
+
+        No questions are generated here; short pools are queued for
+        `flask fill-question-pools --refill-only`.
+
+        Args:
+            user_id: User ID
+            topic_id: Topic ID
+            num_questions: Number of questions
+            difficulty: 'easy', 'medium' or 'hard'
+
+        Returns:
+            TestSession object
+        """
+        subject_id, question_ids = self.pool_service.draw(
+            topic_id, difficulty, num_questions,
+            is_seen=lambda ids: self.seen_filter.seen(user_id, ids)
+        )
+
+        if subject_id is None or not question_ids:
+            raise ValueError(f"No questions available for topic {topic_id}")
+
+        test_session = TestSession(
+            user_id=user_id,
+            subject_id=subject_id,
+            test_type='topic',
+            total_questions=len(question_ids),
+            difficulty=difficulty,
+            topic_ids=[topic_id],
+            question_ids=question_ids,
+            status='in_progress'
+        )
+        db.session.add(test_session)
+        db.session.commit()
+
+        self.seen_filter.add(user_id, question_ids)
+        self.activity_service.mark(user_id)
 
         return test_session
 
@@ -91,9 +228,15 @@ class TestService:
             self,
             test_session: TestSession,
             topic_ids: List[int],
-            num_questions: int
+            num_questions: int,
+            batch_size: Optional[int] = None
     ):
-        """Generate and attach questions to test session"""
+        """
+        Generate and attach questions to test session
+
+        Each batch is committed and appended to the session's question list
+        before the next one starts, so readers see questions as they arrive.
+        """
         print(f"DEBUG: Looking for templates with topic_ids: {topic_ids}")
 
         # Get templates for these topics
@@ -106,34 +249,84 @@ class TestService:
         if not templates:
             raise ValueError("No question templates found for these topics")
 
+        # Continue the template rotation after questions already attached
+        offset = len(test_session.question_ids or [])
+        batch_size = batch_size or num_questions
+
         # Generate questions
         questions_generated = []
-        for i in range(num_questions):
-            # Pick a random template
-            template = templates[i % len(templates)]
-
-            # Generate question using AI
-            question_data = self.ai_service.generate_question_from_template(template)
-
-            # Create Question object
-            question = Question(
-                template_id=template.id,
-                topic_id=template.topic_id,
-                question_text=question_data['question_text'],
-                question_type=template.question_type,
-                difficulty=template.difficulty,
-                correct_answer=question_data['correct_answer'],
-                choices=question_data.get('choices'),
-                explanation=question_data.get('explanation'),
-                variables_used=question_data.get('variables_used')
-            )
-            db.session.add(question)
-            questions_generated.append(question)
+        for batch_start in range(0, num_questions, batch_size):
+            batch = []
+            for i in range(batch_start, min(batch_start + batch_size, num_questions)):
+                template = templates[(offset + i) % len(templates)]
 
-        db.session.commit()
+                # Generate question using AI
+                question_data = self.ai_service.generate_question_from_template(template)
+
+                # Create Question object
+                question = self.pool_service.build_question(template, question_data)
+                db.session.add(question)
+                batch.append(question)
+
+            db.session.flush()
+
+            # Attach to the session in order after any bank questions
+            self._append_questions(test_session, [q.id for q in batch])
+            db.session.commit()
+
+            self.adaptive_service.add_questions(test_session.subject_id, batch)
+            self.pool_service.add_questions(batch, test_session.subject_id)
+            questions_generated.extend(batch)
 
         return questions_generated
 
+    def _append_questions(self, test_session: TestSession, question_ids: List[int]):
+        """Atomically append question IDs to a session (safe alongside background generation)"""
+        TestSession.query.filter_by(id=test_session.id).update({
+            TestSession.question_ids: func.array_cat(
+                func.coalesce(TestSession.question_ids, literal_column("'{}'::integer[]")),
+                array(question_ids, type_=db.Integer)
+            )
+        }, synchronize_session=False)
+        db.session.expire(test_session, ['question_ids'])
+
+    def _start_generation(self, session_id: int, topic_ids: List[int], num_questions: int,
+                          started: Optional[float] = None):
+        """Generate questions in a background thread; the caller has set the generation flag"""
+        threading.Thread(
+            target=_generate_in_background,
+            args=(current_app._get_current_object(), session_id, topic_ids, num_questions, started),
+            daemon=True
+        ).start()
+
+    def is_generating(self, session_id: int) -> bool:
+        """Whether questions for this test are still being generated in the background"""
+        return bool(redis_client.exists(generation_key(session_id)))
+
+    def resume_generation(self, test_session: TestSession) -> bool:
+        """
+        Restart background generation of a test left short, e.g. when the
+        worker generating it died
+
+        Only one caller gets the generation flag, so concurrent requests
+        start at most one generator.
+
+        Returns:
+            True if generation was started
+        """
+        if not redis_client.set(generation_key(test_session.id), 1, nx=True, ex=600):
+            return False
+
+        # Re-read under the flag: a generator that just finished has appended its questions
+        db.session.refresh(test_session, ['question_ids'])
+        missing = test_session.total_questions - len(test_session.question_ids or [])
+        if missing <= 0:
+            redis_client.delete(generation_key(test_session.id))
+            return False
+
+        self._start_generation(test_session.id, test_session.topic_ids, missing)
+        return True
+
     def submit_answer(
             self,
             session_id: int,
@@ -190,13 +383,19 @@ class TestService:
         return user == correct
 
     def _update_topic_progress(self, test: TestSession):
-        """Update user's progress for topics in this test"""
+        """
+        Update user's progress for topics in this test
+
+        Returns:
+            (progress per topic ID, largest accuracy gain over a topic's
+            previous accuracy, or None if no topic had history)
+        """
         from sqlalchemy.orm import joinedload
 
         # Get all answers for this test with questions pre-loaded
-        answers = UserAnswer.query.options(
+        answers = UserAnswer.for_session(test).options(
             joinedload(UserAnswer.question)
-        ).filter_by(session_id=test.id).all()
+        ).all()
 
         # Group by topic
         topic_stats = {}
@@ -214,6 +413,8 @@ class TestService:
                 topic_stats[topic_id]['correct'] += 1
 
         # Update progress for each topic
+        progress_by_topic = {}
+        accuracy_improvement = None
         for topic_id, stats in topic_stats.items():
             progress = UserTopicProgress.query.filter_by(
                 user_id=test.user_id,
@@ -227,12 +428,24 @@ class TestService:
                 )
                 db.session.add(progress)
 
+            # How much better this test went than the topic's history so far
+            if progress.total_questions:
+                gain = stats['correct'] / stats['total'] * 100 - float(progress.accuracy_rate or 0)
+                accuracy_improvement = max(gain, accuracy_improvement or gain)
+
             # Update stats
             for _ in range(stats['correct']):
                 progress.update_progress(True)
             for _ in range(stats['total'] - stats['correct']):
                 progress.update_progress(False)
 
+            progress_by_topic[topic_id] = progress
+
+        # Update ability and question difficulty ratings
+        self.adaptive_service.record_answers(progress_by_topic, answers)
+
+        return progress_by_topic, accuracy_improvement
+
 
     def complete_test(self, session_id: int) -> TestSession:
         """
@@ -244,20 +457,61 @@ class TestService:
         Returns:
             Updated TestSession
         """
-        test = TestSession.query.get(session_id)
+        # Row lock until commit: a concurrent completion waits here, then
+        # sees the test completed, so side effects are applied only once
+        test = db.session.get(TestSession, session_id, with_for_update=True, populate_existing=True)
         if not test:
             raise ValueError("Test session not found")
 
+        if test.status == 'completed':
+            return test
+
         test.status = 'completed'
         test.completed_at = datetime.utcnow()
 
         # Get answers for verification
-        answers = UserAnswer.query.filter_by(session_id=session_id).all()
+        answers = UserAnswer.for_session(test).all()
 
         test.calculate_results()
 
         # Update user progress for topics
-        self._update_topic_progress(test)
+        progress_by_topic, accuracy_improvement = self._update_topic_progress(test)
+
+        # Update the user's stats rollups in the same transaction
+        stats = self.stats_service.record_completed_test(test)
+        self.stats_service.record_daily(test)
+
+        # Sync the streak from the activity bitmap (kept as-is if Redis is down)
+        self.activity_service.mark(test.user_id)
+        streak = self.activity_service.current_streak(test.user_id)
+        if streak is not None:
+            test.user.streak_days = streak
+            test.user.last_activity_date = test.completed_at.date()
+
+        # Check only the badge conditions this test changed
+        observed = {
+            'tests_completed': stats.tests_completed,
+            'tests_per_subject': (stats.subject_stats or {}).get(str(test.subject_id), {}).get('tests'),
+            'test_accuracy': float(test.percentage or 0),
+            'accuracy_improvement': accuracy_improvement,
+            'streak_days': test.user.streak_days
+        }
+        if len(test.answers) >= test.total_questions:
+            observed['test_time'] = test.time_spent_seconds
+        awarded = self.badge_service.evaluate(test.user_id, observed)
+        badge_xp = self.xp_service.award(
+            test.user_id,
+            [(xp_reward, 'badge', badge_id) for badge_id, xp_reward in awarded]
+        ) if awarded else None
 
         db.session.commit()
+
+        if badge_xp:
+            self.xp_service.publish(test.user_id, badge_xp)
+
+        # Reschedule practiced topics for review
+        self.review_service.schedule(test.user_id, test.subject_id, progress_by_topic.values())
+
+        invalidate_dashboard(test.user_id)
+
         return test
\ No newline at end of file
@@ -0,0 +1,281 @@
+"""
+Topic hierarchy: closure table in the database, cached trees per worker
+
+topic_closure holds every (ancestor, descendant) pair, so subtree and
+rollup queries are plain joins instead of recursive CTEs. Each worker
+keeps the tree of a subject in memory and rebuilds it when the global
+version in Redis moves on, which happens after every committed topic
+change.
+"""
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from flask import current_app, g, has_app_context
+from redis.exceptions import RedisError
+from sqlalchemy import event, func, inspect, text
+from sqlalchemy.orm import Session, object_session
+from app import db, redis_client
+from app.models.subject import Topic, TopicClosure, UserTopicProgress
+
+TREE_VERSION_KEY = 'topic_tree:version'
+
+# A new topic inherits its parent's ancestors, plus itself at depth 0
+INSERT_LINKS_SQL = """
+INSERT INTO topic_closure (ancestor_id, descendant_id, depth)
+SELECT ancestor_id, :topic_id, depth + 1 FROM topic_closure WHERE descendant_id = :parent_id
+UNION ALL
+SELECT :topic_id, :topic_id, 0
+"""
+
+# Moving a subtree: forget the old ancestors above it, link the new ones
+DETACH_SUBTREE_SQL = """
+DELETE FROM topic_closure
+WHERE descendant_id IN (SELECT descendant_id FROM topic_closure WHERE ancestor_id = :topic_id)
+  AND ancestor_id NOT IN (SELECT descendant_id FROM topic_closure WHERE ancestor_id = :topic_id)
+"""
+
+ATTACH_SUBTREE_SQL = """
+INSERT INTO topic_closure (ancestor_id, descendant_id, depth)
+SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+FROM topic_closure above, topic_closure below
+WHERE above.descendant_id = :parent_id AND below.ancestor_id = :topic_id
+"""
+
+REBUILD_SQL = """
+INSERT INTO topic_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM topics
+    UNION ALL
+    SELECT tree.ancestor_id, t.id, tree.depth + 1
+    FROM tree JOIN topics t ON t.parent_topic_id = tree.descendant_id
+)
+SELECT ancestor_id, descendant_id, depth FROM tree
+"""
+
+
+class TopicTree:
+    """Immutable topic hierarchy of one subject"""
+
+    def __init__(self, subject_id: int, version: Optional[int], rows: Iterable[Tuple]):
+        """
+        Args:
+            subject_id: Subject ID
+            version: Global tree version the rows were read at
+            rows: (ancestor_id, descendant_id, depth, descendant order_index) closure rows
+        """
+        self.subject_id = subject_id
+        self.version = version
+        self.built_at = time.monotonic()
+
+        descendants: Dict[int, set] = {}
+        ancestors: Dict[int, List[Tuple[int, int]]] = {}
+        children: Dict[int, List[Tuple[int, int]]] = {}
+        parents: Dict[int, int] = {}
+
+        for ancestor_id, descendant_id, depth, order_index in rows:
+            descendants.setdefault(ancestor_id, set()).add(descendant_id)
+            if depth:
+                ancestors.setdefault(descendant_id, []).append((depth, ancestor_id))
+            if depth == 1:
+                children.setdefault(ancestor_id, []).append((order_index or 0, descendant_id))
+                parents[descendant_id] = ancestor_id
+
+        self._descendants: Dict[int, FrozenSet[int]] = {
+            topic_id: frozenset(ids) for topic_id, ids in descendants.items()
+        }
+        # Nearest ancestor first
+        self._ancestors: Dict[int, Tuple[int, ...]] = {
+            topic_id: tuple(ancestor_id for _, ancestor_id in sorted(links))
+            for topic_id, links in ancestors.items()
+        }
+        self._children: Dict[int, Tuple[int, ...]] = {
+            topic_id: tuple(child_id for _, child_id in sorted(links))
+            for topic_id, links in children.items()
+        }
+        self._parents = parents
+        self.roots = sorted(topic_id for topic_id in self._descendants if topic_id not in parents)
+
+    def __contains__(self, topic_id: int) -> bool:
+        return topic_id in self._descendants
+
+    def subtree(self, topic_id: int) -> FrozenSet[int]:
+        """The topic and everything below it (empty for unknown topics)"""
+        return self._descendants.get(topic_id, frozenset())
+
+    def ancestors(self, topic_id: int) -> Tuple[int, ...]:
+        """Topics above this one, nearest first"""
+        return self._ancestors.get(topic_id, ())
+
+    def children(self, topic_id: int) -> Tuple[int, ...]:
+        """Direct subtopics, in display order"""
+        return self._children.get(topic_id, ())
+
+    def parent(self, topic_id: int) -> Optional[int]:
+        return self._parents.get(topic_id)
+
+
+# Per-worker trees, keyed by subject ID
+_trees: Dict[int, TopicTree] = {}
+_trees_lock = threading.Lock()
+
+
+def _current_version() -> Optional[int]:
+    """Global tree version, read from Redis at most once per request"""
+    if has_app_context() and '_topic_tree_version' in g:
+        return g._topic_tree_version
+
+    try:
+        version = int(redis_client.get(TREE_VERSION_KEY) or 0)
+    except RedisError as e:
+        print(f"Topic tree version read failed: {e}")
+        version = None
+
+    if has_app_context():
+        g._topic_tree_version = version
+    return version
+
+
+class TopicTreeService:
+    """Service for topic hierarchy lookups and rollups"""
+
+    def get_tree(self, subject_id: int) -> TopicTree:
+        """
+        Topic tree of a subject, built on first use
+
+        Rebuilt when the global version changes, or after TOPIC_TREE_TTL
+        seconds in case a version bump was lost.
+        """
+        version = _current_version()
+        tree = _trees.get(subject_id)
+
+        if self._is_stale(tree, version):
+            with _trees_lock:
+                tree = _trees.get(subject_id)
+                if self._is_stale(tree, version):
+                    tree = self._build_tree(subject_id, version)
+                    _trees[subject_id] = tree
+
+        return tree
+
+    def _is_stale(self, tree: Optional[TopicTree], version: Optional[int]) -> bool:
+        if tree is None:
+            return True
+        if version is not None and tree.version != version:
+            return True
+        return time.monotonic() - tree.built_at > current_app.config['TOPIC_TREE_TTL']
+
+    def _build_tree(self, subject_id: int, version: Optional[int]) -> TopicTree:
+        """Load the closure rows of a subject's topics"""
+        rows = db.session.query(
+            TopicClosure.ancestor_id,
+            TopicClosure.descendant_id,
+            TopicClosure.depth,
+            Topic.order_index
+        ).join(Topic, Topic.id == TopicClosure.descendant_id).filter(
+            Topic.subject_id == subject_id
+        ).all()
+
+        return TopicTree(subject_id, version, rows)
+
+    def progress_rollup(self, user_id: int, subject_id: int) -> Dict[int, Dict]:
+        """
+        A user's progress summed over each topic's whole subtree, in one query
+
+        Returns:
+            {topic_id: {'total_questions', 'correct_answers', 'accuracy', 'topics_practiced'}}
+            for every topic with practiced topics in its subtree
+        """
+        rows = db.session.query(
+            TopicClosure.ancestor_id,
+            func.sum(UserTopicProgress.total_questions),
+            func.sum(UserTopicProgress.correct_answers),
+            func.count(UserTopicProgress.id)
+        ).join(
+            UserTopicProgress, UserTopicProgress.topic_id == TopicClosure.descendant_id
+        ).join(Topic, Topic.id == TopicClosure.ancestor_id).filter(
+            UserTopicProgress.user_id == user_id,
+            Topic.subject_id == subject_id
+        ).group_by(TopicClosure.ancestor_id).all()
+
+        return {
+            topic_id: {
+                'total_questions': int(total or 0),
+                'correct_answers': int(correct or 0),
+                'accuracy': round(int(correct or 0) / int(total) * 100, 1) if total else 0,
+                'topics_practiced': practiced
+            }
+            for topic_id, total, correct, practiced in rows
+        }
+
+    def rebuild(self) -> int:
+        """
+        Recompute topic_closure from topics.parent_topic_id
+
+        Needed after topics were written without the ORM (bulk imports,
+        manual SQL), which skips the listeners below.
+
+        Returns:
+            Number of closure rows
+        """
+        db.session.execute(TopicClosure.__table__.delete())
+        rows = db.session.execute(text(REBUILD_SQL)).rowcount
+        db.session.commit()
+        self.bump_version()
+        return rows
+
+    def bump_version(self):
+        """Make every worker rebuild its trees"""
+        try:
+            redis_client.incr(TREE_VERSION_KEY)
+        except RedisError as e:
+            print(f"Topic tree version bump failed, trees refresh within TOPIC_TREE_TTL: {e}")
+
+
+# Closure rows are written in the same transaction as the topic change; the
+# version is bumped only once it commits, so workers never cache a tree
+# that was rolled back
+@event.listens_for(Topic, 'after_insert')
+def _topic_inserted(mapper, connection, target):
+    connection.execute(text(INSERT_LINKS_SQL), {
+        'topic_id': target.id,
+        'parent_id': target.parent_topic_id
+    })
+    _mark_changed(target)
+
+
+@event.listens_for(Topic, 'after_update')
+def _topic_updated(mapper, connection, target):
+    if inspect(target).attrs.parent_topic_id.history.has_changes():
+        params = {'topic_id': target.id, 'parent_id': target.parent_topic_id}
+        below = connection.execute(text(
+            "SELECT 1 FROM topic_closure WHERE ancestor_id = :topic_id AND descendant_id = :parent_id"
+        ), params).first()
+        if below:
+            raise ValueError(f"Topic {target.id} can't be moved under its own subtree")
+
+        connection.execute(text(DETACH_SUBTREE_SQL), params)
+        connection.execute(text(ATTACH_SUBTREE_SQL), params)
+    _mark_changed(target)
+
+
+@event.listens_for(Topic, 'after_delete')
+def _topic_deleted(mapper, connection, target):
+    # Its closure rows go with it (ON DELETE CASCADE)
+    _mark_changed(target)
+
+
+def _mark_changed(target):
+    session = object_session(target)
+    if session is not None:
+        session.info['topic_tree_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_if_changed(session):
+    if session.info.pop('topic_tree_changed', None):
+        TopicTreeService().bump_version()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed(session):
+    session.info.pop('topic_tree_changed', None)
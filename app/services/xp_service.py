@@ -0,0 +1,173 @@
+"""
+XP awards recorded in an append-only ledger
+"""
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.models.gamification import XPEvent
+from app.models.test import TestSession
+from app.models.user import User
+from app.utils import user_cache
+from app.utils.levels import level_for_xp, level_for_xp_sql
+
+XP_PER_CORRECT = 10
+PERFECT_SCORE_BONUS = 50
+
+# Opening balances carry XP earned before the ledger existed
+OPENING_BALANCE_SOURCE = 0
+
+
+def test_awards(test: TestSession) -> List[Tuple[int, str, int]]:
+    """(amount, reason, source_id) awards a completed test earns"""
+    awards = [((test.score or 0) * XP_PER_CORRECT, 'test_score', test.id)]
+    if test.percentage is not None and float(test.percentage) == 100:
+        awards.append((PERFECT_SCORE_BONUS, 'perfect_score', test.id))
+    return awards
+
+
+class XPService:
+    """Service for awarding XP"""
+
+    def award(self, user_id: int, awards: List[Tuple[int, str, int]]) -> Dict:
+        """
+        Record XP awards and add them to the user's total
+
+        Each award is one ledger insert; awards already recorded for the
+        same (reason, source_id) are skipped, so retries don't pay twice.
+        users.xp and level are bumped by a single atomic UPDATE instead of
+        a read-modify-write. Runs inside the caller's transaction.
+
+        Args:
+            user_id: User ID
+            awards: (amount, reason, source_id) tuples
+
+        Returns:
+            {'earned', 'xp', 'level', 'leveled_up', 'grade'}
+        """
+        awards = [(amount, reason, source_id) for amount, reason, source_id in awards if amount]
+
+        earned = 0
+        if awards:
+            table = XPEvent.__table__
+            earned = sum(amount for amount, in db.session.execute(
+                insert(table)
+                .values([
+                    {'user_id': user_id, 'amount': amount, 'reason': reason, 'source_id': source_id}
+                    for amount, reason, source_id in awards
+                ])
+                .on_conflict_do_nothing(constraint='uix_xp_event_source')
+                .returning(table.c.amount)
+            ).all())
+
+        if earned:
+            xp, level, grade = db.session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(
+                    xp=func.coalesce(User.xp, 0) + earned,
+                    level=func.greatest(User.level, level_for_xp_sql(func.coalesce(User.xp, 0) + earned))
+                )
+                .returning(User.xp, User.level, User.grade)
+                .execution_options(synchronize_session='fetch')
+            ).one()
+            # Bulk UPDATE skips mapper events; drop the cached login snapshot explicitly
+            user_cache.mark_changed(db.session, user_id)
+        else:
+            xp, level, grade = db.session.query(User.xp, User.level, User.grade).filter(
+                User.id == user_id
+            ).one()
+
+        return {
+            'earned': earned,
+            'xp': xp,
+            'level': level,
+            'leveled_up': bool(earned) and level_for_xp(xp - earned) < level,
+            'grade': grade
+        }
+
+    def award_for_test(self, test: TestSession) -> Dict:
+        """Award the score and perfect-score XP of a completed test"""
+        return self.award(test.user_id, test_awards(test))
+
+    def publish(self, user_id: int, result: Dict, subject_id: Optional[int] = None):
+        """
+        Push an award to the leaderboards
+
+        Call after committing, so boards never show XP that was rolled back.
+        """
+        if not result['earned']:
+            return
+
+        from app.services.leaderboard_service import LeaderboardService
+        LeaderboardService().record_xp(
+            user_id,
+            result['xp'],
+            result['earned'],
+            grade=result['grade'],
+            subject_id=subject_id
+        )
+
+    def reconcile(self, chunk_size: int = 1000) -> int:
+        """
+        Recompute users.xp and level from the ledger
+
+        Users whose XP predates the ledger first get an opening balance
+        for the difference, so nothing is lost. Run after deploying the
+        ledger and periodically to repair drift.
+
+        Returns:
+            Number of users whose totals changed
+        """
+        changed = 0
+        last_id = 0
+        while True:
+            user_ids = [user_id for user_id, in db.session.query(User.id).filter(
+                User.id > last_id
+            ).order_by(User.id).limit(chunk_size).all()]
+
+            if not user_ids:
+                break
+
+            ledger = select(
+                XPEvent.user_id,
+                func.sum(XPEvent.amount).label('total')
+            ).where(XPEvent.user_id.in_(user_ids)).group_by(XPEvent.user_id).subquery()
+
+            opening = [
+                {'user_id': user_id, 'amount': (xp or 0) - (total or 0),
+                 'reason': 'opening_balance', 'source_id': OPENING_BALANCE_SOURCE}
+                for user_id, xp, total in db.session.query(
+                    User.id, User.xp, ledger.c.total
+                ).outerjoin(ledger, ledger.c.user_id == User.id).filter(
+                    User.id.in_(user_ids)
+                ).all()
+                if (xp or 0) != (total or 0)
+            ]
+            if opening:
+                db.session.execute(
+                    insert(XPEvent.__table__)
+                    .values(opening)
+                    .on_conflict_do_nothing(constraint='uix_xp_event_source')
+                )
+
+            # Totals again, now including the opening balances
+            ledger = select(
+                XPEvent.user_id,
+                func.sum(XPEvent.amount).label('total')
+            ).where(XPEvent.user_id.in_(user_ids)).group_by(XPEvent.user_id).subquery()
+
+            result = db.session.execute(
+                update(User)
+                .where(User.id == ledger.c.user_id, User.xp != ledger.c.total)
+                .values(xp=ledger.c.total, level=level_for_xp_sql(ledger.c.total))
+                .execution_options(synchronize_session=False)
+            )
+            for user_id in user_ids:
+                user_cache.mark_changed(db.session, user_id)
+            db.session.commit()
+
+            changed += result.rowcount
+            last_id = user_ids[-1]
+
+        return changed
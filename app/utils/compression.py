@@ -0,0 +1,141 @@
+"""
+gzip / Brotli response compression
+
+Text responses of at least COMPRESS_MIN_SIZE bytes are compressed with
+the best encoding the client accepts (Brotli needs the optional
+`brotli` package). Responses carrying a strong ETag are immutable for
+that ETag, so their compressed bodies are cached per worker and
+compressed harder. Their ETag stays strong, with the encoding appended
+("<tag>-gzip", "<tag>-br"): each encoding is a different representation.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Optional
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Quality for bodies compressed on every request vs once per ETag
+GZIP_LEVEL = 6
+GZIP_LEVEL_CACHED = 9
+BROTLI_QUALITY = 5
+BROTLI_QUALITY_CACHED = 11
+
+ENCODINGS = ('br', 'gzip')
+
+
+class _CompressedCache:
+    """LRU of compressed bodies keyed by (ETag, encoding)"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+
+    def get(self, key) -> Optional[bytes]:
+        with self.lock:
+            body = self.items.get(key)
+            if body is not None:
+                self.items.move_to_end(key)
+            return body
+
+    def put(self, key, body: bytes):
+        with self.lock:
+            self.items[key] = body
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+
+def _encoding() -> Optional[str]:
+    """Best encoding the client accepts"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of a body compressed with `encoding`"""
+    return f"{etag}-{encoding}"
+
+
+def matching_etag(if_none_match, etag: str) -> Optional[str]:
+    """
+    The variant of `etag` (plain or any encoding's) the client already has,
+    or None
+
+    Args:
+        if_none_match: request.if_none_match
+        etag: ETag of the uncompressed body
+    """
+    for candidate in (etag, *(encoded_etag(etag, encoding) for encoding in ENCODINGS)):
+        if if_none_match.contains_weak(candidate):
+            return candidate
+    return None
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY_CACHED if cached else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL_CACHED if cached else GZIP_LEVEL)
+
+
+def init_compression(app):
+    """Compress eligible responses after each request"""
+    if not app.config.get('COMPRESS_RESPONSES'):
+        return
+
+    min_size = app.config['COMPRESS_MIN_SIZE']
+    mimetypes = set(app.config['COMPRESS_MIMETYPES'])
+    cache = _CompressedCache(app.config['COMPRESS_CACHE_SIZE'])
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in mimetypes:
+            return response
+        if response.status_code == 304:
+            response.vary.add('Accept-Encoding')
+            return response
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        encoding = _encoding()
+        if encoding is None:
+            return response
+
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+
+        etag, weak = response.get_etag()
+        immutable = bool(etag) and not weak
+        if immutable:
+            key = (etag, encoding)
+            compressed = cache.get(key)
+            if compressed is None:
+                compressed = compress(body, encoding, cached=True)
+                cache.put(key, compressed)
+        else:
+            compressed = compress(body, encoding)
+
+        if len(compressed) >= len(body):
+            return response
+
+        if immutable:
+            # The compressed bytes are a representation of their own
+            response.set_etag(encoded_etag(etag, encoding))
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
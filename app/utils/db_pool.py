@@ -0,0 +1,125 @@
+"""
+Engine and connection pool settings, with pool metrics
+
+Pool activity is aggregated per worker and published to the metrics
+store at most every PUBLISH_INTERVAL seconds, so checkouts don't pay a
+Redis round trip each. Each engine's pool reports under its own name
+(`primary` or the replica's bind key).
+"""
+import threading
+import time
+from typing import Dict
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+from app.utils import metrics
+
+PUBLISH_INTERVAL = 5
+
+
+def engine_options(config, name: str = 'primary') -> Dict:
+    """SQLALCHEMY_ENGINE_OPTIONS built from the DB_* config values"""
+    if config['DB_PGBOUNCER']:
+        # PgBouncer (transaction mode) does the pooling; holding connections
+        # here would pin server connections to idle workers
+        return {'poolclass': NullPool, 'pool_logging_name': name}
+
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_logging_name': name,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING']
+    }
+
+
+def bind_options(config) -> Dict:
+    """
+    SQLALCHEMY_BINDS with each URL expanded to the same pool settings
+
+    Flask-SQLAlchemy applies SQLALCHEMY_ENGINE_OPTIONS to the default
+    engine only, so replicas need their options spelled out per bind.
+    """
+    return {
+        key: value if isinstance(value, dict) else {'url': value, **engine_options(config, key)}
+        for key, value in config['SQLALCHEMY_BINDS'].items()
+    }
+
+
+class _PoolStats:
+    """Checkout waits and peaks of one engine's pool since the last publish"""
+
+    def __init__(self, name: str):
+        self.prefix = f"db_pool.{name}"
+        self.lock = threading.Lock()
+        self.published_at = time.monotonic()
+        self.reset()
+
+    def reset(self):
+        self.wait_buckets = {}
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+
+    def record(self, pool, waited: float):
+        with self.lock:
+            bucket = metrics.bucket_for(waited)
+            self.wait_buckets[bucket] = self.wait_buckets.get(bucket, 0) + 1
+            self.wait_count += 1
+            self.wait_total += waited
+            self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+            self.peak_overflow = max(self.peak_overflow, pool.overflow())
+
+            if time.monotonic() - self.published_at < PUBLISH_INTERVAL:
+                return
+            batch = (dict(self.wait_buckets), self.wait_count, self.wait_total,
+                     self.peak_checked_out, self.peak_overflow)
+            self.reset()
+            self.published_at = time.monotonic()
+
+        buckets, count, total, peak_checked_out, peak_overflow = batch
+        metrics.observe_many(f'{self.prefix}.wait', buckets, count, total)
+        metrics.gauges({
+            f'{self.prefix}.checked_out': pool.checkedout(),
+            f'{self.prefix}.peak_checked_out': peak_checked_out,
+            f'{self.prefix}.overflow': max(peak_overflow, 0)
+        })
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports checkout waits, usage and overflow"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats = _PoolStats(self._orig_logging_name or 'primary')
+
+    def recreate(self):
+        pool = super().recreate()
+        pool._stats = self._stats
+        return pool
+
+    def _do_get(self):
+        started = time.monotonic()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            metrics.incr(f'{self._stats.prefix}.timeout')
+            raise
+        self._stats.record(self, time.monotonic() - started)
+        return connection
+
+
+@event.listens_for(InstrumentedQueuePool, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    connection_record.info['connected_at'] = time.monotonic()
+    metrics.incr('db_pool.connect')
+
+
+@event.listens_for(InstrumentedQueuePool, 'close')
+def _on_close(dbapi_connection, connection_record):
+    connected_at = connection_record.info.pop('connected_at', None)
+    if connected_at is not None:
+        metrics.observe('db_pool.connection_lifetime', time.monotonic() - connected_at)
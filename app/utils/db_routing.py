@@ -0,0 +1,109 @@
+"""
+Read-replica routing for the SQLAlchemy session
+
+Views marked @read_only send their SELECTs to a healthy replica from
+REPLICA_BINDS. Everything else, and every request shortly after the same
+browser wrote something (read-your-writes), uses the primary.
+"""
+import random
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+
+# Seconds the replica is behind; 0 when it has replayed everything it received
+# (NULL on a primary used as a stand-in replica)
+LAG_SQL = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+# bind key -> (checked at, healthy), per worker
+_health = {}
+
+
+def read_only(view):
+    """Let a view's queries go to a read replica"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _replica_is_healthy(db, bind_key: str) -> bool:
+    """Replica reachable and within REPLICA_MAX_LAG seconds (checked periodically)"""
+    now = time.monotonic()
+    checked = _health.get(bind_key)
+    if checked and now - checked[0] < current_app.config['REPLICA_CHECK_INTERVAL']:
+        return checked[1]
+
+    try:
+        with db.engines[bind_key].connect() as conn:
+            lag = conn.execute(text(LAG_SQL)).scalar()
+        healthy = float(lag or 0) <= current_app.config['REPLICA_MAX_LAG']
+        if not healthy:
+            print(f"Replica {bind_key} is {lag:.1f}s behind, reading from primary")
+    except SQLAlchemyError as e:
+        print(f"Replica {bind_key} unavailable, reading from primary: {e}")
+        healthy = False
+
+    _health[bind_key] = (now, healthy)
+    return healthy
+
+
+def _sticky_to_primary() -> bool:
+    """This browser wrote recently, so it must read its own writes"""
+    return flask_session.get('db_primary_until', 0) > time.time()
+
+
+class RoutingSession(Session):
+    """Session that sends read-only requests' SELECTs to a replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._can_use_replica(clause):
+            replicas = [
+                key for key in current_app.config['REPLICA_BINDS']
+                if _replica_is_healthy(self._db, key)
+            ]
+            if replicas:
+                g.db_replica_queries = g.get('db_replica_queries', 0) + 1
+                return self._db.engines[random.choice(replicas)]
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _can_use_replica(self, clause) -> bool:
+        if not has_request_context() or not g.get('db_read_only'):
+            return False
+        if not current_app.config['REPLICA_BINDS']:
+            return False
+        if not getattr(clause, 'is_select', False):
+            return False
+        if self._flushing or self.new or self.dirty or self.deleted or g.get('db_wrote'):
+            return False
+        return not _sticky_to_primary()
+
+
+def _remember_write():
+    """Pin this request, and this browser for a while, to the primary"""
+    if not has_request_context():
+        return
+    g.db_wrote = True
+    if current_app.config['REPLICA_BINDS']:
+        flask_session['db_primary_until'] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(session, flush_context):
+    _remember_write()
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _after_statement(orm_execute_state):
+    # Bulk INSERT/UPDATE/DELETE statements don't go through flush
+    if not orm_execute_state.is_select:
+        _remember_write()
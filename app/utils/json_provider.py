@@ -0,0 +1,50 @@
+"""
+Faster JSON for jsonify and request.get_json
+
+Uses orjson when it is installed and JSON_PROVIDER is 'orjson';
+otherwise Flask's stdlib provider stays in place. Output matches the
+stdlib provider's: sorted keys, HTTP dates for datetimes, Decimals as
+strings.
+"""
+import typing as t
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib provider
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson"""
+
+    # Datetimes go through DefaultJSONProvider.default (HTTP dates), like
+    # the stdlib provider; int dict keys are allowed, like json.dumps
+    option = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        return self.dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj: t.Any) -> bytes:
+        option = self.option
+        if self._app.debug:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def loads(self, s: t.Union[str, bytes], **kwargs: t.Any) -> t.Any:
+        return orjson.loads(s)
+
+    def response(self, *args: t.Any, **kwargs: t.Any):
+        # Skip the str round trip: the body is bytes already
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Install the configured JSON provider"""
+    if app.config.get('JSON_PROVIDER') != 'orjson':
+        return
+    if orjson is None:
+        print("JSON_PROVIDER is 'orjson' but orjson isn't installed, using the stdlib provider")
+        return
+    app.json = OrjsonProvider(app)
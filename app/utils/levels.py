@@ -0,0 +1,44 @@
+"""
+XP level table shared by the user model, XP awards and the dashboard
+"""
+from bisect import bisect_right
+from typing import Tuple
+from sqlalchemy import case
+
+# Level thresholds: 1=0, 2=100, 3=250, 4=500, 5=1000, etc.
+XP_THRESHOLDS = [0, 100, 250, 500, 1000, 2000, 4000, 7000, 11000, 16000]
+
+# XP needed per level beyond the table
+XP_PER_EXTRA_LEVEL = 5000
+
+
+def level_for_xp(xp: int) -> int:
+    """Level reached with this much XP"""
+    return bisect_right(XP_THRESHOLDS, xp or 0)
+
+
+def level_for_xp_sql(xp_expr):
+    """Same as level_for_xp, as a SQL expression"""
+    return case(
+        *[(xp_expr >= threshold, level) for level, threshold in reversed(list(enumerate(XP_THRESHOLDS, 1)))],
+        else_=1
+    )
+
+
+def level_progress(xp: int, level: int) -> Tuple[int, float]:
+    """
+    Progress towards the next level
+
+    Returns:
+        (XP still needed, percent of the current level completed)
+    """
+    xp = xp or 0
+    current_threshold = XP_THRESHOLDS[level - 1] if level <= len(XP_THRESHOLDS) else 0
+    next_threshold = XP_THRESHOLDS[level] if level < len(XP_THRESHOLDS) else current_threshold + XP_PER_EXTRA_LEVEL
+
+    xp_to_next_level = next_threshold - xp
+    if next_threshold > current_threshold:
+        xp_progress = (xp - current_threshold) / (next_threshold - current_threshold) * 100
+    else:
+        xp_progress = 100
+    return xp_to_next_level, round(xp_progress, 1)
@@ -0,0 +1,98 @@
+"""
+Lightweight counters and timing histograms stored in Redis
+
+Metrics must never break a request, so Redis errors are swallowed.
+"""
+import os
+from typing import Dict
+from redis.exceptions import RedisError
+
+# Histogram bucket upper bounds in seconds
+TIMING_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Gauges of a worker that stopped reporting are dropped after this long
+GAUGE_TTL = 300
+
+
+def _redis():
+    # Resolved at call time: this module may be imported before create_app()
+    from app import redis_client
+    return redis_client
+
+
+def incr(name: str, amount: int = 1):
+    """Increment a counter"""
+    try:
+        _redis().incrby(f"metrics:counter:{name}", amount)
+    except RedisError:
+        pass
+
+
+def bucket_for(seconds: float) -> str:
+    """Histogram bucket a duration falls into"""
+    return next((str(b) for b in TIMING_BUCKETS if seconds <= b), '+Inf')
+
+
+def observe(name: str, seconds: float):
+    """Record a duration in a histogram"""
+    observe_many(name, {bucket_for(seconds): 1}, 1, seconds)
+
+
+def observe_many(name: str, buckets: Dict[str, int], count: int, total: float):
+    """Record durations aggregated in-process (bucket -> count) in one round trip"""
+    key = f"metrics:timing:{name}"
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for bucket, n in buckets.items():
+            pipe.hincrby(key, bucket, n)
+        pipe.hincrby(key, 'count', count)
+        pipe.hincrbyfloat(key, 'sum', total)
+        pipe.execute()
+    except RedisError:
+        pass
+
+
+def gauges(values: Dict[str, float]):
+    """
+    Set this process's current value of some gauges
+
+    Each worker writes its own field; snapshot() sums them. Gauges of
+    workers that stopped reporting expire after GAUGE_TTL.
+    """
+    pid = str(os.getpid())
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for name, value in values.items():
+            key = f"metrics:gauge:{name}"
+            pipe.hset(key, pid, value)
+            pipe.expire(key, GAUGE_TTL)
+        pipe.execute()
+    except RedisError:
+        pass
+
+
+def snapshot() -> Dict[str, Dict]:
+    """All counters, gauges and histograms, for the `flask show-metrics` command"""
+    redis_client = _redis()
+    result = {'counters': {}, 'gauges': {}, 'timings': {}}
+
+    for key in redis_client.scan_iter(match='metrics:counter:*', count=500):
+        name = key.decode().split(':', 2)[2]
+        result['counters'][name] = int(redis_client.get(key) or 0)
+
+    for key in redis_client.scan_iter(match='metrics:gauge:*', count=500):
+        name = key.decode().split(':', 2)[2]
+        result['gauges'][name] = sum(float(v) for v in redis_client.hvals(key))
+
+    for key in redis_client.scan_iter(match='metrics:timing:*', count=500):
+        name = key.decode().split(':', 2)[2]
+        values = {k.decode(): float(v) for k, v in redis_client.hgetall(key).items()}
+        count = values.pop('count', 0)
+        total = values.pop('sum', 0.0)
+        result['timings'][name] = {
+            'count': int(count),
+            'avg': round(total / count, 3) if count else 0.0,
+            'buckets': values
+        }
+
+    return result
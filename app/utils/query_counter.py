@@ -0,0 +1,34 @@
+"""
+Per-request count of SQL statements
+
+Enabled with QUERY_COUNT_HEADER: every response then carries X-DB-Queries.
+"""
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.db_queries = g.get('db_queries', 0) + 1
+
+
+def query_count() -> int:
+    """Statements executed so far in this request"""
+    return g.get('db_queries', 0)
+
+
+def init_query_counter(app):
+    """Count queries per request and report them in a response header"""
+    if not app.config.get('QUERY_COUNT_HEADER'):
+        return
+
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+
+    @app.after_request
+    def add_query_count_header(response):
+        response.headers['X-DB-Queries'] = str(query_count())
+        if g.get('db_replica_queries'):
+            response.headers['X-DB-Replica-Queries'] = str(g.db_replica_queries)
+        return response
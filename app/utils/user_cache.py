@@ -0,0 +1,163 @@
+"""
+Cached user snapshots for the Flask-Login user loader
+
+Most requests only read a handful of user columns, so the loader returns a
+UserSnapshot built from Redis. The ORM User is loaded on first access to
+anything the snapshot doesn't carry (relationships, methods) or on the
+first attribute write.
+"""
+import json
+from datetime import datetime
+from typing import Optional
+from flask import current_app
+from flask_login import UserMixin
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app import db
+from app.models.user import User
+
+# Columns copied into the snapshot
+SNAPSHOT_FIELDS = (
+    'id', 'email', 'username', 'full_name', 'grade', 'birth_year', 'goal',
+    'onboarding_completed', 'xp', 'level', 'streak_days', 'is_active', 'created_at'
+)
+
+
+def _redis():
+    # Resolved at call time: this module may be imported before create_app()
+    from app import redis_client
+    return redis_client
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class UserSnapshot(UserMixin):
+    """Cached view of a user; loads the ORM object on demand"""
+
+    def __init__(self, data: dict):
+        object.__setattr__(self, '_data', data)
+        object.__setattr__(self, '_user', None)
+
+    @property
+    def is_active(self):
+        return bool(self._data.get('is_active', True))
+
+    @property
+    def plan(self) -> str:
+        """Subscription plan, from the cached entitlements"""
+        from app.services.entitlement_service import EntitlementService
+        return EntitlementService().get(self._data['id'])['plan']
+
+    def hydrate(self):
+        """The full ORM User (loaded once per request)"""
+        if self._user is None:
+            object.__setattr__(self, '_user', db.session.get(User, self._data['id']))
+        return self._user
+
+    def __getattr__(self, name):
+        data = self.__dict__.get('_data', {})
+        if name in data and self.__dict__.get('_user') is None:
+            return data[name]
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.hydrate(), name)
+
+    def __setattr__(self, name, value):
+        # Writes go to the ORM object, which is flushed and committed as usual
+        setattr(self.hydrate(), name, value)
+        if name in self._data:
+            self._data[name] = value
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self._data['id']
+
+    def __hash__(self):
+        return hash(self._data['id'])
+
+    def __repr__(self):
+        return f'<UserSnapshot {self._data.get("email")}>'
+
+
+def _dump(user) -> str:
+    data = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+    if data['created_at']:
+        data['created_at'] = data['created_at'].isoformat()
+    return json.dumps(data)
+
+
+def _load(payload) -> dict:
+    data = json.loads(payload)
+    if data['created_at']:
+        data['created_at'] = datetime.fromisoformat(data['created_at'])
+    return data
+
+
+def load_user(user_id: int) -> Optional[UserSnapshot]:
+    """Flask-Login user loader: Redis first, one query on a miss"""
+    key = user_key(user_id)
+    try:
+        cached = _redis().get(key)
+    except RedisError:
+        cached = None
+
+    if cached:
+        return UserSnapshot(_load(cached))
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+
+    payload = _dump(user)
+    try:
+        _redis().setex(key, current_app.config['USER_CACHE_TTL'], payload)
+    except RedisError as e:
+        print(f"User cache write failed: {e}")
+
+    snapshot = UserSnapshot(_load(payload))
+    object.__setattr__(snapshot, '_user', user)
+    return snapshot
+
+
+def mark_changed(session, user_id: int):
+    """
+    Drop a user's snapshot once the session commits
+
+    ORM changes to User are tracked automatically; call this after bulk
+    UPDATE statements, which bypass mapper events.
+    """
+    session.info.setdefault('users_changed', set()).add(user_id)
+
+
+def invalidate(user_ids):
+    """Drop cached snapshots now"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    try:
+        _redis().delete(*[user_key(user_id) for user_id in user_ids])
+    except RedisError as e:
+        print(f"User cache invalidation failed: {e}")
+
+
+# User changes are collected during flush and invalidated after commit
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        mark_changed(session, target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed(session):
+    changed = session.info.pop('users_changed', None)
+    if changed:
+        invalidate(changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed(session):
+    session.info.pop('users_changed', None)
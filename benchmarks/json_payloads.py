@@ -0,0 +1,138 @@
+"""
+JSON serialization time and payload size of the test API responses
+
+Builds payloads shaped like api_get_questions, api_get_explanation and
+the catalog endpoints, then times jsonify with the stdlib provider and
+with OrjsonProvider, and reports the body size raw, gzipped and (if
+`brotli` is installed) Brotli-compressed, at per-request and cached
+quality. Needs no database or Redis.
+
+    python benchmarks/json_payloads.py
+    python benchmarks/json_payloads.py --questions 50 --iterations 5000
+"""
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils import compression
+from app.utils.json_provider import OrjsonProvider, orjson
+
+QUESTION_TEXT = (
+    "Vypočítaj obsah pravouhlého trojuholníka, ktorého odvesny majú dĺžky {a} cm a {b} cm. "
+    "Výsledok zaokrúhli na dve desatinné miesta a nezabudni na jednotky."
+)
+
+EXPLANATION = (
+    "Pri pravouhlom trojuholníku sú odvesny na seba kolmé, takže jedna z nich je výškou na druhú. "
+    "Obsah preto vypočítame ako polovicu súčinu odvesien: S = a · b / 2.\n\n"
+    "Postup:\n1. Dosadíme dĺžky odvesien.\n2. Vynásobíme ich.\n3. Výsledok vydelíme dvomi.\n\n"
+    "Tvoja odpoveď sa líšila, pretože si zrejme zabudol deliť dvomi — to je najčastejšia chyba. "
+) * 4
+
+
+def questions_payload(count: int) -> dict:
+    return {
+        'questions': [{
+            'id': 100000 + i,
+            'question_text': QUESTION_TEXT.format(a=3 + i, b=4 + i),
+            'question_type': 'single_choice',
+            'difficulty': ('easy', 'medium', 'hard')[i % 3],
+            'choices': [f"{chr(65 + c)}) {(3 + i) * (4 + i) / 2 + c:.2f} cm²" for c in range(4)]
+        } for i in range(count)],
+        'total': count,
+        'complete': True
+    }
+
+
+def explanation_payload() -> dict:
+    return {'explanation': EXPLANATION}
+
+
+def topics_payload(count: int) -> list:
+    return [{
+        'id': i,
+        'name': f"Téma {i}: Rovnice a nerovnice s neznámou v menovateli",
+        'slug': f"tema-{i}",
+        'difficulty': ('easy', 'medium', 'hard')[i % 3]
+    } for i in range(count)]
+
+
+def history_payload(count: int) -> dict:
+    # Decimals and ints keyed dicts exercise the provider fallbacks
+    return {
+        'tests': [{
+            'id': i,
+            'subject': 'Matematika',
+            'percentage': Decimal('87.50'),
+            'score': 7,
+            'completed_at': '2026-10-19T12:00:00'
+        } for i in range(count)],
+        'progress': {i: {'accuracy': 71.5} for i in range(10)}
+    }
+
+
+def time_per_call(app, provider, payload, iterations: int) -> float:
+    """Microseconds per jsonify-equivalent call"""
+    with app.app_context():
+        started = time.perf_counter()
+        for _ in range(iterations):
+            provider.response(payload).get_data()
+        return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--questions', type=int, default=20, help='Questions per test payload')
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = Flask('benchmark')
+    stdlib = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app) if orjson else None
+    if fast is None:
+        print("orjson isn't installed; only the stdlib provider is timed\n")
+
+    payloads = [
+        ('api_get_questions', questions_payload(args.questions)),
+        ('api_get_explanation', explanation_payload()),
+        ('catalog topics', topics_payload(30)),
+        ('test history', history_payload(20)),
+    ]
+
+    print(f"{'payload':<22}{'stdlib us':>11}{'orjson us':>11}{'speedup':>9}"
+          f"{'raw B':>9}{'gzip B':>9}{'gzip9 B':>9}{'br B':>8}{'br11 B':>8}")
+    for name, payload in payloads:
+        stdlib_us = time_per_call(app, stdlib, payload, args.iterations)
+        fast_us = time_per_call(app, fast, payload, args.iterations) if fast else None
+
+        with app.app_context():
+            body = (fast or stdlib).response(payload).get_data()
+        sizes = [
+            len(body),
+            len(compression.compress(body, 'gzip')),
+            len(compression.compress(body, 'gzip', cached=True)),
+        ]
+        if compression.brotli is not None:
+            sizes += [
+                len(compression.compress(body, 'br')),
+                len(compression.compress(body, 'br', cached=True)),
+            ]
+
+        print(f"{name:<22}{stdlib_us:>11.1f}"
+              + (f"{fast_us:>11.1f}{stdlib_us / fast_us:>8.1f}x" if fast_us else f"{'-':>11}{'-':>9}")
+              + ''.join(f"{size:>9}" for size in sizes[:3])
+              + ''.join(f"{size:>8}" for size in sizes[3:]))
+
+    if compression.brotli is None:
+        print("\nbrotli isn't installed; Brotli sizes skipped")
+
+
+if __name__ == '__main__':
+    main()
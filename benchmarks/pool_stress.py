@@ -0,0 +1,131 @@
+"""
+Stress the test-taking endpoints to show connection pool saturation
+
+Runs the app in-process and hammers one test session from many threads:
+each iteration loads the questions and submits an answer, like a student
+clicking through a test. Pool usage is sampled while it runs.
+
+    python benchmarks/pool_stress.py --session-id 42 --threads 32 \\
+        --pool-size 5 --max-overflow 10
+
+With more threads than pool size + overflow, requests queue for a
+connection: watch wait time and p99 grow, and timeouts appear once waits
+exceed DB_POOL_TIMEOUT.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--session-id', type=int, required=True, help='Test session to answer')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--iterations', type=int, default=20, help='Iterations per thread')
+    parser.add_argument('--pool-size', type=int, default=5)
+    parser.add_argument('--max-overflow', type=int, default=10)
+    parser.add_argument('--pool-timeout', type=int, default=10)
+    parser.add_argument('--config', default='production')
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+def main():
+    args = parse_args()
+
+    # Read by config.py at import time
+    os.environ['DB_POOL_SIZE'] = str(args.pool_size)
+    os.environ['DB_MAX_OVERFLOW'] = str(args.max_overflow)
+    os.environ['DB_POOL_TIMEOUT'] = str(args.pool_timeout)
+
+    from app import create_app, db
+    from app.models.test import TestSession
+
+    app = create_app(args.config)
+    with app.app_context():
+        test_session = db.session.get(TestSession, args.session_id)
+        if test_session is None or not test_session.question_ids:
+            sys.exit(f"Test session {args.session_id} not found or has no questions")
+        user_id = test_session.user_id
+        question_id = test_session.question_ids[0]
+        pool = db.engine.pool
+
+    latencies = {'questions': [], 'answer': []}
+    errors = []
+    samples = []
+    lock = threading.Lock()
+    running = True
+
+    def sample_pool():
+        while running:
+            samples.append((pool.checkedout(), max(pool.overflow(), 0)))
+            time.sleep(0.05)
+
+    def student():
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+            sess['_fresh'] = True
+
+        for _ in range(args.iterations):
+            for name, call in (
+                ('questions', lambda: client.get(f'/test/tests/{args.session_id}/questions')),
+                ('answer', lambda: client.post(
+                    f'/test/tests/{args.session_id}/answer',
+                    json={'question_id': question_id, 'answer': 'A', 'time_spent': 5}
+                ))
+            ):
+                started = time.perf_counter()
+                try:
+                    response = call()
+                    status = response.status_code
+                except Exception as e:
+                    status = type(e).__name__
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies[name].append(elapsed)
+                    if status != 200:
+                        errors.append(status)
+
+    sampler = threading.Thread(target=sample_pool, daemon=True)
+    sampler.start()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=student) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+    running = False
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"threads={args.threads} pool_size={args.pool_size} max_overflow={args.max_overflow} "
+          f"pool_timeout={args.pool_timeout}s")
+    print(f"{total} requests in {duration:.1f}s ({total / duration:.0f} req/s), {len(errors)} errors")
+    for name, values in latencies.items():
+        print(f"  {name:<10} p50={percentile(values, 50) * 1000:.0f}ms "
+              f"p95={percentile(values, 95) * 1000:.0f}ms p99={percentile(values, 99) * 1000:.0f}ms "
+              f"max={max(values, default=0) * 1000:.0f}ms")
+    if samples:
+        checked_out = [c for c, _ in samples]
+        saturated = sum(1 for c in checked_out if c >= args.pool_size + args.max_overflow)
+        print(f"  pool       checked_out avg={statistics.mean(checked_out):.1f} max={max(checked_out)} "
+              f"overflow max={max(o for _, o in samples)} saturated {saturated * 100 // len(samples)}% of the time")
+    if errors:
+        print(f"  errors: {sorted(set(map(str, errors)))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Per-request CPU of serving a test's questions: ORM + jsonify vs stored payloads
+
+Runs against the *testing* database. Seeds bank questions if there are
+fewer than needed, builds their client payloads, then times both ways
+of producing the api_get_questions body for the same question IDs:
+
+- before: load Question objects, build a dict per question, jsonify
+- after:  select (id, client_payload) and concatenate the stored JSON
+
+    python benchmarks/question_payloads.py
+    python benchmarks/question_payloads.py --questions 30 --iterations 500
+
+Uses TestingConfig (postgresql://localhost/studujsmart_test).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+from sqlalchemy import inspect, text
+
+from app import create_app, db
+from app.models.question import Question
+from app.services.pool_service import QuestionPoolService
+
+SEED_SQL = """
+INSERT INTO questions (question_text, question_type, difficulty, correct_answer, choices,
+                       explanation, generated_at, difficulty_rating)
+SELECT 'Vypočítaj obsah pravouhlého trojuholníka s odvesnami ' || g || ' cm a ' || (g + 1)
+       || ' cm. Výsledok zaokrúhli na dve desatinné miesta.',
+       'single_choice', (ARRAY['easy', 'medium', 'hard'])[1 + g % 3], 'A',
+       json_build_array('A) ' || g * (g + 1) / 2.0 || ' cm²', 'B) ' || g * (g + 1) || ' cm²',
+                        'C) ' || g + 1 || ' cm²', 'D) ' || g * g || ' cm²'),
+       repeat('Obsah je polovica súčinu odvesien. ', 10), now(), 0
+FROM generate_series(1, :count) g
+"""
+
+
+def before(question_ids):
+    """What api_get_questions did: hydrate Question objects, build dicts, jsonify"""
+    by_id = {q.id: q for q in Question.query.filter(Question.id.in_(question_ids)).all()}
+    questions = [by_id[q_id] for q_id in question_ids if q_id in by_id]
+    return jsonify({
+        'questions': [{
+            'id': q.id,
+            'question_text': q.question_text,
+            'question_type': q.question_type,
+            'difficulty': q.difficulty,
+            'choices': q.choices
+        } for q in questions],
+        'total': len(question_ids),
+        'complete': True
+    }).get_data()
+
+
+def after(question_ids):
+    """What it does now: concatenate stored payloads"""
+    stored = dict(db.session.query(Question.id, Question.client_payload).filter(
+        Question.id.in_(question_ids)
+    ).all())
+    payloads = [Question.with_id(q_id, stored[q_id]) for q_id in question_ids if q_id in stored]
+    return ('{"questions":[%s],"total":%d,"complete":true}' % (
+        ','.join(payloads), len(question_ids)
+    )).encode()
+
+
+def measure(fn, question_ids, iterations):
+    """(CPU ms, wall ms) per request, median over iterations"""
+    cpu, wall = [], []
+    for _ in range(iterations):
+        db.session.remove()  # a fresh session per request, like a real one
+        started_cpu, started_wall = time.process_time(), time.perf_counter()
+        fn(question_ids)
+        cpu.append((time.process_time() - started_cpu) * 1000)
+        wall.append((time.perf_counter() - started_wall) * 1000)
+    return statistics.median(cpu), statistics.median(wall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--questions', type=int, default=20, help='Questions per test')
+    parser.add_argument('--iterations', type=int, default=300)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.test_request_context():
+        if not inspect(db.engine).has_table('questions'):
+            db.create_all()
+
+        have = Question.query.count()
+        if have < args.questions:
+            db.session.execute(text(SEED_SQL), {'count': args.questions - have})
+            db.session.commit()
+        QuestionPoolService().backfill_payloads()
+
+        question_ids = [q_id for q_id, in db.session.query(Question.id).order_by(
+            Question.id.desc()
+        ).limit(args.questions).all()]
+
+        # Same questions, same content, whichever way they're served
+        old, new = json.loads(before(question_ids)), json.loads(after(question_ids))
+        assert old == new, "payloads differ"
+
+        for fn in (before, after):  # warm up caches and the pool
+            measure(fn, question_ids, 10)
+
+        before_cpu, before_wall = measure(before, question_ids, args.iterations)
+        after_cpu, after_wall = measure(after, question_ids, args.iterations)
+
+    print(f"{args.questions} questions per request, median of {args.iterations}")
+    print(f"  before (ORM + jsonify): {before_cpu:.3f} ms CPU, {before_wall:.3f} ms wall")
+    print(f"  after (stored payload): {after_cpu:.3f} ms CPU, {after_wall:.3f} ms wall")
+    print(f"  CPU per request: {before_cpu / after_cpu:.1f}x less" if after_cpu else "")
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,24 @@ class Config:
                               'postgresql://localhost/studujsmart'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool, per worker process: workers x (pool size + overflow)
+    # must stay under the server's max_connections
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # reconnect connections older than this
+    DB_POOL_PRE_PING = True
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', '').lower() in ('1', 'true', 'yes')  # no app-side pool
+
+    # Read replicas for @read_only views, comma-separated. Point one at
+    # DATABASE_URL to try the routing locally without a second server.
+    REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    SQLALCHEMY_BINDS = {f'replica_{i}': url for i, url in enumerate(REPLICA_URLS)}
+    REPLICA_BINDS = list(SQLALCHEMY_BINDS)
+    REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))  # seconds behind before falling back to primary
+    REPLICA_CHECK_INTERVAL = 10  # seconds between lag checks per worker
+    REPLICA_STICKY_SECONDS = 15  # read from primary this long after a write (read-your-writes)
+
     # Redis
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
 
@@ -34,29 +52,78 @@ class Config:
     # App Settings
     TESTS_PER_PAGE = 10
     CACHE_TTL = 3600  # 1 hour
+    ITEM_INDEX_TTL = 300  # Rebuild per-worker adaptive item index every 5 minutes
+    TOPIC_TREE_TTL = 3600  # Per-worker topic trees follow a version in Redis; this is only a safety net
+    CATALOG_TTL = 3600  # Per-worker subjects/topics snapshot, same scheme
+    PROGRESSIVE_READY_QUESTIONS = 2  # Questions ready before a new test opens; rest arrive in background
+    TEST_MIN_QUESTIONS = 5  # num_questions a client may ask for is clamped to this range
+    TEST_MAX_QUESTIONS = 50
+
+    # Recently seen questions (per-user Bloom filter, two generations)
+    SEEN_FILTER_CAPACITY = int(os.environ.get('SEEN_FILTER_CAPACITY', 2000))
+    SEEN_FILTER_ERROR_RATE = float(os.environ.get('SEEN_FILTER_ERROR_RATE', 0.01))
+    SEEN_FILTER_TTL = 90 * 86400  # Forget inactive users after 90 days
+
+    # user_answers monthly partitions
+    ANSWER_PARTITIONS_AHEAD = 3  # months created ahead of time (`flask create-answer-partitions`)
+    ANSWER_RETENTION_MONTHS = int(os.environ.get('ANSWER_RETENTION_MONTHS', 12))  # older months get archived
+    ANSWER_ARCHIVE_DIR = os.environ.get('ANSWER_ARCHIVE_DIR', 'archive/user_answers')
+
+    # Per-day stats history (user_daily_stats)
+    STATS_COMPACT_AFTER_DAYS = 90  # older days are merged into weeks (`flask compact-daily-stats`)
+
+    # Logged-in user snapshot read by the user loader (dropped when the user changes)
+    USER_CACHE_TTL = 300
+
+    # JSON and response compression ('orjson' falls back to stdlib json if it isn't installed)
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'orjson')
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESS_MIN_SIZE = 500  # bytes; smaller bodies aren't worth it
+    COMPRESS_MIMETYPES = ('application/json', 'text/html', 'text/css', 'application/javascript')
+    COMPRESS_CACHE_SIZE = 256  # compressed bodies kept per worker, keyed by ETag
+
+    # Report SQL statements per request in an X-DB-Queries response header
+    QUERY_COUNT_HEADER = os.environ.get('QUERY_COUNT_HEADER', '').lower() in ('1', 'true', 'yes')
 
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     TESTING = False
+    QUERY_COUNT_HEADER = True
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 2))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 3))
 
 
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     TESTING = False
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 5))
 
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'postgresql://localhost/studujsmart_test'
+    SQLALCHEMY_BINDS = {}
+    REPLICA_BINDS = []
+    REDIS_URL = os.environ.get('TEST_REDIS_URL') or 'redis://localhost:6379/15'  # flushed by the tests
+    QUERY_COUNT_HEADER = True
+    DB_POOL_SIZE = 1
+    DB_MAX_OVERFLOW = 2
+
+
+class QueryPlansConfig(TestingConfig):
+    """Query-plan checks (`pytest -m query_plans`): a seeded database of their own"""
+    SQLALCHEMY_DATABASE_URI = os.environ.get('QUERY_PLANS_DATABASE_URL') or 'postgresql://localhost/studujsmart_plans'
 
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'query_plans': QueryPlansConfig,
     'default': DevelopmentConfig
 }
\ No newline at end of file
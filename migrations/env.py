@@ -19,11 +19,18 @@ config.set_main_option(
 target_metadata = current_app.extensions['migrate'].db.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave the user_answers partitions out of autogenerate: they aren't models"""
+    from app.services.partition_service import is_partition
+    return not (type_ == 'table' and reflected and compare_to is None and is_partition(name))
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode."""
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=target_metadata, literal_binds=True
+        url=url, target_metadata=target_metadata, literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -46,6 +53,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
 
@@ -0,0 +1,219 @@
+"""Baseline schema
+
+Revision ID: 0c4e7b2a9d13
+Revises: 
+Create Date: 2026-10-19 09:00:00.000000
+
+The tables as they were before migrations were tracked. Databases that
+already have them (created with db.create_all()) are left untouched, so
+`flask db upgrade` works on both existing and empty databases.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c4e7b2a9d13'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('users'):
+        return
+
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('username', sa.String(length=100)),
+        sa.Column('password_hash', sa.String(length=255)),
+        sa.Column('oauth_provider', sa.String(length=50)),
+        sa.Column('oauth_id', sa.String(length=255)),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('last_login', sa.DateTime()),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('full_name', sa.String(length=255)),
+        sa.Column('grade', sa.Integer()),
+        sa.Column('birth_year', sa.Integer()),
+        sa.Column('goal', sa.String(length=50)),
+        sa.Column('onboarding_completed', sa.Boolean()),
+        sa.Column('xp', sa.Integer()),
+        sa.Column('level', sa.Integer()),
+        sa.Column('streak_days', sa.Integer()),
+        sa.Column('last_activity_date', sa.Date()),
+        sa.UniqueConstraint('oauth_provider', 'oauth_id', name='uix_oauth_provider_id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'subjects',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name_sk', sa.String(length=100), nullable=False),
+        sa.Column('name_en', sa.String(length=100)),
+        sa.Column('slug', sa.String(length=50), nullable=False, unique=True),
+        sa.Column('icon', sa.String(length=50)),
+        sa.Column('color', sa.String(length=7)),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('order_index', sa.Integer())
+    )
+
+    op.create_table(
+        'topics',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('subject_id', sa.Integer(), sa.ForeignKey('subjects.id', ondelete='CASCADE')),
+        sa.Column('parent_topic_id', sa.Integer(), sa.ForeignKey('topics.id')),
+        sa.Column('name_sk', sa.String(length=200), nullable=False),
+        sa.Column('name_en', sa.String(length=200)),
+        sa.Column('slug', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.Text()),
+        sa.Column('difficulty', sa.String(length=20)),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('order_index', sa.Integer()),
+        sa.UniqueConstraint('subject_id', 'slug', name='uix_subject_slug')
+    )
+
+    op.create_table(
+        'user_subjects',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE')),
+        sa.Column('subject_id', sa.Integer(), sa.ForeignKey('subjects.id', ondelete='CASCADE')),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('added_at', sa.DateTime()),
+        sa.UniqueConstraint('user_id', 'subject_id', name='uix_user_subject')
+    )
+
+    op.create_table(
+        'subscriptions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), unique=True),
+        sa.Column('plan', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('started_at', sa.DateTime()),
+        sa.Column('expires_at', sa.DateTime()),
+        sa.Column('cancelled_at', sa.DateTime()),
+        sa.Column('payment_provider', sa.String(length=50)),
+        sa.Column('payment_id', sa.String(length=255)),
+        sa.Column('is_trial', sa.Boolean()),
+        sa.Column('trial_ends_at', sa.DateTime()),
+        sa.Column('created_at', sa.DateTime())
+    )
+
+    op.create_table(
+        'usage_limits',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE')),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('tests_taken', sa.Integer()),
+        sa.Column('ai_explanations_viewed', sa.Integer()),
+        sa.UniqueConstraint('user_id', 'date', name='uix_user_date')
+    )
+
+    op.create_table(
+        'user_topic_progress',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE')),
+        sa.Column('topic_id', sa.Integer(), sa.ForeignKey('topics.id', ondelete='CASCADE')),
+        sa.Column('total_questions', sa.Integer()),
+        sa.Column('correct_answers', sa.Integer()),
+        sa.Column('accuracy_rate', sa.Numeric(5, 2)),
+        sa.Column('last_practiced_at', sa.DateTime()),
+        sa.Column('mastery_level', sa.String(length=20)),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.UniqueConstraint('user_id', 'topic_id', name='uix_user_topic')
+    )
+
+    op.create_table(
+        'question_templates',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('topic_id', sa.Integer(), sa.ForeignKey('topics.id', ondelete='CASCADE')),
+        sa.Column('question_type', sa.String(length=50), nullable=False),
+        sa.Column('difficulty', sa.String(length=20), nullable=False),
+        sa.Column('question_template', sa.Text(), nullable=False),
+        sa.Column('variables', sa.JSON()),
+        sa.Column('correct_answer_template', sa.Text()),
+        sa.Column('choices_template', sa.JSON()),
+        sa.Column('explanation_template', sa.Text()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('times_used', sa.Integer())
+    )
+
+    op.create_table(
+        'questions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('template_id', sa.Integer(), sa.ForeignKey('question_templates.id')),
+        sa.Column('topic_id', sa.Integer(), sa.ForeignKey('topics.id')),
+        sa.Column('question_text', sa.Text(), nullable=False),
+        sa.Column('question_type', sa.String(length=50), nullable=False),
+        sa.Column('difficulty', sa.String(length=20), nullable=False),
+        sa.Column('correct_answer', sa.Text(), nullable=False),
+        sa.Column('choices', sa.JSON()),
+        sa.Column('explanation', sa.Text()),
+        sa.Column('variables_used', sa.JSON()),
+        sa.Column('generated_at', sa.DateTime()),
+        sa.Column('times_used', sa.Integer()),
+        sa.Column('avg_correct_rate', sa.Numeric(5, 2))
+    )
+
+    op.create_table(
+        'test_sessions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE')),
+        sa.Column('subject_id', sa.Integer(), sa.ForeignKey('subjects.id')),
+        sa.Column('test_type', sa.String(length=50), nullable=False),
+        sa.Column('total_questions', sa.Integer(), nullable=False),
+        sa.Column('difficulty', sa.String(length=20)),
+        sa.Column('topic_ids', sa.ARRAY(sa.Integer())),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('started_at', sa.DateTime()),
+        sa.Column('completed_at', sa.DateTime()),
+        sa.Column('score', sa.Integer()),
+        sa.Column('percentage', sa.Numeric(5, 2)),
+        sa.Column('time_spent_seconds', sa.Integer())
+    )
+
+    op.create_table(
+        'user_answers',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('session_id', sa.Integer(), sa.ForeignKey('test_sessions.id', ondelete='CASCADE')),
+        sa.Column('question_id', sa.Integer(), sa.ForeignKey('questions.id')),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('user_answer', sa.Text(), nullable=False),
+        sa.Column('is_correct', sa.Boolean(), nullable=False),
+        sa.Column('explanation_viewed', sa.Boolean()),
+        sa.Column('explanation_viewed_at', sa.DateTime()),
+        sa.Column('ai_explanation', sa.Text()),
+        sa.Column('time_spent_seconds', sa.Integer()),
+        sa.Column('answered_at', sa.DateTime())
+    )
+
+    op.create_table(
+        'badges',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('slug', sa.String(length=50), nullable=False, unique=True),
+        sa.Column('name_sk', sa.String(length=100), nullable=False),
+        sa.Column('description_sk', sa.Text()),
+        sa.Column('icon', sa.String(length=50)),
+        sa.Column('condition_type', sa.String(length=50)),
+        sa.Column('condition_value', sa.Integer()),
+        sa.Column('xp_reward', sa.Integer()),
+        sa.Column('is_active', sa.Boolean())
+    )
+
+    op.create_table(
+        'user_badges',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE')),
+        sa.Column('badge_id', sa.Integer(), sa.ForeignKey('badges.id', ondelete='CASCADE')),
+        sa.Column('earned_at', sa.DateTime()),
+        sa.UniqueConstraint('user_id', 'badge_id', name='uix_user_badge')
+    )
+
+
+def downgrade():
+    for table in ('user_badges', 'badges', 'user_answers', 'test_sessions', 'questions',
+                  'question_templates', 'user_topic_progress', 'usage_limits', 'subscriptions',
+                  'user_subjects', 'topics', 'subjects', 'users'):
+        op.drop_table(table)
@@ -0,0 +1,66 @@
+"""Add adaptive selection columns, user_stats and xp_events
+
+Revision ID: 1d8f3a6b5e20
+Revises: 0c4e7b2a9d13
+Create Date: 2026-10-19 09:30:00.000000
+
+Schema added to the models for adaptive selection and progressive test
+start (question_ids, difficulty_rating, ability_rating), the user_stats
+rollup and the XP ledger. Safe on databases where create_all() already
+added some of it. Afterwards run `flask backfill-user-stats` and
+`flask reconcile-xp`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d8f3a6b5e20'
+down_revision = '0c4e7b2a9d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS question_ids integer[]")
+    # NULL until rated: selection starts from the difficulty label
+    op.execute("ALTER TABLE questions ADD COLUMN IF NOT EXISTS difficulty_rating double precision")
+    op.execute("ALTER TABLE user_topic_progress ADD COLUMN IF NOT EXISTS ability_rating double precision DEFAULT 0")
+
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('user_stats'):
+        op.create_table(
+            'user_stats',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('tests_completed', sa.Integer(), nullable=False),
+            sa.Column('percentage_total', sa.Numeric(12, 2), nullable=False),
+            sa.Column('daily_counts', sa.JSON()),
+            sa.Column('weekly_counts', sa.JSON()),
+            sa.Column('subject_stats', sa.JSON()),
+            sa.Column('last_test_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime())
+        )
+
+    if not inspector.has_table('xp_events'):
+        op.create_table(
+            'xp_events',
+            sa.Column('id', sa.BigInteger(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('amount', sa.Integer(), nullable=False),
+            sa.Column('reason', sa.String(length=50), nullable=False),
+            sa.Column('source_id', sa.Integer()),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.UniqueConstraint('user_id', 'reason', 'source_id', name='uix_xp_event_source')
+        )
+        op.create_index('ix_xp_events_user_created', 'xp_events', ['user_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_xp_events_user_created', table_name='xp_events')
+    op.drop_table('xp_events')
+    op.drop_table('user_stats')
+    op.drop_column('user_topic_progress', 'ability_rating')
+    op.drop_column('questions', 'difficulty_rating')
+    op.drop_column('test_sessions', 'question_ids')
@@ -0,0 +1,53 @@
+"""Add indexes for hot queries
+
+Revision ID: 3f8a2c1d9e47
+Revises: 1d8f3a6b5e20
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8a2c1d9e47'
+down_revision = '1d8f3a6b5e20'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, definition); matches the Index declarations on the models
+INDEXES = [
+    ('ix_user_answers_session_question', 'user_answers', '(session_id, question_id)'),
+    ('ix_test_sessions_user_completed', 'test_sessions',
+     "(user_id, completed_at DESC) WHERE status = 'completed'"),
+    ('ix_user_topic_progress_user_accuracy', 'user_topic_progress', '(user_id, accuracy_rate)'),
+    ('ix_questions_topic_difficulty', 'questions', '(topic_id, difficulty)'),
+    ('ix_question_templates_topic', 'question_templates', '(topic_id)'),
+    ('ix_user_badges_user_earned', 'user_badges', '(user_id, earned_at DESC)'),
+]
+
+
+def upgrade():
+    # CONCURRENTLY can't run inside a transaction, and doesn't lock out
+    # writes while the index builds
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        for name, table, definition in INDEXES:
+            # A failed concurrent build leaves an INVALID index behind that
+            # IF NOT EXISTS would skip; drop it so reruns rebuild it
+            invalid = bind.execute(sa.text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {'name': name}).first()
+            if invalid:
+                op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+            op.execute(f"ANALYZE {table}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,104 @@
+"""Partition user_answers by month
+
+Revision ID: 8b1e4d7a6c25
+Revises: 3f8a2c1d9e47
+Create Date: 2026-10-19 12:00:00.000000
+
+Rewrites the table, so run it in a maintenance window.
+
+"""
+from datetime import date
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1e4d7a6c25'
+down_revision = '3f8a2c1d9e47'
+branch_labels = None
+depends_on = None
+
+
+MONTHS_AHEAD = 3
+
+COLUMNS = ('id, answered_at, session_id, question_id, user_id, user_answer, is_correct, '
+           'explanation_viewed, explanation_viewed_at, ai_explanation, time_spent_seconds')
+
+TABLE_BODY = """
+    id integer NOT NULL DEFAULT nextval('user_answers_id_seq'),
+    answered_at timestamp without time zone NOT NULL,
+    session_id integer REFERENCES test_sessions (id) ON DELETE CASCADE,
+    question_id integer REFERENCES questions (id),
+    user_id integer REFERENCES users (id),
+    user_answer text NOT NULL,
+    is_correct boolean NOT NULL,
+    explanation_viewed boolean,
+    explanation_viewed_at timestamp without time zone,
+    ai_explanation text,
+    time_spent_seconds integer
+"""
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # answered_at becomes part of the key; older rows may lack it
+    op.execute("""
+        UPDATE user_answers a SET answered_at = s.started_at
+        FROM test_sessions s
+        WHERE a.answered_at IS NULL AND s.id = a.session_id AND s.started_at IS NOT NULL
+    """)
+    op.execute("UPDATE user_answers SET answered_at = now() WHERE answered_at IS NULL")
+
+    op.execute("ALTER TABLE user_answers RENAME TO user_answers_unpartitioned")
+    op.execute("ALTER TABLE user_answers_unpartitioned RENAME CONSTRAINT user_answers_pkey "
+               "TO user_answers_unpartitioned_pkey")
+    op.execute("ALTER INDEX IF EXISTS ix_user_answers_session_question "
+               "RENAME TO ix_user_answers_unpartitioned_session_question")
+
+    op.execute(f"""
+        CREATE TABLE user_answers ({TABLE_BODY},
+            PRIMARY KEY (id, answered_at)
+        ) PARTITION BY RANGE (answered_at)
+    """)
+    op.execute("CREATE INDEX ix_user_answers_session_question ON user_answers (session_id, question_id)")
+
+    # One partition per month with data, through a few months ahead
+    oldest = bind.execute(sa.text("SELECT min(answered_at) FROM user_answers_unpartitioned")).scalar()
+    month = (oldest.date() if oldest else date.today()).replace(day=1)
+    last = add_months(date.today().replace(day=1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE user_answers_{month.year:04d}_{month.month:02d} PARTITION OF user_answers "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        month = add_months(month, 1)
+    # Catches answers past the last month created, should the monthly job be missed
+    op.execute("CREATE TABLE user_answers_default PARTITION OF user_answers DEFAULT")
+
+    op.execute(f"INSERT INTO user_answers ({COLUMNS}) SELECT {COLUMNS} FROM user_answers_unpartitioned")
+
+    # Keep the id sequence when the old table goes
+    op.execute("ALTER SEQUENCE user_answers_id_seq OWNED BY user_answers.id")
+    op.execute("DROP TABLE user_answers_unpartitioned")
+    op.execute("ANALYZE user_answers")
+
+
+def downgrade():
+    op.execute("ALTER TABLE user_answers RENAME TO user_answers_partitioned")
+    op.execute("ALTER INDEX ix_user_answers_session_question "
+               "RENAME TO ix_user_answers_partitioned_session_question")
+    op.execute("ALTER TABLE user_answers_partitioned RENAME CONSTRAINT user_answers_pkey "
+               "TO user_answers_partitioned_pkey")
+
+    op.execute(f"CREATE TABLE user_answers ({TABLE_BODY}, PRIMARY KEY (id))")
+    op.execute("CREATE INDEX ix_user_answers_session_question ON user_answers (session_id, question_id)")
+    op.execute(f"INSERT INTO user_answers ({COLUMNS}) SELECT {COLUMNS} FROM user_answers_partitioned")
+
+    op.execute("ALTER SEQUENCE user_answers_id_seq OWNED BY user_answers.id")
+    op.execute("DROP TABLE user_answers_partitioned")
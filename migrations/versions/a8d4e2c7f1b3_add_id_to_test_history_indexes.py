@@ -0,0 +1,60 @@
+"""Add id to the test history indexes
+
+Revision ID: a8d4e2c7f1b3
+Revises: f2b6d1c9e3a7
+Create Date: 2026-10-19 19:00:00.000000
+
+History pages are ordered by (completed_at DESC, id DESC); with id in
+the index they are read in order, without a sort.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d4e2c7f1b3'
+down_revision = 'f2b6d1c9e3a7'
+branch_labels = None
+depends_on = None
+
+
+WHERE = "WHERE status = 'completed'"
+
+# name -> (old columns, new columns)
+INDEXES = {
+    'ix_test_sessions_user_completed': (
+        '(user_id, completed_at DESC)',
+        '(user_id, completed_at DESC, id DESC)'
+    ),
+    'ix_test_sessions_user_subject_completed': (
+        '(user_id, subject_id, completed_at DESC)',
+        '(user_id, subject_id, completed_at DESC, id DESC)'
+    ),
+}
+
+
+def _rebuild(name: str, columns: str):
+    """Build the new definition beside the old index, then swap it in"""
+    replacement = f"{name}_new"
+
+    # Left over from a failed run
+    op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {replacement}")
+
+    op.execute(f"CREATE INDEX CONCURRENTLY {replacement} ON test_sessions {columns} {WHERE}")
+    op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.execute(f"ALTER INDEX {replacement} RENAME TO {name}")
+
+
+def upgrade():
+    # Concurrent builds: test_sessions stays writable meanwhile
+    with op.get_context().autocommit_block():
+        for name, (_, columns) in INDEXES.items():
+            _rebuild(name, columns)
+        op.execute("ANALYZE test_sessions")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, (columns, _) in INDEXES.items():
+            _rebuild(name, columns)
+        op.execute("ANALYZE test_sessions")
@@ -0,0 +1,37 @@
+"""Add user_daily_stats
+
+Revision ID: c5e2a9d4b1f8
+Revises: 8b1e4d7a6c25
+Create Date: 2026-10-19 14:00:00.000000
+
+Fill it with `flask backfill-daily-stats`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2a9d4b1f8'
+down_revision = '8b1e4d7a6c25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_daily_stats',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('period', sa.String(length=4), nullable=False),
+        sa.Column('topic_id', sa.Integer(), sa.ForeignKey('topics.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('subject_id', sa.Integer(), sa.ForeignKey('subjects.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('questions_answered', sa.Integer(), nullable=False),
+        sa.Column('correct_answers', sa.Integer(), nullable=False),
+        sa.Column('time_spent_seconds', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'period', 'topic_id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_daily_stats')
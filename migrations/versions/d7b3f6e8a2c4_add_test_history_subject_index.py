@@ -0,0 +1,41 @@
+"""Add test history index by subject
+
+Revision ID: d7b3f6e8a2c4
+Revises: c5e2a9d4b1f8
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7b3f6e8a2c4'
+down_revision = 'c5e2a9d4b1f8'
+branch_labels = None
+depends_on = None
+
+
+NAME = 'ix_test_sessions_user_subject_completed'
+
+
+def upgrade():
+    # Built CONCURRENTLY, like the other test_sessions indexes
+    with op.get_context().autocommit_block():
+        invalid = op.get_bind().execute(sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {'name': NAME}).first()
+        if invalid:
+            op.execute(f"DROP INDEX CONCURRENTLY {NAME}")
+
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {NAME} ON test_sessions "
+            "(user_id, subject_id, completed_at DESC) WHERE status = 'completed'"
+        )
+        op.execute("ANALYZE test_sessions")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {NAME}")
@@ -0,0 +1,44 @@
+"""Add topic_closure
+
+Revision ID: e1a4c8f2d6b9
+Revises: d7b3f6e8a2c4
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a4c8f2d6b9'
+down_revision = 'd7b3f6e8a2c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'topic_closure',
+        sa.Column('ancestor_id', sa.Integer(), sa.ForeignKey('topics.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), sa.ForeignKey('topics.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index('ix_topic_closure_descendant', 'topic_closure', ['descendant_id'])
+
+    # Same as `flask rebuild-topic-closure`
+    op.execute("""
+        INSERT INTO topic_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM topics
+            UNION ALL
+            SELECT tree.ancestor_id, t.id, tree.depth + 1
+            FROM tree JOIN topics t ON t.parent_topic_id = tree.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM tree
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_topic_closure_descendant', table_name='topic_closure')
+    op.drop_table('topic_closure')
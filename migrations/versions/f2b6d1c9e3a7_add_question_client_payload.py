@@ -0,0 +1,27 @@
+"""Add questions.client_payload
+
+Revision ID: f2b6d1c9e3a7
+Revises: e1a4c8f2d6b9
+Create Date: 2026-10-19 18:00:00.000000
+
+Fill it with `flask backfill-question-payloads`; until then the test API
+builds missing payloads on the fly.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d1c9e3a7'
+down_revision = 'e1a4c8f2d6b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('questions', sa.Column('client_payload', sa.Text(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('questions', 'client_payload')
@@ -20,9 +20,7 @@ if [ ! -f .env ]; then
     echo "⚠️  Created .env file - please edit with your credentials"
 fi
 
-# Initialize database migrations
-flask db init 2>/dev/null || echo "Migrations already initialized"
-flask db migrate -m "Initial migration"
+# Create the schema
 flask db upgrade
 
 # Seed database
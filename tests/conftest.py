@@ -0,0 +1,112 @@
+"""
+Fixtures for tests against the testing database and Redis
+
+Needs PostgreSQL (TestingConfig: postgresql://localhost/studujsmart_test)
+and Redis (TEST_REDIS_URL, default redis://localhost:6379/15). All tables
+are recreated once per run, and the Redis database is flushed before
+every test.
+"""
+import itertools
+import pytest
+from app import create_app, db
+
+
+@pytest.fixture(scope='session')
+def app():
+    """
+    The app, with no context pushed: every test request gets its own
+    (as in production), so `g` and the query count don't leak between them
+    """
+    app = create_app('testing')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture(autouse=True)
+def clean_state(app):
+    """Empty Redis and the per-worker caches before each test, and every table after it"""
+    from app import redis_client
+    from app.services import adaptive_service, badge_service, catalog_service, topic_tree_service
+
+    redis_client.flushdb()
+    catalog_service._catalog = None
+    topic_tree_service._trees.clear()
+    adaptive_service._indexes.clear()
+    badge_service._rules = None
+    yield
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """Log the test client in as a user, bypassing the login form"""
+    def login(user_id: int):
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+    return login
+
+
+@pytest.fixture
+def make_user(app):
+    """Factory of committed users: make_user(**columns) -> user ID"""
+    from app.models.user import User
+
+    numbers = itertools.count(1)
+
+    def make_user(**columns) -> int:
+        number = next(numbers)
+        columns.setdefault('email', f'student{number}@example.com')
+        columns.setdefault('username', f'student{number}')
+        with app.app_context():
+            user = User(**columns)
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return make_user
+
+
+@pytest.fixture
+def make_topic(app):
+    """
+    Factory of topics with bank questions at every difficulty:
+    make_topic(questions_per_level=4, subject_id=None) -> topic ID
+
+    Without subject_id, each topic gets a subject of its own.
+    """
+    from app.models.question import Question
+    from app.models.subject import Subject, Topic
+
+    numbers = itertools.count(1)
+
+    def make_topic(questions_per_level: int = 4, subject_id: int = None) -> int:
+        number = next(numbers)
+        with app.app_context():
+            if subject_id is None:
+                subject = Subject(name_sk=f'Predmet {number}', slug=f'predmet-{number}', is_active=True)
+                db.session.add(subject)
+                db.session.flush()
+                subject_id = subject.id
+            topic = Topic(subject_id=subject_id, name_sk=f'Téma {number}', slug=f'tema-{number}', is_active=True)
+            db.session.add(topic)
+            db.session.flush()
+            for level in ('easy', 'medium', 'hard'):
+                db.session.add_all([Question(
+                    topic_id=topic.id, question_text=f'{level} {i}', question_type='single_choice',
+                    difficulty=level, correct_answer='A'
+                ) for i in range(questions_per_level)])
+            db.session.commit()
+            return topic.id
+    return make_topic
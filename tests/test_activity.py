@@ -0,0 +1,63 @@
+"""
+Daily activity bitmaps: streaks and the calendar
+"""
+from datetime import date, timedelta
+import pytest
+from redis.exceptions import RedisError
+
+
+@pytest.fixture
+def user_id(login, make_user) -> int:
+    user_id = make_user()
+    login(user_id)
+    return user_id
+
+
+def test_streaks_cross_new_year(app, user_id):
+    from app.services.activity_service import ActivityService
+
+    service = ActivityService()
+    today = date(2026, 1, 3)
+    # Three days in 2025, a gap, then five days running into today
+    for day in (date(2025, 3, 1), date(2025, 3, 2), date(2025, 3, 3)):
+        service.mark(user_id, day)
+    for offset in range(5):
+        service.mark(user_id, today - timedelta(days=offset))
+
+    assert service.streaks(user_id, 2025, today) == {'current': 5, 'longest': 5}
+    assert service.current_streak(user_id, today) == 5
+    # Not active yet today: yesterday's streak still counts
+    assert service.current_streak(user_id, today + timedelta(days=1)) == 5
+    assert service.current_streak(user_id, today + timedelta(days=2)) == 0
+
+
+def test_calendar_lists_active_days(app, user_id):
+    from app.services.activity_service import ActivityService
+
+    service = ActivityService()
+    for day in (date(2024, 1, 1), date(2024, 2, 29), date(2024, 12, 31), date(2025, 1, 1)):
+        service.mark(user_id, day)
+
+    assert service.calendar(user_id, 2024) == ['2024-01-01', '2024-02-29', '2024-12-31']
+
+
+@pytest.mark.parametrize('year, status', [(0, 400), (10000, 400), (1, 200), (9998, 200), (2026, 200)])
+def test_calendar_year_bounds(app, client, user_id, year, status):
+    response = client.get(f'/api/activity/calendar?year={year}')
+    assert response.status_code == status
+    if status == 200:
+        assert response.get_json()['active_days'] == 0
+
+
+def test_redis_failure_degrades_to_none(app, client, user_id, monkeypatch):
+    from app.services import activity_service
+
+    def unavailable(*args, **kwargs):
+        raise RedisError('Connection refused')
+
+    monkeypatch.setattr(activity_service.redis_client, 'mget', unavailable)
+    monkeypatch.setattr(activity_service.redis_client, 'get', unavailable)
+
+    assert client.get('/api/activity/streaks').get_json() == {'current': None, 'longest': None}
+    calendar = client.get('/api/activity/calendar').get_json()
+    assert calendar['days'] is None and calendar['active_days'] is None
@@ -0,0 +1,88 @@
+"""
+Adaptive selection: the per-subject item index and rating updates
+"""
+from types import SimpleNamespace
+import pytest
+from app import db
+from app.models.question import Question
+from app.models.subject import Topic
+
+
+def test_nearest_walks_out_from_the_target():
+    from app.services.adaptive_service import ItemIndex
+
+    index = ItemIndex(1, [(q_id, 10, rating) for q_id, rating in
+                          [(1, -2.0), (2, -1.0), (3, 0.0), (4, 0.5), (5, 2.0)]])
+
+    assert index.nearest(10, 0.4, 3) == [4, 3, 2]
+    assert index.nearest(10, 0.4, 3, exclude={4}) == [3, 2, 5]
+    assert index.nearest(99, 0.0, 3) == []
+
+    index.update(5, 0.45)
+    assert index.nearest(10, 0.4, 2) == [5, 4]
+    assert len(index) == 5
+
+
+def answered(question_ids, correct=True):
+    """Answers as complete_test passes them, with their questions loaded"""
+    return [SimpleNamespace(question=db.session.get(Question, q_id), is_correct=correct) for q_id in question_ids]
+
+
+@pytest.fixture
+def bank(app, make_topic):
+    """(subject_id, topic_id, medium question IDs) with the subject's index built"""
+    from app.services.adaptive_service import AdaptiveService
+
+    topic_id = make_topic()
+    with app.app_context():
+        topic = db.session.get(Topic, topic_id)
+        question_ids = [q.id for q in Question.query.filter_by(topic_id=topic_id, difficulty='medium')]
+        AdaptiveService().get_index(topic.subject_id)
+        return topic.subject_id, topic_id, question_ids
+
+
+def rating_in_index(subject_id, question_id):
+    from app.services.adaptive_service import _indexes
+    return _indexes[subject_id]._positions[question_id][1]
+
+
+def test_index_follows_only_committed_ratings(app, bank):
+    from app.services.adaptive_service import AdaptiveService
+
+    subject_id, topic_id, (question_id, *_) = bank
+    with app.app_context():
+        progress = {topic_id: SimpleNamespace(ability_rating=0.0)}
+        AdaptiveService().record_answers(progress, answered([question_id]))
+        db.session.rollback()
+
+        assert rating_in_index(subject_id, question_id) == 0.0
+        assert db.session.get(Question, question_id).difficulty_rating == 0.0
+
+        AdaptiveService().record_answers(progress, answered([question_id]))
+        db.session.commit()
+
+        rating = db.session.get(Question, question_id).difficulty_rating
+        assert rating < 0.0
+        assert rating_in_index(subject_id, question_id) == rating
+
+
+def test_concurrent_tests_both_move_the_rating(app, bank):
+    from app.services.adaptive_service import AdaptiveService
+
+    subject_id, topic_id, (question_id, *_) = bank
+    with app.app_context():
+        # Both tests read the question before either completes
+        first = answered([question_id])
+        with app.app_context():
+            second = answered([question_id])
+            AdaptiveService().record_answers({topic_id: SimpleNamespace(ability_rating=0.0)}, second)
+            db.session.commit()
+        AdaptiveService().record_answers({topic_id: SimpleNamespace(ability_rating=0.0)}, first)
+        db.session.commit()
+
+        question = db.session.get(Question, question_id)
+        # Each correct answer at even odds moves a fresh item by DIFFICULTY_K * 0.5
+        assert question.difficulty_rating == pytest.approx(-0.4)
+        assert question.times_used == 2
+        assert float(question.avg_correct_rate) == 100
+        assert rating_in_index(subject_id, question_id) == pytest.approx(-0.4)
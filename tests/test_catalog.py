@@ -0,0 +1,77 @@
+"""
+Per-worker catalog snapshots and their API payloads
+"""
+from app import db
+from app.models.subject import Subject, Topic
+
+
+def queries(response) -> int:
+    assert response.status_code in (200, 304)
+    return int(response.headers['X-DB-Queries'])
+
+
+def test_warm_catalog_is_served_without_queries(app, client, login, make_user, make_topic):
+    topic_id = make_topic(questions_per_level=0)
+    with app.app_context():
+        subject_id = db.session.get(Topic, topic_id).subject_id
+    login(make_user())
+
+    # Builds the snapshot (two queries) and caches the user (one)
+    assert queries(client.get('/api/subjects')) == 3
+    assert queries(client.get('/api/subjects')) == 0
+
+    topics = client.get(f'/api/subjects/{subject_id}/topics')
+    assert queries(topics) == 0
+    assert [t['id'] for t in topics.get_json()] == [topic_id]
+
+    again = client.get(f'/api/subjects/{subject_id}/topics', headers={'If-None-Match': topics.headers['ETag']})
+    assert again.status_code == 304
+    assert queries(again) == 0
+
+
+def test_only_active_entries_in_display_order(app, client, login, make_user):
+    with app.app_context():
+        second = Subject(name_sk='Fyzika', slug='fyzika', is_active=True, order_index=2)
+        first = Subject(name_sk='Chémia', slug='chemia', is_active=True, order_index=1)
+        hidden = Subject(name_sk='Latinčina', slug='latincina', is_active=False, order_index=0)
+        db.session.add_all([second, first, hidden])
+        db.session.flush()
+        db.session.add_all([
+            Topic(subject_id=first.id, name_sk='Kyseliny', slug='kyseliny', is_active=True, order_index=2),
+            Topic(subject_id=first.id, name_sk='Atómy', slug='atomy', is_active=True, order_index=1),
+            Topic(subject_id=first.id, name_sk='Alchýmia', slug='alchymia', is_active=False, order_index=0),
+        ])
+        db.session.commit()
+        first_id, hidden_id = first.id, hidden.id
+    login(make_user())
+
+    assert [s['slug'] for s in client.get('/api/subjects').get_json()] == ['chemia', 'fyzika']
+    assert [t['slug'] for t in client.get(f'/api/subjects/{first_id}/topics').get_json()] == ['atomy', 'kyseliny']
+    # A subject without active topics and an unknown one both list nothing
+    assert client.get(f'/api/subjects/{hidden_id}/topics').get_json() == []
+    assert client.get('/api/subjects/999999/topics').get_json() == []
+
+
+def test_snapshot_follows_committed_changes_only(app, make_topic):
+    from app.services.catalog_service import CatalogService
+
+    topic_id = make_topic(questions_per_level=0)
+    with app.app_context():
+        built = CatalogService().get()
+
+    with app.app_context():
+        db.session.get(Topic, topic_id).name_sk = 'Zlomky'
+        db.session.flush()
+        db.session.rollback()
+    with app.app_context():
+        assert CatalogService().get() is built
+
+    with app.app_context():
+        db.session.get(Topic, topic_id).name_sk = 'Zlomky'
+        db.session.commit()
+    with app.app_context():
+        subject_id = db.session.get(Topic, topic_id).subject_id
+        catalog = CatalogService().get()
+        assert catalog is not built
+        assert [t['name_sk'] for t in catalog.topics(subject_id)] == ['Zlomky']
+        assert catalog.topics_json(subject_id)[1] != built.topics_json(subject_id)[1]
@@ -0,0 +1,74 @@
+"""
+Compressed responses and their ETags
+"""
+import gzip
+import pytest
+from app import db
+from app.models.subject import Subject
+
+
+@pytest.fixture
+def catalog_user(app, login, make_user) -> int:
+    """A logged-in user, and enough subjects for /api/subjects to be compressed"""
+    with app.app_context():
+        db.session.add_all([
+            Subject(name_sk=f'Predmet číslo {i} s dlhým názvom', slug=f'predmet-{i}',
+                    icon='📘', color='#3366ff', is_active=True, order_index=i)
+            for i in range(20)
+        ])
+        db.session.commit()
+    user_id = make_user()
+    login(user_id)
+    return user_id
+
+
+def test_compressed_catalog_keeps_a_strong_etag_per_encoding(app, client, catalog_user):
+    plain = client.get('/api/subjects', headers={'Accept-Encoding': 'identity'})
+    zipped = client.get('/api/subjects', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(zipped.get_data()) == plain.get_data()
+
+    tag, weak = plain.get_etag()
+    assert zipped.get_etag() == (f'{tag}-gzip', False)
+    assert not weak
+    assert 'Accept-Encoding' in zipped.vary
+
+
+@pytest.mark.parametrize('encoding', ['identity', 'gzip', 'br'])
+def test_every_encodings_etag_revalidates(app, client, catalog_user, encoding):
+    first = client.get('/api/subjects', headers={'Accept-Encoding': encoding})
+    etag = first.headers['ETag']
+
+    again = client.get('/api/subjects', headers={'Accept-Encoding': encoding, 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert again.get_data() == b''
+
+
+def test_changed_catalog_is_sent_again(app, client, catalog_user):
+    etag = client.get('/api/subjects', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+
+    with app.app_context():
+        Subject.query.filter_by(slug='predmet-0').one().name_sk = 'Premenovaný predmet'
+        db.session.commit()
+
+    changed = client.get('/api/subjects', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_small_and_uncompressible_bodies_are_sent_as_is(app):
+    from flask import Flask
+    from app.utils.compression import init_compression
+
+    small = Flask('small')
+    small.config.update(COMPRESS_RESPONSES=True, COMPRESS_MIN_SIZE=500,
+                        COMPRESS_MIMETYPES=('application/json',), COMPRESS_CACHE_SIZE=4)
+    small.add_url_rule('/tiny', 'tiny', lambda: {'ok': True})
+    init_compression(small)
+
+    response = small.test_client().get('/tiny', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json() == {'ok': True}
@@ -0,0 +1,93 @@
+"""
+Statement counts of the dashboard
+
+The dashboard must cost a fixed number of queries however much history
+a user has, and none at all once it is cached.
+"""
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.gamification import Badge, UserBadge
+from app.models.subject import Subject, Topic, UserTopicProgress
+from app.models.user import User, UserSubject
+
+# Services bind redis_client when imported, so the tests import them only
+# once the app exists
+
+
+def make_user(tests: int, badges: int) -> int:
+    """A user with two subjects, topic progress, completed tests and badges"""
+    from app.models.test import TestSession  # not at module level, or pytest tries to collect it
+
+    user = User(email=f'student{tests}-{badges}@example.com', onboarding_completed=True, xp=120, level=2)
+    db.session.add(user)
+
+    subjects = [Subject(name_sk=f'Predmet {i}', slug=f'predmet-{i}', is_active=True, order_index=i)
+                for i in range(2)]
+    db.session.add_all(subjects)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    for i, subject in enumerate(subjects):
+        db.session.add(UserSubject(user_id=user.id, subject_id=subject.id, is_active=True))
+        topic = Topic(subject_id=subject.id, name_sk=f'Téma {i}', slug=f'tema-{i}', is_active=True)
+        db.session.add(topic)
+        db.session.flush()
+        db.session.add(UserTopicProgress(user_id=user.id, topic_id=topic.id, total_questions=10,
+                                         correct_answers=4 + i, accuracy_rate=40 + i * 10))
+
+    for i in range(tests):
+        db.session.add(TestSession(
+            user_id=user.id, subject_id=subjects[i % 2].id, test_type='quick', total_questions=10,
+            status='completed', started_at=now - timedelta(hours=i, minutes=10),
+            completed_at=now - timedelta(hours=i), score=7, percentage=70, time_spent_seconds=600
+        ))
+
+    for i in range(badges):
+        badge = Badge(slug=f'badge-{i}', name_sk=f'Odznak {i}', icon='*', xp_reward=10, is_active=True)
+        db.session.add(badge)
+        db.session.flush()
+        db.session.add(UserBadge(user_id=user.id, badge_id=badge.id, earned_at=now - timedelta(days=i)))
+
+    db.session.commit()
+    return user.id
+
+
+def render(client) -> int:
+    response = client.get('/dashboard')
+    assert response.status_code == 200
+    return int(response.headers['X-DB-Queries'])
+
+
+@pytest.mark.parametrize('tests,badges', [(1, 1), (12, 8)])
+def test_dashboard_cache_miss_statement_count(app, client, login, tests, badges):
+    from app.services.catalog_service import CatalogService
+
+    with app.app_context():
+        user_id = make_user(tests, badges)
+        # Per-worker catalog snapshot, as in a running worker
+        CatalogService().get()
+    login(user_id)
+
+    # User loader, user_subjects, stats rollup, subject progress, weak
+    # topics, recent badges, recent tests
+    assert render(client) == 7
+
+
+def test_dashboard_cached_runs_no_queries(app, client, login):
+    from app.services.catalog_service import CatalogService
+    from app.services.dashboard_service import invalidate_dashboard
+
+    with app.app_context():
+        user_id = make_user(3, 2)
+        CatalogService().get()
+    login(user_id)
+    render(client)
+
+    assert render(client) == 0
+
+    # Invalidated (e.g. after a completed test): rebuilt with the same
+    # statements; the snapshot is cached, but user_subjects loads the User
+    with app.app_context():
+        invalidate_dashboard(user_id)
+    assert render(client) == 7
@@ -0,0 +1,88 @@
+"""
+Read-replica routing
+"""
+import time
+import pytest
+from flask import g, session as flask_session
+from sqlalchemy import create_engine, select
+from app import db
+from app.models.user import User
+
+
+@pytest.fixture
+def replica(app, monkeypatch):
+    """
+    Factory registering a replica bind for the test: replica(url=None)
+
+    Without a URL the replica is the testing database itself, through an
+    engine of its own (a primary standing in for a replica reports no lag).
+    """
+    from app.utils import db_routing
+
+    monkeypatch.setattr(db_routing, '_health', {})
+    engines = []
+
+    def replica(url: str = None):
+        engine = create_engine(url or app.config['SQLALCHEMY_DATABASE_URI'])
+        engines.append(engine)
+        with app.app_context():
+            monkeypatch.setitem(db.engines, 'replica_0', engine)
+        monkeypatch.setitem(app.config, 'REPLICA_BINDS', ['replica_0'])
+        return engine
+
+    yield replica
+    for engine in engines:
+        engine.dispose()
+
+
+def replica_queries(response) -> int:
+    assert response.status_code == 200
+    return int(response.headers.get('X-DB-Replica-Queries', 0))
+
+
+def test_read_only_views_read_from_the_replica(app, client, login, make_user, replica):
+    replica()
+    login(make_user())
+
+    assert replica_queries(client.get('/api/tests/history')) > 0
+    # Not marked read-only (and the catalog isn't cached yet)
+    response = client.get('/api/subjects')
+    assert int(response.headers['X-DB-Queries']) > 0
+    assert replica_queries(response) == 0
+
+
+def test_recent_writers_read_from_the_primary(app, client, login, make_user, replica):
+    replica()
+    login(make_user())
+    with client.session_transaction() as session:
+        session['db_primary_until'] = time.time() + 60
+
+    assert replica_queries(client.get('/api/tests/history')) == 0
+
+    with client.session_transaction() as session:
+        session['db_primary_until'] = time.time() - 1
+    assert replica_queries(client.get('/api/tests/history')) > 0
+
+
+def test_unreachable_replica_falls_back_to_the_primary(app, client, login, make_user, replica):
+    replica('postgresql://localhost:1/unreachable')
+    login(make_user())
+
+    response = client.get('/api/tests/history')
+    assert replica_queries(response) == 0
+    assert response.get_json()['tests'] == []
+
+
+def test_a_write_pins_the_request_and_the_browser(app, make_user, replica):
+    replica()
+    user_id = make_user(grade=5)
+
+    with app.test_request_context():
+        g.db_read_only = True
+        assert db.session.get_bind(clause=select(User)) is db.engines['replica_0']
+
+        db.session.get(User, user_id).grade = 6
+        db.session.flush()
+        assert db.session.get_bind(clause=select(User)) is db.engine
+        assert flask_session['db_primary_until'] > time.time()
+        db.session.rollback()
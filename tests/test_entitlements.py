@@ -0,0 +1,80 @@
+"""
+Entitlements snapshots: caching, expiry and invalidation
+"""
+import json
+from datetime import datetime, timedelta
+from app import db
+from app.models.subscription import PLAN_LIMITS, Subscription
+from app.utils.query_counter import query_count
+
+
+def subscribe(app, user_id: int, plan: str, expires_in: timedelta) -> int:
+    with app.app_context():
+        subscription = Subscription(user_id=user_id, plan=plan, status='active',
+                                    expires_at=datetime.utcnow() + expires_in)
+        db.session.add(subscription)
+        db.session.commit()
+        return subscription.id
+
+
+def test_batch_reads_query_only_the_misses(app, make_user):
+    from app import redis_client
+    from app.services.entitlement_service import EntitlementService, entitlements_key
+
+    free, premium, cached = make_user(), make_user(), make_user()
+    subscribe(app, premium, 'premium', timedelta(days=30))
+    redis_client.set(entitlements_key(cached), json.dumps({'plan': 'basic', 'active': True,
+                                                          'limits': {}, 'expires_at': None}))
+
+    with app.test_request_context():
+        snapshots = EntitlementService().get_many([free, premium, cached])
+        assert query_count() == 1
+        assert snapshots[free] == {'plan': 'free', 'active': False, 'limits': PLAN_LIMITS['free'], 'expires_at': None}
+        assert snapshots[premium]['limits'] == PLAN_LIMITS['premium']
+        assert snapshots[cached]['plan'] == 'basic'
+
+        # Then from the request cache
+        assert EntitlementService().get(premium) is snapshots[premium]
+        assert query_count() == 1
+
+    assert redis_client.exists(entitlements_key(free), entitlements_key(premium)) == 2
+
+
+def test_cache_never_outlives_the_subscription(app, make_user):
+    from app import redis_client
+    from app.services.entitlement_service import ENTITLEMENTS_TTL, EntitlementService, entitlements_key
+
+    expiring, free = make_user(), make_user()
+    subscribe(app, expiring, 'basic', timedelta(minutes=5))
+
+    with app.app_context():
+        EntitlementService().get_many([expiring, free])
+
+    assert 290 <= redis_client.ttl(entitlements_key(expiring)) <= 300
+    assert redis_client.ttl(entitlements_key(free)) == ENTITLEMENTS_TTL
+
+
+def test_subscription_changes_invalidate_after_commit(app, make_user):
+    from app import redis_client
+    from app.services.entitlement_service import EntitlementService, entitlements_key
+
+    user_id = make_user()
+    subscription_id = subscribe(app, user_id, 'basic', timedelta(days=30))
+    with app.app_context():
+        EntitlementService().get(user_id)
+
+    with app.app_context():
+        db.session.get(Subscription, subscription_id).plan = 'premium'
+        db.session.flush()
+        # Not committed yet: the cached plan is still the visible one
+        assert redis_client.exists(entitlements_key(user_id))
+        db.session.rollback()
+    assert redis_client.exists(entitlements_key(user_id))
+
+    with app.app_context():
+        db.session.get(Subscription, subscription_id).plan = 'premium'
+        db.session.commit()
+    assert not redis_client.exists(entitlements_key(user_id))
+
+    with app.app_context():
+        assert EntitlementService().get(user_id)['plan'] == 'premium'
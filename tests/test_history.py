@@ -0,0 +1,50 @@
+"""
+Completed-test history
+"""
+from datetime import datetime
+from app import db
+
+
+def make_history(app, user_id: int, completed_at: list):
+    from app.models.test import TestSession  # not at module level, or pytest tries to collect it
+
+    with app.app_context():
+        db.session.add_all([
+            TestSession(user_id=user_id, test_type='quick', total_questions=10, status='completed',
+                        score=5, percentage=50, completed_at=at)
+            for at in completed_at
+        ])
+        db.session.commit()
+
+
+def test_pages_cover_ties_once(app, client, login, make_user):
+    # Three tests share a completed_at: the cursor must order them by id
+    tied = datetime(2026, 10, 1, 12)
+    user_id = make_user()
+    make_history(app, user_id, [tied, tied, tied, datetime(2026, 9, 1), datetime(2026, 10, 2)])
+    login(user_id)
+
+    seen, cursor = [], None
+    while True:
+        page = client.get('/api/tests/history', query_string={'per_page': 2, 'cursor': cursor or ''}).get_json()
+        seen += [(test['completed_at'], test['id']) for test in page['tests']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert len(seen) == 5
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_invalid_dates_are_rejected(app, client, login, make_user):
+    user_id = make_user()
+    make_history(app, user_id, [datetime(2026, 10, 1)])
+    login(user_id)
+
+    for args in ({'from': '2026-13-01'}, {'to': 'yesterday'}):
+        response = client.get('/api/tests/history', query_string=args)
+        assert response.status_code == 400
+        assert 'YYYY-MM-DD' in response.get_json()['error']
+
+    page = client.get('/api/tests/history', query_string={'from': '2026-10-01', 'to': '2026-10-01'}).get_json()
+    assert len(page['tests']) == 1
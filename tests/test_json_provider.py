@@ -0,0 +1,55 @@
+"""
+orjson provider: same output as Flask's stdlib provider
+"""
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+orjson = pytest.importorskip('orjson')
+
+PAYLOAD = {
+    'name': 'Matematika – zlomky',
+    'score': Decimal('87.50'),
+    'completed_at': datetime(2026, 10, 19, 14, 5, tzinfo=timezone.utc),
+    'started_at': datetime(2026, 10, 19, 13, 50),
+    'day': date(2026, 10, 19),
+    'session': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'by_topic': {3: 0.5, 1: 1.0},
+    'choices': ['A) ¾', None, True, 1.5]
+}
+
+
+def test_output_matches_the_stdlib_provider():
+    from app.utils.json_provider import OrjsonProvider
+
+    app = Flask('json')
+    stdlib, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+
+    assert fast.loads(fast.dumps(PAYLOAD)) == stdlib.loads(stdlib.dumps(PAYLOAD))
+    # Sorted keys, as the stdlib provider sends them
+    assert list(fast.loads(fast.dumps(PAYLOAD))) == sorted(PAYLOAD)
+    assert fast.loads(b'{"a": [1, 2]}') == {'a': [1, 2]}
+
+
+def test_installed_only_when_configured():
+    from app.utils.json_provider import OrjsonProvider, init_json
+
+    for setting, provider in [('orjson', OrjsonProvider), ('stdlib', DefaultJSONProvider)]:
+        app = Flask('json')
+        app.config['JSON_PROVIDER'] = setting
+        init_json(app)
+        assert type(app.json) is provider
+
+
+def test_jsonify_through_orjson(app, client, login, make_user):
+    from app.utils.json_provider import OrjsonProvider
+
+    assert isinstance(app.json, OrjsonProvider)
+    login(make_user())
+
+    response = client.get('/api/activity/streaks')
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {'current': 0, 'longest': 0}
@@ -0,0 +1,53 @@
+"""
+XP leaderboards
+"""
+
+
+def test_totals_only_move_up(app, make_user):
+    from app import redis_client
+    from app.services.leaderboard_service import LeaderboardService, board_key
+
+    user_id = make_user()
+    service = LeaderboardService()
+
+    # Two awards published out of order
+    service.record_xp(user_id, 150, 50, grade=2)
+    service.record_xp(user_id, 100, 20, grade=2)
+
+    assert redis_client.zscore(board_key('global'), user_id) == 150
+    assert redis_client.zscore(board_key('grade', 2), user_id) == 150
+
+
+def test_page_size_and_radius_are_at_least_one(app, client, login, make_user):
+    from app.services.leaderboard_service import LeaderboardService
+
+    user_ids = [make_user(xp=10 * i) for i in range(5)]
+    service = LeaderboardService()
+    for i, user_id in enumerate(user_ids):
+        service.record_xp(user_id, 10 * (i + 1), 0)
+    login(user_ids[2])
+
+    top = client.get('/api/leaderboard/global?per_page=0').get_json()
+    assert len(top['entries']) == 1
+
+    around = client.get('/api/leaderboard/global/me?radius=-3').get_json()
+    assert len(around['entries']) == 3
+
+
+def test_rebuild_ignores_an_interrupted_run(app, make_user):
+    from app import redis_client
+    from app.services.leaderboard_service import LeaderboardService, board_key
+
+    active = make_user(xp=120, grade=5)
+    inactive = make_user(xp=900, grade=5, is_active=False)
+    # What a crashed rebuild left behind, before this user's XP changed
+    redis_client.zadd(board_key('global') + ':rebuild', {inactive: 900, active: 40})
+    redis_client.zadd(board_key('grade', 7), {inactive: 900})
+
+    with app.app_context():
+        assert LeaderboardService().rebuild(chunk_size=1) == 1
+
+    assert redis_client.zrange(board_key('global'), 0, -1, withscores=True) == [(str(active).encode(), 120)]
+    assert redis_client.zrange(board_key('grade', 5), 0, -1, withscores=True) == [(str(active).encode(), 120)]
+    assert not redis_client.exists(board_key('grade', 7))
+    assert not list(redis_client.scan_iter(match='lb:*:rebuild:*'))
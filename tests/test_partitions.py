@@ -0,0 +1,49 @@
+"""
+Monthly user_answers partitions
+"""
+from datetime import date, datetime, time
+from sqlalchemy import text
+from app import db
+from app.models.test import UserAnswer
+
+
+def count(table: str) -> int:
+    return db.session.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+def test_answers_past_the_last_month_wait_in_the_default_partition(app):
+    from app.services.partition_service import DEFAULT_PARTITION, add_months, create_partition, partition_name
+
+    # Further ahead than ANSWER_PARTITIONS_AHEAD: nobody created this month
+    month = add_months(date.today().replace(day=1), 6)
+    name = partition_name(month)
+
+    with app.app_context():
+        db.session.add(UserAnswer(answered_at=datetime.combine(month, time(12)), user_answer='A', is_correct=True))
+        db.session.commit()
+        assert count(DEFAULT_PARTITION) == 1
+
+        assert create_partition(db.session.connection(), month) == name
+        db.session.commit()
+
+        assert count(DEFAULT_PARTITION) == 0
+        assert count(name) == 1
+        # Attached with the parent's indexes
+        indexes = db.session.execute(text(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = :name"
+        ), {'name': name}).scalars().all()
+        assert any('(session_id, question_id)' in index for index in indexes)
+        assert any('(id, answered_at)' in index for index in indexes)
+
+        # Creating it again is a no-op
+        assert create_partition(db.session.connection(), month) == name
+        db.session.commit()
+
+
+def test_partitions_are_left_out_of_autogenerate(app):
+    from app.services.partition_service import is_partition
+
+    assert is_partition('user_answers_2026_10')
+    assert is_partition('user_answers_default')
+    assert not is_partition('user_answers')
+    assert not is_partition('user_answers_archive')
@@ -0,0 +1,71 @@
+"""
+Drawing topic tests from the question pools
+"""
+from app import db
+from app.models.question import Question
+
+
+def test_draw_without_pools_reads_the_bank_and_resyncs(app, make_topic):
+    from app import redis_client
+    from app.services.pool_service import REFILL_KEY, QuestionPoolService, pool_key
+
+    topic_id = make_topic()
+
+    with app.app_context():
+        service = QuestionPoolService()
+        subject_id, question_ids = service.draw(topic_id, 'hard', 6)
+
+        assert subject_id is not None
+        assert len(set(question_ids)) == 6
+        levels = [db.session.get(Question, q_id).difficulty for q_id in question_ids]
+        assert levels[:4] == ['hard'] * 4
+
+        # Pools are back, and the topic is queued for the filler
+        assert redis_client.scard(pool_key(topic_id, 'hard')) == 4
+        assert redis_client.sismember(REFILL_KEY, topic_id)
+
+        # The next draw comes from Redis
+        assert service.draw(topic_id, 'hard', 6)[0] == subject_id
+
+
+def test_draw_unknown_topic(app):
+    from app.services.pool_service import QuestionPoolService
+
+    with app.app_context():
+        assert QuestionPoolService().draw(999999, 'medium', 5) == (None, [])
+
+
+def test_create_test_rejects_unknown_difficulty(app, client, login, make_user):
+    from app.services.quota_service import QuotaService
+
+    user_id = make_user()
+    login(user_id)
+
+    response = client.post('/test/create', data={'topic_id': 1, 'difficulty': 'impossible'})
+    assert response.status_code == 302
+
+    # Rejected before any quota was used
+    with app.app_context():
+        assert QuotaService().usage(user_id)['tests'] == 0
+
+
+def test_create_test_clamps_the_question_count(app, client, login, make_user, make_topic):
+    from app.models.test import TestSession
+    from app.services.quota_service import QuotaService
+
+    topic_id = make_topic(questions_per_level=30)
+    user_id = make_user()
+    login(user_id)
+
+    for asked, served in ((1000, app.config['TEST_MAX_QUESTIONS']), (1, app.config['TEST_MIN_QUESTIONS'])):
+        response = client.post('/test/create', data={'topic_id': topic_id, 'num_questions': asked})
+        assert response.status_code == 302
+        with app.app_context():
+            test_session = TestSession.query.order_by(TestSession.id.desc()).first()
+            assert test_session.total_questions == served
+
+    # Not a number: rejected before any quota was used
+    response = client.post('/test/create', data={'topic_id': topic_id, 'num_questions': 'all'})
+    assert response.status_code == 302
+    with app.app_context():
+        assert QuotaService().usage(user_id)['tests'] == 2
@@ -0,0 +1,276 @@
+"""
+Query-plan regression checks for the hot queries
+
+Opt-in, since they seed a large synthetic dataset:
+
+    pytest -m query_plans
+
+The dataset goes into a database of its own (QueryPlansConfig:
+QUERY_PLANS_DATABASE_URL, default postgresql://localhost/studujsmart_plans)
+and is kept between runs; it is reseeded when the models' schema changes.
+Each query, run with EXPLAIN ANALYZE, must use its index, skip answer
+partitions older than the test it reads, and stay within its latency
+budget; pages listed newest first must come straight from the index,
+without a sort.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import inspect, text, tuple_
+from sqlalchemy.schema import CreateIndex, CreateTable
+from app import create_app, db
+from app.models.gamification import UserBadge
+from app.models.question import Question
+from app.models.subject import Topic, UserTopicProgress
+# Aliased: pytest would try to collect a module-level TestSession
+from app.models.test import TestSession as SessionModel, UserAnswer
+from app.services.partition_service import add_months, create_partitions, partition_month
+
+pytestmark = pytest.mark.query_plans
+
+USERS = 20000
+TOPICS = 400
+QUESTIONS = 200000
+SESSIONS = 300000
+
+SEED_SQL = """
+INSERT INTO users (email, xp, level, is_active, created_at)
+SELECT 'user' || g || '@example.com', 0, 1, true, now() - interval '1 day' * (g % 365)
+FROM generate_series(1, :users) g;
+
+INSERT INTO subjects (name_sk, slug, is_active, order_index)
+SELECT 'Predmet ' || g, 'subject-' || g, true, g FROM generate_series(1, 8) g;
+
+INSERT INTO topics (subject_id, name_sk, slug, is_active, order_index)
+SELECT 1 + g % 8, 'Téma ' || g, 'topic-' || g, true, g FROM generate_series(1, :topics) g;
+
+INSERT INTO questions (topic_id, question_text, question_type, difficulty, correct_answer, generated_at)
+SELECT 1 + g % :topics, 'Otázka ' || g, 'single_choice',
+       (ARRAY['easy', 'medium', 'hard'])[1 + g % 3], 'A', now()
+FROM generate_series(1, :questions) g;
+
+INSERT INTO test_sessions (user_id, subject_id, test_type, total_questions, status, started_at,
+                           completed_at, score, percentage)
+SELECT 1 + g % :users, 1 + g % 8, 'quick', 10,
+       CASE WHEN g % 10 = 0 THEN 'in_progress' ELSE 'completed' END,
+       now() - interval '1 minute' * g,
+       CASE WHEN g % 10 = 0 THEN NULL ELSE now() - interval '1 minute' * g + interval '8 minutes' END,
+       g % 11, (g % 11) * 10
+FROM generate_series(1, :sessions) g;
+
+INSERT INTO user_answers (session_id, question_id, user_id, user_answer, is_correct, answered_at)
+SELECT s.id, 1 + (s.id * 10 + n) % :questions, s.user_id, 'A', n % 2 = 0, s.started_at
+FROM test_sessions s, generate_series(1, 10) n;
+
+INSERT INTO user_topic_progress (user_id, topic_id, total_questions, correct_answers, accuracy_rate)
+SELECT u, t, 20, (u * t) % 21, ((u * t) % 21) * 5
+FROM generate_series(1, :users) u, generate_series(1, 20) t;
+
+INSERT INTO badges (slug, name_sk, condition_type, condition_value, xp_reward, is_active)
+SELECT 'badge-' || g, 'Odznak ' || g, 'tests_completed', g, 10, true FROM generate_series(1, 20) g;
+
+INSERT INTO user_badges (user_id, badge_id, earned_at)
+SELECT u, b, now() - interval '1 hour' * (u + b)
+FROM generate_series(1, :users) u, generate_series(1, 5) b;
+"""
+
+# Records which schema the dataset was seeded with
+SEED_TABLE = 'query_plans_seed'
+
+# (name, index it must use, latency budget in ms, read in index order,
+#  query for the probed test session, one of its questions and a topic)
+HOT_QUERIES = [
+    (
+        'submit answer: duplicate check (test.py)',
+        'ix_user_answers_session_question', 5, False,
+        lambda s, question_id, topic_id: UserAnswer.for_session(s).filter_by(question_id=question_id).limit(1)
+    ),
+    (
+        'results / complete_test: answers of a session',
+        'ix_user_answers_session_question', 5, False,
+        lambda s, question_id, topic_id: UserAnswer.for_session(s).order_by(UserAnswer.id)
+    ),
+    (
+        'dashboard: recent completed tests',
+        'ix_test_sessions_user_completed', 5, True,
+        lambda s, question_id, topic_id: SessionModel.query.filter_by(user_id=s.user_id, status='completed')
+        .order_by(SessionModel.completed_at.desc()).limit(5)
+    ),
+    (
+        'test history: next page (history_service.py)',
+        'ix_test_sessions_user_completed', 5, True,
+        lambda s, question_id, topic_id: SessionModel.query.filter(
+            SessionModel.user_id == s.user_id,
+            SessionModel.status == 'completed',
+            SessionModel.completed_at.isnot(None),
+            tuple_(SessionModel.completed_at, SessionModel.id) < tuple_(db.func.now(), s.id)
+        ).order_by(SessionModel.completed_at.desc(), SessionModel.id.desc()).limit(11)
+    ),
+    (
+        'test history: one subject',
+        'ix_test_sessions_user_subject_completed', 5, True,
+        lambda s, question_id, topic_id: SessionModel.query.filter(
+            SessionModel.user_id == s.user_id,
+            SessionModel.subject_id == s.subject_id,
+            SessionModel.status == 'completed',
+            SessionModel.completed_at.isnot(None)
+        ).order_by(SessionModel.completed_at.desc(), SessionModel.id.desc()).limit(11)
+    ),
+    (
+        'dashboard: weak topics',
+        'ix_user_topic_progress_user_accuracy', 5, False,
+        lambda s, question_id, topic_id: db.session.query(UserTopicProgress, Topic).join(Topic).filter(
+            UserTopicProgress.user_id == s.user_id,
+            UserTopicProgress.accuracy_rate < 60
+        ).order_by(UserTopicProgress.accuracy_rate.asc()).limit(3)
+    ),
+    (
+        'create_quick_test: weak topics fallback (test_service.py)',
+        'ix_user_topic_progress_user_accuracy', 5, False,
+        lambda s, question_id, topic_id: db.session.query(UserTopicProgress.topic_id).join(Topic).filter(
+            UserTopicProgress.user_id == s.user_id,
+            UserTopicProgress.accuracy_rate < 70
+        ).order_by(UserTopicProgress.accuracy_rate.asc()).limit(3)
+    ),
+    (
+        'dashboard: recent badges',
+        'ix_user_badges_user_earned', 5, True,
+        lambda s, question_id, topic_id: UserBadge.query.filter_by(user_id=s.user_id)
+        .order_by(UserBadge.earned_at.desc()).limit(5)
+    ),
+    (
+        'pool fill: questions of a topic',
+        'ix_questions_topic_difficulty', 20, False,
+        lambda s, question_id, topic_id: db.session.query(Question.difficulty, db.func.count(Question.id))
+        .filter(Question.topic_id == topic_id).group_by(Question.difficulty)
+    ),
+]
+
+
+def schema_fingerprint() -> str:
+    """Hash of the DDL of every model table and index"""
+    dialect = db.engine.dialect
+    ddl = []
+    for table in db.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        ddl.extend(str(CreateIndex(index).compile(dialect=dialect)) for index in table.indexes)
+    return hashlib.sha1('\n'.join(sorted(ddl)).encode()).hexdigest()
+
+
+def seeded_fingerprint():
+    if not inspect(db.engine).has_table(SEED_TABLE):
+        return None
+    return db.session.execute(text(f"SELECT fingerprint FROM {SEED_TABLE}")).scalar()
+
+
+def seed(fingerprint: str):
+    db.session.execute(text(f"DROP TABLE IF EXISTS {SEED_TABLE}"))
+    db.session.commit()
+    db.drop_all()
+    db.create_all()
+    # Sessions start one minute apart going back from now; their answers
+    # need partitions that far back (plus a month of timezone slack)
+    oldest = (datetime.utcnow() - timedelta(minutes=SESSIONS)).date().replace(day=1)
+    create_partitions(db.session.connection(), start=add_months(oldest, -1))
+    for statement in SEED_SQL.split(';'):
+        if statement.strip():
+            db.session.execute(text(statement), {
+                'users': USERS, 'topics': TOPICS, 'questions': QUESTIONS, 'sessions': SESSIONS
+            })
+    db.session.execute(text(f"CREATE TABLE {SEED_TABLE} (fingerprint text NOT NULL)"))
+    db.session.execute(text(f"INSERT INTO {SEED_TABLE} VALUES (:fingerprint)"), {'fingerprint': fingerprint})
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def explain(query, in_order: bool = False):
+    """
+    EXPLAIN ANALYZE of a query
+
+    With in_order, sorting is priced out: on a small dataset a sort of a
+    few rows is cheapest, but a Sort node left in the plan then means no
+    index returns the rows in the requested order.
+    """
+    sql = str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    if in_order:
+        db.session.execute(text("SET enable_sort = off"))
+    try:
+        result = db.session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")).scalar()
+    finally:
+        if in_order:
+            db.session.execute(text("RESET enable_sort"))
+    plan = result if isinstance(result, list) else json.loads(result)
+    return plan[0]
+
+
+def index_names(name: str) -> set:
+    """An index and the per-partition indexes attached to it, which EXPLAIN names instead"""
+    children = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:name)"
+    ), {'name': name}).scalars()
+    return {name, *children}
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """The seeded dataset stays: it's expensive to build and read-only here"""
+    yield
+
+
+@pytest.fixture(scope='module')
+def plans_app():
+    """App on the query-plans database, seeded unless it already matches the models"""
+    app = create_app('query_plans')
+    with app.app_context():
+        fingerprint = schema_fingerprint()
+        if seeded_fingerprint() != fingerprint:
+            seed(fingerprint)
+    return app
+
+
+@pytest.fixture(scope='module')
+def probe(plans_app):
+    """(test session ID, one of its question IDs): the newest test, so every older partition can be pruned"""
+    with plans_app.app_context():
+        test_session = SessionModel.query.filter_by(status='completed').order_by(SessionModel.started_at.desc()).first()
+        return test_session.id, UserAnswer.for_session(test_session).first().question_id
+
+
+@pytest.mark.parametrize('name, index, budget_ms, in_order, build', HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_query_plan(plans_app, probe, name, index, budget_ms, in_order, build):
+    session_id, question_id = probe
+    with plans_app.app_context():
+        test_session = db.session.get(SessionModel, session_id)
+        plan = explain(build(test_session, question_id, 1), in_order=in_order)
+        nodes = list(plan_nodes(plan['Plan']))
+
+        problems = []
+        indexes = {node.get('Index Name') for node in nodes} - {None}
+        if not indexes & index_names(index):
+            problems.append(f"expected {index}, used {sorted(indexes) or 'no index'}")
+
+        first_month = test_session.started_at.date().replace(day=1)
+        unpruned = sorted({
+            node['Relation Name'] for node in nodes
+            if partition_month(node.get('Relation Name') or '')
+            and partition_month(node['Relation Name']) < first_month
+        })
+        if unpruned:
+            problems.append(f"partitions not pruned: {', '.join(unpruned)}")
+
+        if in_order and any(node['Node Type'] in ('Sort', 'Incremental Sort') for node in nodes):
+            problems.append("no index returns the rows in order, they are sorted")
+
+        if plan['Execution Time'] > budget_ms:
+            problems.append(f"{plan['Execution Time']:.2f}ms over {budget_ms}ms budget")
+
+        assert not problems, '; '.join(problems)
@@ -0,0 +1,83 @@
+"""
+Precomputed client payloads of bank questions
+"""
+import json
+import pytest
+from sqlalchemy import update
+from app import db
+from app.models.question import Question
+
+
+def client_view(question: Question) -> dict:
+    """What the test page got before payloads were stored"""
+    return {
+        'id': question.id,
+        'question_text': question.question_text,
+        'question_type': question.question_type,
+        'difficulty': question.difficulty,
+        'choices': question.choices
+    }
+
+
+@pytest.fixture
+def questions(app, make_topic):
+    """IDs of awkward-to-serialize questions, the first one without a stored payload"""
+    topic_id = make_topic(questions_per_level=0)
+    with app.app_context():
+        questions = [
+            Question(topic_id=topic_id, question_text=text, question_type='single_choice',
+                     difficulty='medium', correct_answer='A', explanation='Lebo tak.',
+                     choices=choices)
+            for text, choices in [
+                ('Koľko je ½ + ¼?', ['A) ¾', 'B) ⅔']),
+                ('Čo vypíše print("a\\tb")?', ['A) a\tb', 'B) "a\\tb"']),
+                ('Napíš 10 / 4 =', None),
+            ]
+        ]
+        db.session.add_all(questions)
+        db.session.commit()
+        question_ids = [q.id for q in questions]
+        db.session.execute(update(Question).where(Question.id == question_ids[0]).values(client_payload=None))
+        db.session.commit()
+    return question_ids
+
+
+def test_payload_never_carries_the_answer(app, questions):
+    with app.app_context():
+        question = db.session.get(Question, questions[1])
+        payload = json.loads(question.client_payload)
+
+        assert 'correct_answer' not in payload and 'explanation' not in payload
+        assert json.loads(Question.with_id(question.id, question.client_payload)) == client_view(question)
+
+
+def test_questions_api_serves_the_stored_payloads(app, client, login, make_user, questions):
+    from app.models.test import TestSession as SessionModel
+
+    user_id = make_user()
+    picked = [questions[2], questions[0], questions[1]]
+    with app.app_context():
+        test = SessionModel(user_id=user_id, test_type='quick', total_questions=3,
+                            question_ids=picked, status='in_progress')
+        db.session.add(test)
+        db.session.commit()
+        test_id = test.id
+        expected = [client_view(db.session.get(Question, q_id)) for q_id in picked]
+    login(user_id)
+
+    body = client.get(f'/test/tests/{test_id}/questions').get_json()
+    assert body == {'questions': expected, 'total': 3, 'complete': True, 'generating': False}
+
+    rest = client.get(f'/test/tests/{test_id}/questions?offset=2').get_json()
+    assert rest['questions'] == expected[2:]
+
+
+def test_backfill_builds_missing_payloads(app, questions):
+    from app.services.pool_service import QuestionPoolService
+
+    with app.app_context():
+        assert QuestionPoolService().backfill_payloads(chunk_size=1) == 1
+        assert QuestionPoolService().backfill_payloads() == 0
+
+        question = db.session.get(Question, questions[0])
+        assert question.client_payload == question.build_client_payload()
@@ -0,0 +1,74 @@
+"""
+Daily quotas: atomic consumption under concurrency, refunds by day
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from types import SimpleNamespace
+import pytest
+from app.models.subscription import PLAN_LIMITS
+
+
+@pytest.fixture
+def user_id(app, make_user) -> int:
+    """A free-plan user, entitlements already cached (as after their first request)"""
+    from app.services.entitlement_service import EntitlementService
+
+    user_id = make_user()
+    with app.app_context():
+        EntitlementService().get(user_id)
+    return user_id
+
+
+def test_parallel_consumes_allow_exactly_the_limit(app, user_id):
+    from app.services.quota_service import QuotaService
+
+    limit = PLAN_LIMITS['free']['tests_per_day']
+    requests = limit + 7
+    barrier = threading.Barrier(requests)
+
+    def consume(_):
+        with app.app_context():
+            barrier.wait()
+            # consume() only reads the user's ID
+            return QuotaService().consume(SimpleNamespace(id=user_id), 'tests')
+
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        results = list(pool.map(consume, range(requests)))
+
+    allowed = [used for ok, used in results if ok]
+    assert len(allowed) == limit
+    assert sorted(allowed) == list(range(1, limit + 1))
+    assert all(used == limit for ok, used in results if not ok)
+
+    with app.app_context():
+        assert QuotaService().usage(user_id)['tests'] == limit
+
+
+def test_refund_returns_units_to_the_day_they_were_consumed(app, user_id):
+    from app.services.quota_service import QuotaService
+
+    yesterday = date.today() - timedelta(days=1)
+
+    with app.app_context():
+        service = QuotaService()
+        service.consume(SimpleNamespace(id=user_id), 'tests')
+        service.consume(SimpleNamespace(id=user_id), 'tests', day=yesterday)
+
+        # A request started before midnight and failed after it
+        service.refund(user_id, 'tests', yesterday)
+
+        assert service.usage(user_id, yesterday)['tests'] == 0
+        assert service.usage(user_id)['tests'] == 1
+
+
+def test_refund_of_an_expired_counter_is_dropped(app, user_id):
+    from app import redis_client
+    from app.services.quota_service import QuotaService, quota_key
+
+    long_ago = date.today() - timedelta(days=3)
+
+    with app.app_context():
+        QuotaService().refund(user_id, 'tests', long_ago)
+
+    assert not redis_client.exists(quota_key(user_id, long_ago))
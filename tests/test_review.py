@@ -0,0 +1,73 @@
+"""
+Spaced-repetition review schedules
+"""
+from datetime import datetime, timedelta
+from app import db
+from app.models.question import Question
+from app.models.subject import Topic, UserTopicProgress
+
+
+def practiced(app, user_id: int, topic_id: int, days_ago: float, mastery_level: str):
+    with app.app_context():
+        db.session.add(UserTopicProgress(
+            user_id=user_id, topic_id=topic_id, mastery_level=mastery_level,
+            last_practiced_at=datetime.utcnow() - timedelta(days=days_ago)
+        ))
+        db.session.commit()
+
+
+def test_due_topics_most_overdue_first(app, make_user, make_topic):
+    from app.services.review_service import ReviewService
+
+    user_id = make_user()
+    first = make_topic(questions_per_level=0)
+    with app.app_context():
+        subject_id = db.session.get(Topic, first).subject_id
+    rest = [make_topic(questions_per_level=0, subject_id=subject_id) for _ in range(3)]
+
+    service = ReviewService()
+    assert service.due_topics(user_id, subject_id) is None
+
+    # Overdue by 1 and 3 days, due in 2 days, and never practiced
+    practiced(app, user_id, first, 2, 'beginner')
+    practiced(app, user_id, rest[0], 10, 'advanced')
+    practiced(app, user_id, rest[1], 1, 'intermediate')
+    with app.app_context():
+        assert service.rebuild(chunk_size=2) == 3
+        service.schedule(user_id, subject_id, [UserTopicProgress(topic_id=rest[2])])
+
+    assert service.due_topics(user_id, subject_id) == [rest[2], rest[0], first]
+    assert service.due_topics(user_id, subject_id, limit=1) == [rest[2]]
+    # Other subjects keep their own schedule
+    assert service.due_topics(user_id, subject_id + 1) is None
+
+
+def test_nothing_due_is_not_a_missing_schedule(app, make_user, make_topic):
+    from app.services.review_service import ReviewService
+
+    user_id, topic_id = make_user(), make_topic(questions_per_level=0)
+    practiced(app, user_id, topic_id, 0, 'master')
+    with app.app_context():
+        subject_id = db.session.get(Topic, topic_id).subject_id
+        ReviewService().rebuild()
+
+    assert ReviewService().due_topics(user_id, subject_id) == []
+
+
+def test_quick_test_draws_from_due_topics(app, make_user, make_topic):
+    from app.services.review_service import ReviewService
+    from app.services.test_service import TestService
+
+    user_id, due = make_user(), make_topic()
+    with app.app_context():
+        subject_id = db.session.get(Topic, due).subject_id
+    resting = make_topic(subject_id=subject_id)
+    practiced(app, user_id, due, 5, 'beginner')
+    practiced(app, user_id, resting, 1, 'master')
+
+    with app.app_context():
+        ReviewService().rebuild()
+
+        test = TestService().create_quick_test(user_id, subject_id, num_questions=5)
+        assert test.topic_ids == [due]
+        assert {db.session.get(Question, q_id).topic_id for q_id in test.question_ids} == {due}
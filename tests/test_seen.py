@@ -0,0 +1,50 @@
+"""
+Recently seen questions: Bloom filter generations
+"""
+
+
+def test_full_generation_rotates_and_is_forgotten_one_generation_later(app):
+    from app import redis_client
+    from app.services.seen_service import SeenFilterService, seen_keys
+
+    with app.app_context():
+        service = SeenFilterService(capacity=10)
+        first, second = list(range(1, 11)), list(range(101, 111))
+
+        service.add(7, first)
+        # Rotated: the first generation is now the previous one, still seen
+        assert redis_client.get(seen_keys(7)[2]) is None
+        assert service.seen(7, first) == set(first)
+
+        service.add(7, second)
+        assert service.seen(7, second) == set(second)
+        assert service.seen(7, first) == set()
+
+
+def test_late_rotation_keeps_the_previous_generation(app):
+    from app.services.seen_service import SeenFilterService
+
+    with app.app_context():
+        service = SeenFilterService(capacity=10)
+        first = list(range(1, 11))
+
+        # Two requests see the generation fill up; the first one rotates
+        service.add(7, first[:9])
+        service.add(7, first[9:])
+        # A question lands in the fresh generation before the second request rotates
+        service.add(7, [500])
+        assert service._rotate(7) is False
+
+        assert service.seen(7, first) == set(first)
+        assert service.seen(7, [500]) == {500}
+
+
+def test_users_are_independent(app):
+    from app.services.seen_service import SeenFilterService
+
+    with app.app_context():
+        service = SeenFilterService()
+        service.add(1, [1, 2, 3])
+
+        assert service.seen(1, [1, 2, 3, 4]) == {1, 2, 3}
+        assert service.seen(2, [1, 2, 3]) == set()
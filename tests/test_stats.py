@@ -0,0 +1,63 @@
+"""
+Per-user stats rollup
+"""
+import time
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.stats import UserDailyStats, UserStats
+from app.models.subject import Topic
+
+
+# Far enough east and west of UTC that the local date differs from the
+# UTC date in one of them at any hour
+@pytest.mark.parametrize('zone', ['Etc/GMT-14', 'Etc/GMT+12'])
+def test_recent_tests_window_follows_the_utc_buckets(zone, monkeypatch):
+    today = datetime.utcnow().date()
+    stats = UserStats(daily_counts={
+        (today - timedelta(days=2)).isoformat(): 4,
+        (today - timedelta(days=1)).isoformat(): 2,
+        today.isoformat(): 1
+    })
+
+    monkeypatch.setenv('TZ', zone)
+    time.tzset()
+    try:
+        assert stats.tests_in_last_days(1) == 1
+        assert stats.tests_in_last_days(2) == 3
+        assert stats.tests_in_last_days(7) == 7
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_rollup_of_a_new_user(app, make_user):
+    from app.services.stats_service import StatsService
+
+    user_id = make_user()
+    with app.app_context():
+        assert StatsService().get(user_id) is None
+
+
+@pytest.mark.parametrize('zone', ['Etc/GMT-14', 'Etc/GMT+12'])
+def test_history_window_follows_the_utc_days(app, make_user, make_topic, zone, monkeypatch):
+    from app.services.stats_service import StatsService
+
+    user_id, topic_id = make_user(), make_topic(questions_per_level=0)
+    today = datetime.utcnow().date()
+    with app.app_context():
+        subject_id = db.session.get(Topic, topic_id).subject_id
+        db.session.add_all([
+            UserDailyStats(user_id=user_id, day=day, topic_id=topic_id, subject_id=subject_id,
+                           questions_answered=10, correct_answers=5, time_spent_seconds=60)
+            for day in (today - timedelta(days=1), today)
+        ])
+        db.session.commit()
+
+        monkeypatch.setenv('TZ', zone)
+        time.tzset()
+        try:
+            assert [row['date'] for row in StatsService().history(user_id, 1)] == [today.isoformat()]
+        finally:
+            monkeypatch.undo()
+            time.tzset()
@@ -0,0 +1,117 @@
+"""
+Topic hierarchy: closure table and cached trees
+"""
+from datetime import datetime
+import pytest
+from app import db
+from app.models.subject import Topic, TopicClosure, UserTopicProgress
+
+
+@pytest.fixture
+def tree(app, make_topic):
+    """
+    {name: topic ID} of one subject's topics:
+
+        algebra
+        ├── equations
+        │   └── quadratic
+        └── fractions
+        geometry
+    """
+    algebra = make_topic(questions_per_level=0)
+    with app.app_context():
+        subject_id = db.session.get(Topic, algebra).subject_id
+        topics = {'algebra': algebra}
+        for name, parent, order_index in [('equations', 'algebra', 1), ('fractions', 'algebra', 0),
+                                          ('quadratic', 'equations', 0), ('geometry', None, 1)]:
+            topic = Topic(subject_id=subject_id, name_sk=name, slug=name, is_active=True,
+                          order_index=order_index, parent_topic_id=topics.get(parent))
+            db.session.add(topic)
+            db.session.flush()
+            topics[name] = topic.id
+        db.session.commit()
+        topics['subject'] = subject_id
+    return topics
+
+
+def closure(app):
+    with app.app_context():
+        return set(db.session.query(TopicClosure.ancestor_id, TopicClosure.descendant_id, TopicClosure.depth))
+
+
+def test_tree_lookups(app, tree):
+    from app.services.topic_tree_service import TopicTreeService
+
+    with app.app_context():
+        topics = TopicTreeService().get_tree(tree['subject'])
+
+    assert topics.roots == sorted([tree['algebra'], tree['geometry']])
+    assert topics.subtree(tree['algebra']) == {tree['algebra'], tree['equations'], tree['fractions'], tree['quadratic']}
+    assert topics.subtree(tree['geometry']) == {tree['geometry']}
+    assert topics.ancestors(tree['quadratic']) == (tree['equations'], tree['algebra'])
+    assert topics.children(tree['algebra']) == (tree['fractions'], tree['equations'])
+    assert topics.parent(tree['quadratic']) == tree['equations']
+    assert topics.subtree(-1) == frozenset()
+
+
+def test_moves_keep_the_closure_equal_to_a_rebuild(app, tree):
+    from app.services.topic_tree_service import TopicTreeService
+
+    with app.app_context():
+        db.session.get(Topic, tree['equations']).parent_topic_id = tree['geometry']
+        db.session.commit()
+    moved = closure(app)
+    assert (tree['geometry'], tree['quadratic'], 2) in moved
+    assert not any(ancestor == tree['algebra'] and descendant == tree['quadratic'] for ancestor, descendant, _ in moved)
+
+    with app.app_context():
+        TopicTreeService().rebuild()
+    assert closure(app) == moved
+
+
+def test_a_topic_cant_move_under_itself(app, tree):
+    with app.app_context():
+        db.session.get(Topic, tree['algebra']).parent_topic_id = tree['quadratic']
+        with pytest.raises(ValueError):
+            db.session.flush()
+        db.session.rollback()
+
+
+def test_trees_follow_committed_changes_only(app, tree):
+    from app.services.topic_tree_service import TopicTreeService
+
+    with app.app_context():
+        assert tree['geometry'] in TopicTreeService().get_tree(tree['subject']).roots
+
+    with app.app_context():
+        db.session.get(Topic, tree['geometry']).parent_topic_id = tree['algebra']
+        db.session.flush()
+        db.session.rollback()
+    with app.app_context():
+        assert tree['geometry'] in TopicTreeService().get_tree(tree['subject']).roots
+
+    with app.app_context():
+        db.session.get(Topic, tree['geometry']).parent_topic_id = tree['algebra']
+        db.session.commit()
+    with app.app_context():
+        assert TopicTreeService().get_tree(tree['subject']).parent(tree['geometry']) == tree['algebra']
+
+
+def test_progress_rolls_up_the_subtree(app, tree, make_user):
+    from app.services.topic_tree_service import TopicTreeService
+
+    user_id = make_user()
+    with app.app_context():
+        db.session.add_all([
+            UserTopicProgress(user_id=user_id, topic_id=tree[name], total_questions=total,
+                              correct_answers=correct, last_practiced_at=datetime.utcnow())
+            for name, total, correct in [('quadratic', 10, 5), ('fractions', 30, 25), ('geometry', 4, 4)]
+        ])
+        db.session.commit()
+
+        rollup = TopicTreeService().progress_rollup(user_id, tree['subject'])
+
+    assert rollup[tree['algebra']] == {'total_questions': 40, 'correct_answers': 30,
+                                       'accuracy': 75.0, 'topics_practiced': 2}
+    assert rollup[tree['equations']]['total_questions'] == 10
+    assert rollup[tree['geometry']]['accuracy'] == 100.0
@@ -0,0 +1,77 @@
+"""
+Cached user snapshots for the login loader
+"""
+from datetime import datetime
+from app import db
+from app.utils.query_counter import query_count
+
+
+def test_second_load_comes_from_redis(app, make_user):
+    from app.utils.user_cache import UserSnapshot, load_user
+
+    user_id = make_user(full_name='Jana Nová', grade=6, xp=120)
+
+    with app.test_request_context():
+        first = load_user(user_id)
+        assert query_count() == 1
+
+    with app.test_request_context():
+        user = load_user(user_id)
+        assert isinstance(user, UserSnapshot)
+        assert (user.id, user.full_name, user.grade, user.xp) == (user_id, 'Jana Nová', 6, 120)
+        assert isinstance(user.created_at, datetime)
+        assert user == first and user.is_authenticated and user.is_active
+        assert query_count() == 0
+
+        # Anything the snapshot doesn't carry loads the ORM user once
+        assert user.check_password('secret') is False
+        assert user.subscription is None
+        assert query_count() == 2
+
+
+def test_unknown_user_is_not_cached(app):
+    from app import redis_client
+    from app.utils.user_cache import load_user, user_key
+
+    with app.app_context():
+        assert load_user(4242) is None
+    assert not redis_client.exists(user_key(4242))
+
+
+def test_writes_drop_the_snapshot_after_commit(app, make_user):
+    from app import redis_client
+    from app.utils.user_cache import load_user, user_key
+
+    user_id = make_user(grade=5)
+    with app.app_context():
+        load_user(user_id)
+
+    with app.app_context():
+        user = load_user(user_id)
+        user.grade = 7
+        assert user.grade == 7
+        db.session.flush()
+        assert redis_client.exists(user_key(user_id))
+        db.session.commit()
+    assert not redis_client.exists(user_key(user_id))
+
+    with app.app_context():
+        assert load_user(user_id).grade == 7
+
+
+def test_bulk_xp_update_drops_the_snapshot(app, make_user):
+    from app import redis_client
+    from app.services.xp_service import XPService
+    from app.utils.user_cache import load_user, user_key
+
+    user_id = make_user(xp=0)
+    with app.app_context():
+        load_user(user_id)
+        XPService().award(user_id, [(30, 'test_score', 1)])
+        db.session.rollback()
+    assert redis_client.exists(user_key(user_id))
+
+    with app.app_context():
+        XPService().award(user_id, [(30, 'test_score', 1)])
+        db.session.commit()
+        assert load_user(user_id).xp == 30
@@ -0,0 +1,70 @@
+"""
+XP ledger, atomic totals and levels
+"""
+import pytest
+from sqlalchemy import func, literal, select, update
+from app import db
+from app.models.gamification import XPEvent
+from app.models.user import User
+
+
+@pytest.mark.parametrize('xp', [0, 99, 100, 101, 249, 250, 15999, 16000, 99999])
+def test_sql_levels_match_python(app, xp):
+    from app.utils.levels import level_for_xp, level_for_xp_sql
+
+    with app.app_context():
+        assert db.session.scalar(select(level_for_xp_sql(literal(xp)))) == level_for_xp(xp)
+
+
+def test_retried_award_pays_once(app, make_user):
+    from app.services.xp_service import XPService
+
+    user_id = make_user(xp=90, level=1)
+    awards = [(30, 'test_score', 7), (50, 'perfect_score', 7)]
+    with app.app_context():
+        first = XPService().award(user_id, awards)
+        db.session.commit()
+        retry = XPService().award(user_id, awards)
+        db.session.commit()
+
+        assert first == {'earned': 80, 'xp': 170, 'level': 2, 'leveled_up': True, 'grade': None}
+        assert retry == {'earned': 0, 'xp': 170, 'level': 2, 'leveled_up': False, 'grade': None}
+        assert XPEvent.query.filter_by(user_id=user_id).count() == 2
+
+
+def test_award_adds_to_the_stored_total(app, make_user):
+    from app.services.xp_service import XPService
+
+    user_id = make_user(xp=0, level=1)
+    with app.app_context():
+        # Loaded before another award commits: the total must not be overwritten
+        user = db.session.get(User, user_id)
+        with app.app_context():
+            XPService().award(user_id, [(40, 'test_score', 1)])
+            db.session.commit()
+        XPService().award(user_id, [(25, 'test_score', 2)])
+        db.session.commit()
+
+        assert user.xp == 65
+
+
+def test_reconcile_keeps_xp_from_before_the_ledger(app, make_user):
+    from app.services.xp_service import XPService
+
+    # 300 XP earned before the ledger, then one award on top
+    user_id = make_user(xp=300, level=3)
+    newcomer = make_user(xp=0, level=1)
+    with app.app_context():
+        XPService().award(user_id, [(20, 'test_score', 1)])
+        db.session.commit()
+
+        assert XPService().reconcile(chunk_size=1) == 0
+        assert db.session.scalar(select(func.sum(XPEvent.amount)).where(XPEvent.user_id == user_id)) == 320
+        assert XPEvent.query.filter_by(user_id=newcomer).count() == 0
+
+        # Later drift in users.xp is repaired from the ledger
+        db.session.execute(update(User).where(User.id == user_id).values(xp=999, level=5))
+        db.session.commit()
+        assert XPService().reconcile(chunk_size=1) == 1
+        user = db.session.get(User, user_id)
+        assert (user.xp, user.level) == (320, 3)